@@ -1,100 +1,130 @@
-import shap
-import pickle
-from geopy.distance import geodesic
-import uvicorn
-import nest_asyncio
-from datetime import datetime
-from fastapi import FastAPI, Depends
-from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, Float, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import LabelEncoder
-
-# Apply nest_asyncio to avoid event loop issues in Jupyter Notebook
-nest_asyncio.apply()
-
-# Initialize FastAPI app
-app = FastAPI()
-
-# Path to the pre-trained fraud detection model
-MODEL_PATH = "src/models/xgb_fraud_model.pkl"
-
-# Load the XGBoost model
-try:
-    with open(MODEL_PATH, "rb") as model_file:
-        model = pickle.load(model_file)
-    print(f"✅ Model loaded successfully from {MODEL_PATH}")
-except FileNotFoundError:
-    print(f"❌ ERROR: Model file not found at {MODEL_PATH}. Ensure the file exists.")
-    model = None
+import os
+from src.serving.startup import StartupProfile
+
+# FRAUD_SHIELD_STARTUP_PROFILE=1 prints the time each import and initialization stage below takes
+startup = StartupProfile(enabled=os.environ.get("FRAUD_SHIELD_STARTUP_PROFILE") == "1")
+
+with startup.stage("import web framework"):
+    import math
+    import time
+    import uvicorn
+    from contextlib import asynccontextmanager
+    from datetime import datetime
+    from typing import List
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse, Response
+    from pydantic import BaseModel
+with startup.stage("import database"):
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.db.persistence import DATABASE_URL, GroupCommitWriter, apply_sqlite_pragmas
+    from src.db.models import Transaction, create_schema
+with startup.stage("import features"):
+    import numpy as np
+    from src.features.distance import distance, distances
+    from src.features.state import FeatureStateStore
+with startup.stage("import model runtime"):
+    # Booster only: sklearn, shap and pickle are never imported to serve (see src/models/booster.py)
+    from src.models.artifact import ModelArtifact
+with startup.stage("import serving"):
+    from src.serving.batcher import MicroBatcher
+    from src.serving.executor import StageExecutor
+    from src.serving.metrics import CONTENT_TYPE, MetricsRegistry
+
+# Versioned serving artifact: native booster, vocabularies, feature order and threshold
+# (build it with `python -m src.models.artifact`)
+MODEL_ARTIFACT_PATH = os.environ.get("FRAUD_SHIELD_MODEL_ARTIFACT", "src/models/fraud_model.artifact")
+
+# Set FRAUD_SHIELD_EXPLAIN_MODE=approximate to trade exact SHAP values for faster explanations
+EXPLAIN_MODE = os.environ.get("FRAUD_SHIELD_EXPLAIN_MODE", "exact")
+
+# Load the model artifact; every worker process holds its own copy of the booster
+artifact = None
+explainer = None
+scorer = None
+with startup.stage("load model artifact"):
+    try:
+        artifact = ModelArtifact.load(MODEL_ARTIFACT_PATH)
+        print(f"✅ Model {artifact.version} loaded successfully from {MODEL_ARTIFACT_PATH}")
+    except FileNotFoundError:
+        print(f"❌ ERROR: Model artifact not found at {MODEL_ARTIFACT_PATH}. Ensure the file exists.")
+    if artifact is not None:
+        # Model column layout and raw booster, compiled once for the per-request path
+        scorer = artifact.scorer()
+        # Explanation engine over the booster's native contributions, built once
+        explainer = artifact.explainer(approximate=(EXPLAIN_MODE == "approximate"))
 
 # Database setup
-DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# Define Transaction Model with updated data types
-class Transaction(Base):
-    __tablename__ = "transactions"
-    TransactionID = Column(Integer, primary_key=True, index=True, unique=True)
-    TransactionAmt = Column(Float)
-    TransactionDT = Column(String)
-    ProductCD = Column(String)
-    User_ID = Column(Integer)
-    Merchant = Column(String)
-    CardNumber = Column(String)
-    BINNumber = Column(String)
-    CardNetwork = Column(String)
-    CardTier = Column(String)
-    CardType = Column(String)
-    PhoneNumbers = Column(String)
-    User_Region = Column(String)
-    Order_Region = Column(String)
-    Receiver_Region = Column(String)
-    Distance = Column(Float)
-    Sender_email = Column(String)
-    Merchant_email = Column(String)
-    DeviceType = Column(String)
-    DeviceInfo = Column(String)
-    # E Series Features
-    TransactionTimeSlot_E2 = Column(Integer)
-    HourWithinSlot_E3 = Column(Integer)
-    TransactionWeekday_E4 = Column(Integer)
-    AvgTransactionInterval_E5 = Column(Float)
-    TransactionAmountVariance_E6 = Column(Float)
-    TransactionRatio_E7 = Column(Float)
-    MedianTransactionAmount_E8 = Column(Float)
-    AvgTransactionAmt_24Hrs_E9 = Column(Float)
-    TransactionVelocity_E10 = Column(Integer)
-    TimingAnomaly_E11 = Column(Integer)
-    RegionAnomaly_E12 = Column(Integer)
-    HourlyTransactionCount_E13 = Column(Integer)
-    # D Series Features
-    DaysSinceLastTransac_D2 = Column(Float)
-    SameCardDaysDiff_D3 = Column(Float)
-    SameAddressDaysDiff_D4 = Column(Float)
-    SameReceiverEmailDaysDiff_D10 = Column(Float)
-    SameDeviceTypeDaysDiff_D11 = Column(Float)
-    # C Series Features
-    TransactionCount_C1 = Column(Integer)
-    UniqueMerchants_C4 = Column(Integer)
-    SameBRegionCount_C5 = Column(Integer)
-    SameDeviceCount_C6 = Column(Integer)
-    UniqueBRegion_C11 = Column(Integer)
-    # M Series Features
-    DeviceMatching_M4 = Column(Integer)
-    DeviceMismatch_M6 = Column(Integer)
-    RegionMismatch_M8 = Column(Integer)
-    TransactionConsistency_M9 = Column(Integer)
-    # isFraud
-    isFraud = Column(Integer)
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Connection pool of the async engine the endpoints write through
+DB_POOL_SIZE = int(os.environ.get("FRAUD_SHIELD_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("FRAUD_SHIELD_DB_MAX_OVERFLOW", "10"))
+# Threads for the CPU-bound stages (features, predict, explain); defaults to min(32, CPUs + 4)
+CPU_WORKERS = int(os.environ.get("FRAUD_SHIELD_CPU_WORKERS", "0")) or None
+# Group commit window: concurrent writes are committed together after at most this delay / this many rows
+COMMIT_MAX_DELAY_MS = float(os.environ.get("FRAUD_SHIELD_COMMIT_MAX_DELAY_MS", "2"))
+COMMIT_MAX_ROWS = int(os.environ.get("FRAUD_SHIELD_COMMIT_MAX_ROWS", "256"))
+# Micro-batching of single-transaction model calls: wait at most this long / for this many rows
+BATCH_MAX_DELAY_MS = float(os.environ.get("FRAUD_SHIELD_BATCH_MAX_DELAY_MS", "2"))
+BATCH_MAX_SIZE = int(os.environ.get("FRAUD_SHIELD_BATCH_MAX_SIZE", "64"))
+# Number of server processes sharing the database (set by src/serving/serve.py)
+SERVER_WORKERS = int(os.environ.get("FRAUD_SHIELD_WORKERS", "1"))
+
+with startup.stage("connect database"):
+    # Sync engine for schema setup and the feature-state history reads, which run on the stage workers
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    # Async engine (aiosqlite) so request writes never block the event loop
+    async_engine = create_async_engine(
+        DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    # WAL journal and tuned pragmas on every connection (see src/db/persistence.py for durability)
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine)
+    # Create database tables, and the history indexes on databases created before them.
+    # src/serving/serve.py does this once before starting its workers, which then skip it
+    if os.environ.get("FRAUD_SHIELD_SCHEMA_READY") != "1":
+        create_schema(engine)
+
+# Metrics served on /metrics in the Prometheus text format (see src/serving/metrics.py)
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram("fraud_shield_stage_seconds", "Time spent in each stage of a fraud check.", "stage")
+# Stages of the scoring pipeline; their histograms are looked up once here, off the request path
+STAGES = ("request", "batch_request", "features", "history_read", "model_wait", "predict", "explain", "commit")
+stage_timers = {stage: stage_seconds.labels(stage) for stage in STAGES}
+verdicts = metrics.counter("fraud_shield_verdicts_total", "Scored transactions by verdict.", "verdict")
+errors = metrics.counter("fraud_shield_errors_total", "Fraud checks that returned an error, by endpoint.", "endpoint")
+db_rows_read = metrics.counter("fraud_shield_db_rows_read_total", "Rows read from the database, by query.", "query")
+
+def record_history_read(duration_ns, rows):
+    stage_timers["history_read"].observe_ns(duration_ns)
+    db_rows_read.inc("user_history", rows)
+
+with startup.stage("rebuild feature state"):
+    # Per-user running feature aggregates and global last-seen index, kept in sync with the transactions table.
+    # Under several server workers each keeps its own copy, re-synced from the table as other workers write
+    feature_store = FeatureStateStore(shared=SERVER_WORKERS > 1, on_history_read=record_history_read,
+                                     on_rows_read=db_rows_read.inc)
+    feature_store.rebuild(engine)
+    db_rows_read.inc("entity_index", len(feature_store.entities))
+
+# Bounded pool the synchronous scoring stages are awaited on
+stage_executor = StageExecutor(CPU_WORKERS)
+
+# Writes each scored transaction once, group-committed with concurrent requests
+transaction_writer = GroupCommitWriter(async_engine, Transaction.__table__,
+                                       max_delay=COMMIT_MAX_DELAY_MS / 1000, max_rows=COMMIT_MAX_ROWS)
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await transaction_writer.close()
+    stage_executor.shutdown()
+    await async_engine.dispose()
+
+# Initialize FastAPI app
+with startup.stage("create app"):
+    app = FastAPI(lifespan=lifespan)
 
 # Define request model
 class TransactionIn(BaseModel):
@@ -118,292 +148,204 @@ class TransactionIn(BaseModel):
     DeviceType: str
     DeviceInfo: str
 
-# Helper function for DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-bengaluru_regions = {
-    'Koramangala': (12.9288, 77.6228), 'Jayanagar': (12.9333, 77.5833), 'Whitefield': (12.9764, 77.7513),
-    'Indiranagar': (12.9701, 77.6402), 'Malleshwaram': (13.0034, 77.5723), 'Hebbal': (13.0312, 77.5924),
-    'Hennur': (13.0245, 77.6247), 'Sarjapur Road': (12.9121, 77.6774), 'Bannerghatta Road': (12.8786, 77.5900),
-    'Electronic City': (12.8543, 77.6780), 'Kalyan Nagar': (13.0272, 77.6463), 'BTM Layout': (12.9341, 77.5910),
-    'Vijayanagar': (12.9557, 77.5500), 'Bellandur': (12.9336, 77.6543), 'Kengeri': (12.9202, 77.4856),
-    'Yelahanka': (13.1008, 77.5963), 'Rajajinagar': (12.9917, 77.5568), 'Marathahalli': (12.9561, 77.7017),
-    'HSR Layout': (12.9121, 77.6446), 'Nagawara': (13.0452, 77.6226), 'Devanahalli': (13.2485, 77.7132),
-    'Attibele': (12.7762, 77.7672), 'Nelamangala': (13.0982, 77.3935), 'Hoskote': (13.0707, 77.7850),
-    'Anekal': (12.7110, 77.6956)
-}
-
-def calculate_engineered_features(transaction_data: dict, db: Session):
-    # Convert single transaction to DataFrame
-    df = pd.DataFrame([transaction_data])
-    # Convert TransactionDT to datetime if it's not already
-    if isinstance(df['TransactionDT'].iloc[0], str):
-        df['TransactionDT'] = pd.to_datetime(df['TransactionDT'])
-
-    # Get historical transactions for the user
-    historical_transactions = pd.read_sql(f"SELECT * FROM transactions WHERE User_ID = {transaction_data['User_ID']}", db.bind)
-    if not historical_transactions.empty:
-        historical_transactions['TransactionDT'] = pd.to_datetime(historical_transactions['TransactionDT'])
-        df = pd.concat([historical_transactions, df]).reset_index(drop=True)
-
-    # Calculate Distance
-    df['Distance'] = df.apply(lambda row: (
-        np.round(np.random.uniform(0.1, 2), 2) if row["Order_Region"] == row["Receiver_Region"]
-        else np.round(geodesic(bengaluru_regions.get(row["Order_Region"], (0, 0)),
-                              bengaluru_regions.get(row["Receiver_Region"], (0, 0))).km, 2)
-        if bengaluru_regions.get(row["Order_Region"]) and bengaluru_regions.get(row["Receiver_Region"]) else np.nan
-    ), axis=1)
-
-    # E features
-    df['TransactionTimeSlot_E2'] = df['TransactionDT'].apply(lambda x: (
-        0 if 10 <= x.hour < 14 else
-        1 if 14 <= x.hour < 18 else
-        2 if 18 <= x.hour < 22 else
-        3 if x.hour >= 22 or x.hour < 2 else
-        4 if 2 <= x.hour < 6 else 5
-    ))
-    df['HourWithinSlot_E3'] = df['TransactionDT'].apply(lambda x: (
-        x.hour - 10 if 10 <= x.hour < 14 else
-        x.hour - 14 if 14 <= x.hour < 18 else
-        x.hour - 18 if 18 <= x.hour < 22 else
-        (x.hour - 22) if x.hour >= 22 else (x.hour + 2) if x.hour < 2 else
-        x.hour - 2 if 2 <= x.hour < 6 else
-        x.hour - 6
-    ))
-    df['TransactionWeekday_E4'] = df['TransactionDT'].dt.weekday
-    df['AvgTransactionInterval_E5'] = df.groupby('User_ID')['TransactionDT'].diff().dt.total_seconds() / 3600
-    df['TransactionAmountVariance_E6'] = df.groupby('User_ID')['TransactionAmt'].transform(lambda x: x.std() if len(x) > 1 else 0)
-    user_avg = df.groupby('User_ID')['TransactionAmt'].transform('mean')
-    df['TransactionRatio_E7'] = df['TransactionAmt'] / user_avg.replace(0, np.nan)
-    df['MedianTransactionAmount_E8'] = df.groupby('User_ID')['TransactionAmt'].transform('median')
-    window_24h = df.groupby('User_ID', group_keys=False).apply(
-        lambda x: x[x['TransactionDT'] >= x['TransactionDT'].max() - pd.Timedelta(hours=24)]).reset_index(drop=True)
-    df['AvgTransactionAmt_24Hrs_E9'] = df['User_ID'].map(window_24h.groupby('User_ID')['TransactionAmt'].mean())
-    df['TransactionVelocity_E10'] = window_24h.groupby('User_ID')['TransactionID'].transform('count')
-    user_hour_freq = df.groupby(['User_ID', 'HourWithinSlot_E3']).size().reset_index(name='count')
-    df['TimingAnomaly_E11'] = df.apply(
-        lambda row: 1 if row['HourWithinSlot_E3'] not in user_hour_freq[user_hour_freq['User_ID'] == row['User_ID']]['HourWithinSlot_E3'].values else 0, axis=1
-    )
-    user_region_freq = df.groupby(['User_ID', 'Order_Region']).size().reset_index(name='count')
-    df['RegionAnomaly_E12'] = df.apply(
-        lambda row: 1 if row['Order_Region'] not in user_region_freq[user_region_freq['User_ID'] == row['User_ID']]['Order_Region'].values else 0, axis=1
-    )
-    df['HourlyTransactionCount_E13'] = df.groupby(['User_ID', 'HourWithinSlot_E3'])['TransactionID'].transform('count')
-    df['DaysSinceLastTransac_D2'] = df.groupby('User_ID')['TransactionDT'].diff().dt.total_seconds() / 86400
-    df['SameCardDaysDiff_D3'] = df.groupby('CardNumber')['TransactionDT'].diff().dt.total_seconds() / 86400
-    df['SameAddressDaysDiff_D4'] = df.groupby(['User_Region', 'Order_Region'])['TransactionDT'].diff().dt.total_seconds() / 86400
-    df['SameReceiverEmailDaysDiff_D10'] = df.groupby('Merchant_email')['TransactionDT'].diff().dt.total_seconds() / 86400
-    df['SameDeviceTypeDaysDiff_D11'] = df.groupby('DeviceType')['TransactionDT'].diff().dt.total_seconds() / 86400
-    # C series features
-    df['TransactionCount_C1'] = df.groupby(['CardNumber', 'Order_Region'])['TransactionID'].transform('count')
-    df['UniqueMerchants_C4'] = df.groupby('CardNumber')['Merchant'].transform('nunique')
-    df['SameBRegionCount_C5'] = df.groupby(['User_ID', 'User_Region'])['TransactionID'].transform('count')
-    df['SameDeviceCount_C6'] = df.groupby(['User_ID', 'DeviceType'])['TransactionID'].transform('count')
-    df['UniqueBRegion_C11'] = df.groupby('User_ID')['User_Region'].transform('nunique')
-    # M series features
-    user_common_device = df.groupby('User_ID')['DeviceType'].agg(lambda x: x.mode().iloc[0] if not x.empty else None)
-    df['DeviceMatching_M4'] = df.apply(
-        lambda row: 1 if row['DeviceType'] == user_common_device.get(row['User_ID']) else 0, axis=1)
-    df['PrevDevice'] = df.groupby('User_ID')['DeviceType'].shift(1)
-    df['DeviceMismatch_M6'] = (df['DeviceType'] != df['PrevDevice']).astype(int)
-    df['RegionMismatch_M8'] = (df['Order_Region'] != df['User_Region']).astype(int)
-    df['TransactionConsistency_M9'] = df.apply(
-        lambda row: sum([
-            row['DeviceMatching_M4'],
-            1 - row['DeviceMismatch_M6'],
-            1 - row['RegionMismatch_M8'],
-            1 if row['TransactionAmt'] <= row['MedianTransactionAmount_E8'] * 1.5 else 0
-        ]), axis=1
-    )
+def calculate_engineered_features(transaction_data: dict, bind=engine):
+    with stage_timers["features"].time():
+        # Fold the transaction into the user's running feature state (hydrated from the DB on first use)
+        # and the global last-seen index for the card/address/email/device D features
+        features = feature_store.observe(transaction_data, bind)
 
-    # Replace NaN and inf with defaults
-    df = df.replace([np.inf, -np.inf], np.nan).fillna(0)
-
-    # Return features for the current transaction
-    result = {
-        'Distance': float(df.iloc[-1]['Distance']),
-        'TransactionTimeSlot_E2': int(df.iloc[-1]['TransactionTimeSlot_E2']),
-        'HourWithinSlot_E3': int(df.iloc[-1]['HourWithinSlot_E3']),
-        'TransactionWeekday_E4': int(df.iloc[-1]['TransactionWeekday_E4']),
-        'AvgTransactionInterval_E5': float(df.iloc[-1]['AvgTransactionInterval_E5']),
-        'TransactionAmountVariance_E6': float(df.iloc[-1]['TransactionAmountVariance_E6']),
-        'TransactionRatio_E7': float(df.iloc[-1]['TransactionRatio_E7']),
-        'MedianTransactionAmount_E8': float(df.iloc[-1]['MedianTransactionAmount_E8']),
-        'AvgTransactionAmt_24Hrs_E9': float(df.iloc[-1]['AvgTransactionAmt_24Hrs_E9']),
-        'TransactionVelocity_E10': int(df.iloc[-1]['TransactionVelocity_E10']),
-        'TimingAnomaly_E11': int(df.iloc[-1]['TimingAnomaly_E11']),
-        'RegionAnomaly_E12': int(df.iloc[-1]['RegionAnomaly_E12']),
-        'HourlyTransactionCount_E13': int(df.iloc[-1]['HourlyTransactionCount_E13']),
-        'DaysSinceLastTransac_D2': float(df.iloc[-1]['DaysSinceLastTransac_D2']),
-        'SameCardDaysDiff_D3': float(df.iloc[-1]['SameCardDaysDiff_D3']),
-        'SameAddressDaysDiff_D4': float(df.iloc[-1]['SameAddressDaysDiff_D4']),
-        'SameReceiverEmailDaysDiff_D10': float(df.iloc[-1]['SameReceiverEmailDaysDiff_D10']),
-        'SameDeviceTypeDaysDiff_D11': float(df.iloc[-1]['SameDeviceTypeDaysDiff_D11']),
-        'TransactionCount_C1': int(df.iloc[-1]['TransactionCount_C1']),
-        'UniqueMerchants_C4': int(df.iloc[-1]['UniqueMerchants_C4']),
-        'SameBRegionCount_C5': int(df.iloc[-1]['SameBRegionCount_C5']),
-        'SameDeviceCount_C6': int(df.iloc[-1]['SameDeviceCount_C6']),
-        'UniqueBRegion_C11': int(df.iloc[-1]['UniqueBRegion_C11']),
-        'DeviceMatching_M4': int(df.iloc[-1]['DeviceMatching_M4']),
-        'DeviceMismatch_M6': int(df.iloc[-1]['DeviceMismatch_M6']),
-        'RegionMismatch_M8': int(df.iloc[-1]['RegionMismatch_M8']),
-        'TransactionConsistency_M9': int(df.iloc[-1]['TransactionConsistency_M9'])
-    }
+        # Distance only depends on the current row
+        result = {'Distance': distance(transaction_data['Order_Region'], transaction_data['Receiver_Region'],
+                                       transaction_data['TransactionID'])}
+        result.update(features)
     return result
 
+def calculate_engineered_features_batch(rows, bind=engine):
+    with stage_timers["features"].time():
+        # Distance only depends on the row, so look it up for the whole batch at once
+        batch_distances = distances([row['Order_Region'] for row in rows], [row['Receiver_Region'] for row in rows],
+                                    [row['TransactionID'] for row in rows])
+
+        # One state lookup per user and one lock for the whole batch; batch order is preserved, so each
+        # user's state sees its transactions in order
+        results = []
+        for row_distance, features in zip(batch_distances, feature_store.observe_batch(rows, bind)):
+            result = {'Distance': float(row_distance)}
+            result.update(features)
+            results.append(result)
+    return results
+
+def score(rows):
+    """Model input block, fraud probabilities and fraud flags for transaction dicts (one stage on the worker pool)."""
+    return scorer.score(rows)
+
+def explain_predictions(X):
+    """Top feature contributions (in %) for every row of the model input block ``X``."""
+    return explainer.top_features(X)
+
+def score_and_explain(rows):
+    """``(fraud_probability, is_fraud, top_features or None)`` per row, with one model call and
+    one explanation call for the fraud rows of the whole batch."""
+    with stage_timers["predict"].time():
+        X, fraud_probabilities, predictions = score(rows)
+    fraud_rows = np.flatnonzero(predictions)
+    top_features = [None] * len(rows)
+    if len(fraud_rows):
+        with stage_timers["explain"].time():
+            explanations = explain_predictions(X[fraud_rows])
+        for i, explanation in zip(fraud_rows, explanations):
+            top_features[i] = explanation
+    return list(zip(fraud_probabilities, predictions.tolist(), top_features))
+
+# Batches the model calls of concurrent single-transaction requests
+prediction_batcher = MicroBatcher(score_and_explain, stage_executor,
+                                  max_delay=BATCH_MAX_DELAY_MS / 1000, max_batch=BATCH_MAX_SIZE)
+
+# Counters the batcher, the writer and the startup profile keep themselves, read when /metrics is scraped
+metrics.collect("fraud_shield_batch_queue_depth", "gauge", "Transactions waiting for the next model micro-batch.",
+                lambda: [({}, prediction_batcher.queue_depth)])
+metrics.collect("fraud_shield_batches_total", "counter", "Micro-batched model calls.",
+                lambda: [({}, prediction_batcher.batches)])
+metrics.collect("fraud_shield_batched_transactions_total", "counter", "Transactions scored by micro-batched calls.",
+                lambda: [({}, prediction_batcher.items)])
+metrics.collect("fraud_shield_commits_total", "counter", "Group commits of scored transactions.",
+                lambda: [({}, transaction_writer.commits)])
+metrics.collect("fraud_shield_rows_written_total", "counter", "Scored transactions written to the database.",
+                lambda: [({}, transaction_writer.rows_written)])
+metrics.collect("fraud_shield_startup_seconds", "gauge", "Time spent in the startup stages of this process.",
+                lambda: [({}, sum(seconds for _, seconds, _ in startup.stages))])
+metrics.collect("fraud_shield_model_info", "gauge", "Version of the loaded model artifact.",
+                lambda: [({"version": artifact.version}, 1)] if artifact is not None else [])
+
+def finite(value):
+    # JSON has no NaN/inf; a non-finite request amount is echoed back as 0.0
+    return value if math.isfinite(value) else 0.0
+
+def build_response(transaction, engineered_features, prediction, fraud_probability, top_features=None):
+    # Every float here is finite (Distance, probability and contributions by construction),
+    # so the response is serialized as is
+    if prediction:
+        response = {
+            "status": "success",
+            "transaction_stored": True,
+            "transaction_id": transaction.TransactionID,
+            "Distance": engineered_features["Distance"],
+            "fraud_detection": {
+                "is_fraud": True,
+                "fraud_probability": round(float(fraud_probability), 5),
+            },
+            "transaction_details": {
+                "Transaction": transaction.TransactionID,
+                "Amount": finite(transaction.TransactionAmt),
+                "Datetime": transaction.TransactionDT,
+                "Merchant": transaction.Merchant,
+                "Region": transaction.Order_Region
+            },
+            "Top_features": top_features
+        }
+    else:
+        response = {
+            "status": "success",
+            "transaction_id": transaction.TransactionID,
+            "is_fraud": False,
+            "message": "Transaction is not fraudulent, no SHAP analysis needed."
+        }
+    return response
+
 @app.post("/transaction_fraud_check")
-async def check_transaction_fraud(transaction: TransactionIn, db: Session = Depends(get_db)):
+async def check_transaction_fraud(transaction: TransactionIn):
+    start = time.perf_counter_ns()
     try:
-        # Step 1: Store transaction and get engineered features
+        # Step 1: Get engineered features
         transaction_data = transaction.model_dump()
-        engineered_features = calculate_engineered_features(transaction_data, db)
+        engineered_features = await stage_executor.run(calculate_engineered_features, transaction_data)
         transaction_data.update(engineered_features)
 
-        # Store transaction
-        db_transaction = Transaction(**transaction_data)
-        db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
-
-        # Step 2: Prepare data for prediction
-        transaction_dict = {col.name: getattr(db_transaction, col.name) for col in Transaction.__table__.columns}
-        transaction_df = pd.DataFrame([transaction_dict])
-
-        # Get expected features
-        expected_features = model.feature_names_in_
-        column_mapping = {
-            "Cardnumber": "CardNumber",
-            "UserID": "User_ID",
-            "BINnumber": "BINNumber",
-            "Cardnetwork": "CardNetwork",
-            "Cardtier": "CardTier",
-            "Cardtype": "CardType",
-            "Phonenumbers": "PhoneNumbers",
-            "Userregion": "User_Region",
-            "Orderregion": "Order_Region",
-            "Receiverregion": "Receiver_Region",
-            "Senderemail": "Sender_email",
-            "Merchantemail": "Merchant_email",
-            "Devicetype": "DeviceType",
-            "Deviceinfo": "DeviceInfo",
+        # Step 2: Prediction, and explanation if fraud, batched with concurrent requests
+        with stage_timers["model_wait"].time():
+            fraud_probability, prediction, top_features = await prediction_batcher.submit(transaction_data)
+
+        # Step 3: Store the transaction once, with its verdict
+        transaction_data['isFraud'] = int(prediction)
+        with stage_timers["commit"].time():
+            await transaction_writer.write([transaction_data])
+        feature_store.confirm([transaction_data])
+        verdicts.inc("fraud" if prediction else "legit")
+
+        response = build_response(transaction, engineered_features, prediction, fraud_probability, top_features)
+
+        return JSONResponse(response)
+
+    except Exception as e:
+        errors.inc("single")
+        # The feature state may already include this transaction; take it out again
+        await stage_executor.run(feature_store.rollback, [transaction.model_dump()], engine)
+        return {
+            "status": "error",
+            "message": str(e)
         }
-        transaction_df.rename(columns=column_mapping, inplace=True)
-
-        # Handle categorical columns
-        categorical_cols = transaction_df.select_dtypes(include=['object']).columns
-        all_transactions = pd.read_sql("SELECT * FROM transactions", db.bind)
-
-        # Replace None or 'None' with 'Unknown' and ensure all values are strings
-        transaction_df[categorical_cols] = transaction_df[categorical_cols].fillna('Unknown').replace('None', 'Unknown').astype(str)
-        all_transactions[categorical_cols] = all_transactions[categorical_cols].fillna('Unknown').replace('None', 'Unknown').astype(str)
-
-        label_encoders = {}
-        for col in categorical_cols:
-            le = LabelEncoder()
-            # Fit on all unique values from both historical and new data
-            combined_values = pd.concat([all_transactions[col], transaction_df[col]]).unique()
-            le.fit(combined_values)
-            all_transactions[col] = le.transform(all_transactions[col])
-            transaction_df[col] = le.transform(transaction_df[col])
-            label_encoders[col] = le
-
-        # Ensure all features exist
-        for col in expected_features:
-            if col not in transaction_df.columns:
-                transaction_df[col] = 0
-
-        transaction_df = transaction_df[expected_features]
-
-        # Replace NaN/inf in DataFrame before prediction
-        transaction_df = transaction_df.replace([np.inf, -np.inf], np.nan).fillna(0)
-
-        # Make prediction
-        prediction = model.predict(transaction_df)[0]
-        prediction_proba = model.predict_proba(transaction_df)[0]
-
-        # Handle different output formats of predict_proba
-        fraud_probability = prediction_proba[1] if len(prediction_proba) > 1 else prediction_proba
-
-        # Apply fraud threshold
-        prediction = 1.0 if fraud_probability > 0.01 else 0.0
-
-        # Update the isFraud value in the database
-        db_transaction.isFraud = int(prediction)
-        db.commit()
-
-        if prediction == 1.0:  # Only explain fraud transactions
-            # Initialize SHAP explainer
-            explainer = shap.Explainer(model)
-            shap_values = explainer(transaction_df)
-
-            # Extract SHAP values for the first instance
-            shap_values_instance = shap_values[0].values
-            feature_names = transaction_df.columns
-
-            # Create a DataFrame with feature names and their corresponding SHAP values
-            shap_df = pd.DataFrame({
-                'Feature': feature_names,
-                'SHAP Value': shap_values_instance
-            })
-
-            # Calculate absolute SHAP values
-            shap_df['Absolute SHAP Value'] = shap_df['SHAP Value'].abs()
-            total_abs_shap = shap_df['Absolute SHAP Value'].sum()
-            shap_df['Percentage Contribution'] = (shap_df['Absolute SHAP Value'] / total_abs_shap) * 100
-            shap_df['Percentage Contribution'] = shap_df['Percentage Contribution'].round(2)
-
-            shap_df = shap_df.sort_values(by='Percentage Contribution', ascending=False)
-            top_features = shap_df[['Feature', 'Percentage Contribution']].to_dict(orient="records")
-
-            response = {
-                "status": "success",
-                "transaction_stored": True,
-                "transaction_id": transaction.TransactionID,
-                "Distance": engineered_features["Distance"],
-                "fraud_detection": {
-                    "is_fraud": bool(prediction),
-                    "fraud_probability": round(float(fraud_probability), 5),
-                },
-                "transaction_details": {
-                    "Transaction": transaction.TransactionID,
-                    "Amount": transaction.TransactionAmt,
-                    "Datetime": transaction.TransactionDT,
-                    "Merchant": transaction.Merchant,
-                    "Region": transaction.Order_Region
-                },
-                "Top_features": top_features
-            }
-        else:
-            response = {
-                "status": "success",
-                "transaction_id": transaction.TransactionID,
-                "is_fraud": False,
-                "message": "Transaction is not fraudulent, no SHAP analysis needed."
-            }
-
-        # Ensure all floats in response are JSON-compliant
-        def clean_floats(obj):
-            if isinstance(obj, dict):
-                return {k: clean_floats(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [clean_floats(item) for item in obj]
-            elif isinstance(obj, float):
-                return 0.0 if pd.isna(obj) or not np.isfinite(obj) else obj
-            return obj
-
-        return clean_floats(response)
+
+    finally:
+        stage_timers["request"].observe_ns(time.perf_counter_ns() - start)
+
+@app.post("/transaction_fraud_check/batch")
+async def check_transaction_fraud_batch(transactions: List[TransactionIn]):
+    start = time.perf_counter_ns()
+    try:
+        # Step 1: Engineered features for the whole batch, in order within each user
+        rows = [transaction.model_dump() for transaction in transactions]
+        engineered_features = await stage_executor.run(calculate_engineered_features_batch, rows)
+        for transaction_data, features in zip(rows, engineered_features):
+            transaction_data.update(features)
+
+        # Step 2: One model call for the batch, and one explanation call for its fraud rows
+        scores = await stage_executor.run(score_and_explain, rows)
+
+        # Step 3: Store every transaction with its verdict in one bulk insert
+        for transaction_data, (_, prediction, _) in zip(rows, scores):
+            transaction_data['isFraud'] = int(prediction)
+        with stage_timers["commit"].time():
+            await transaction_writer.write(rows)
+        feature_store.confirm(rows)
+        n_fraud = sum(prediction for _, prediction, _ in scores)
+        verdicts.inc("fraud", n_fraud)
+        verdicts.inc("legit", len(scores) - n_fraud)
+
+        results = [
+            build_response(transaction, features, prediction, fraud_probability, explanation)
+            for transaction, features, (fraud_probability, prediction, explanation)
+            in zip(transactions, engineered_features, scores)
+        ]
+        return JSONResponse({"status": "success", "count": len(results), "results": results})
 
     except Exception as e:
-        db.rollback()  # Rollback transaction if error occurs
+        errors.inc("batch")
+        # The batch is written in one transaction, so no row of it was stored
+        await stage_executor.run(feature_store.rollback, [transaction.model_dump() for transaction in transactions],
+                                 engine)
         return {
             "status": "error",
             "message": str(e)
         }
 
+    finally:
+        stage_timers["batch_request"].observe_ns(time.perf_counter_ns() - start)
+
+@app.get("/transaction_fraud_check/batching")
+async def batching_stats():
+    """Queue depth and batch sizes of the single-transaction micro-batcher."""
+    return prediction_batcher.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms and counters in the Prometheus text format."""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+startup.report()
+
 if __name__ == "__main__":
+    # Development server. Jupyter already runs an event loop, which uvicorn.run needs patched;
+    # production workers (python -m src.serving.serve) never import nest_asyncio
+    import nest_asyncio
+    nest_asyncio.apply()
     uvicorn.run(app, host="127.0.0.1", port=8000)
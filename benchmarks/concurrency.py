@@ -0,0 +1,88 @@
+"""Throughput of the scoring endpoint against the number of concurrent clients.
+
+Drives ``/transaction_fraud_check`` in-process through httpx's ASGI transport
+with 1, 2, 4, ... clients sending requests back to back, against a throwaway
+SQLite database, and reports requests/s, latency percentiles and the
+micro-batcher's mean batch size per level.
+
+    python -m benchmarks.concurrency --requests 400 --clients 1 2 4 8 16
+
+Pool sizes are read by app.py from ``FRAUD_SHIELD_CPU_WORKERS``,
+``FRAUD_SHIELD_DB_POOL_SIZE`` and ``FRAUD_SHIELD_DB_MAX_OVERFLOW``.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_transactions
+
+
+def payloads(n_rows, seed=0):
+    df = make_transactions(n_rows, seed=seed)
+    df['TransactionDT'] = df['TransactionDT'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df.to_dict('records')
+
+
+async def run_level(client, bodies, n_clients):
+    """Send ``bodies`` with ``n_clients`` concurrent clients; returns wall time and per-request latencies."""
+    queue = list(reversed(bodies))
+    latencies = []
+
+    async def worker():
+        while queue:
+            body = queue.pop()
+            start = time.perf_counter()
+            response = await client.post('/transaction_fraud_check', json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.json().get('status') != 'success':
+                raise SystemExit(f"Request failed: {response.text}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(n_clients)))
+    return time.perf_counter() - start, np.array(latencies)
+
+
+async def main_async(args):
+    import httpx
+
+    import app
+
+    rows = payloads(args.requests * (len(args.clients) + 1), seed=args.seed)
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        # Warm-up: loads every user's state and the model's first-call paths
+        await run_level(client, rows[:args.requests], max(args.clients))
+        print(f"{'clients':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'batch':>8}")
+        batcher = app.prediction_batcher
+        for level, n_clients in enumerate(args.clients, start=1):
+            bodies = rows[level * args.requests:(level + 1) * args.requests]
+            batches, items = batcher.batches, batcher.items
+            elapsed, latencies = await run_level(client, bodies, n_clients)
+            mean_batch = (batcher.items - items) / max(1, batcher.batches - batches)
+            print(f"{n_clients:>8} {len(bodies) / elapsed:>10.1f} "
+                  f"{np.percentile(latencies, 50) * 1e3:>10.2f} {np.percentile(latencies, 99) * 1e3:>10.2f} "
+                  f"{mean_batch:>8.1f}")
+    app.stage_executor.shutdown()
+    await app.async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400, help='requests per concurrency level')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before app.py is imported, which creates the engines
+        os.environ['FRAUD_SHIELD_DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Correctness and scaling of the synthetic dataset generator in src/data/generator.py.
+
+1. Determinism: the same seed gives the same frame. The Parquet file written
+   by shard processes and time-bucketed merges equals the in-memory
+   ``generate_frame``, for 1 and ``--check-workers`` workers and different
+   bucket sizes.
+2. Point-in-time features: every feature column of the file equals
+   ``compute_features`` over the whole file, so carrying the cross-user D
+   features over buckets loses nothing.
+3. Scaling: wall time of the shard and merge phases, throughput, peak RSS of
+   the main process and of the largest worker, and file size for each of
+   ``--sizes`` rows. Each size runs in a fresh process so peaks do not carry
+   over.
+
+    python -m benchmarks.dataset_generation --sizes 1000000 10000000 --workers 1
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.data.generator import ROWS_PER_USER, generate, generate_frame
+from src.features.engineered import FEATURE_COLUMNS, compute_features
+
+
+def check_determinism(n_users, shard_users, workers, directory):
+    expected = generate_frame(n_users, seed=3, shard_users=shard_users)
+    pd.testing.assert_frame_equal(generate_frame(n_users, seed=3, shard_users=shard_users), expected)
+    for n_workers, chunk_rows in ((1, len(expected) // 7), (workers, len(expected) // 3)):
+        path = os.path.join(directory, f"check-{n_workers}.parquet")
+        generate(path, n_users, seed=3, shard_users=shard_users, workers=n_workers, chunk_rows=chunk_rows)
+        try:
+            pd.testing.assert_frame_equal(pd.read_parquet(path), expected, check_dtype=False)
+        except AssertionError as error:
+            raise SystemExit(f"❌ File from {n_workers} workers, {chunk_rows}-row buckets differs from "
+                             f"generate_frame: {error}")
+    print(f"✅ {len(expected)} rows: same seed, same data; files from 1 and {workers} workers equal the in-memory frame")
+    return expected
+
+
+def check_features(df):
+    recomputed = compute_features(df)
+    different = [column for column in FEATURE_COLUMNS
+                 if not np.allclose(recomputed[column].to_numpy(np.float64), df[column].to_numpy(np.float64),
+                                    rtol=1e-9, atol=1e-9)]
+    if different:
+        raise SystemExit(f"❌ Stored features differ from compute_features over the whole file: {different}")
+    print(f"✅ All {len(FEATURE_COLUMNS)} stored features equal compute_features over the whole file; "
+          f"{df['isFraud'].mean():.2%} fraud")
+
+
+def run_size(rows, workers, directory):
+    """Generate about ``rows`` rows in this process; statistics plus the file size."""
+    path = os.path.join(directory, f"scale-{rows}.parquet")
+    stats = generate(path, max(1, round(rows / ROWS_PER_USER)), seed=rows, workers=workers)
+    stats["file_mib"] = os.path.getsize(path) / 2**20
+    os.remove(path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--workers", type=int, default=None, help="shard processes (default: all cores)")
+    parser.add_argument("--check-users", type=int, default=3000)
+    parser.add_argument("--check-workers", type=int, default=2)
+    parser.add_argument("--directory", default=None, help="where to write the files (default: a temporary one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        df = check_determinism(args.check_users, max(1, args.check_users // 4), args.check_workers, directory)
+        check_features(df)
+
+        print(f"{'rows':>11} {'users':>9} {'shards s':>9} {'merge s':>8} {'rows/s':>9} {'peak MiB':>9} "
+              f"{'worker MiB':>11} {'file MiB':>9}")
+        context = multiprocessing.get_context("spawn")
+        for rows in args.sizes:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                stats = pool.submit(run_size, rows, args.workers, directory).result()
+            seconds = stats["generate_s"] + stats["merge_s"]
+            print(f"{stats['rows']:>11,} {stats['users']:>9,} {stats['generate_s']:>9.1f} {stats['merge_s']:>8.1f} "
+                  f"{stats['rows'] / seconds:>9,.0f} {stats['peak_rss_mib']:>9.0f} "
+                  f"{stats['worker_peak_rss_mib']:>11.0f} {stats['file_mib']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
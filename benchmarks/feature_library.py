@@ -0,0 +1,115 @@
+"""Parity and scaling of the shared feature library in src/features/engineered.py.
+
+1. Parity: batch ``compute_features`` against ``IncrementalFeatures`` fed one
+   transaction at a time, on every feature column. Run on synthetic frames
+   with missing keys, equal timestamps and rows without a TransactionDT, and
+   on ``data/synthetic_dataset.csv`` in TransactionDT order. Integer features
+   must be equal and float features equal up to rounding.
+2. Scaling: time, throughput and peak traced memory of batch mode for each
+   ``--sizes`` value (millions of rows by default), against the incremental
+   mode's row rate on the first ``--incremental-rows`` rows.
+
+    python -m benchmarks.feature_library --sizes 100000 1000000 2000000
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_transactions
+from src.features.engineered import FEATURE_COLUMNS, IncrementalFeatures, compute_features
+from src.features.state import MEDIAN_EXACT_LIMIT
+from src.serving.batch_score import read_chunks
+
+
+def parity_frame(n_rows, seed):
+    """Synthetic rows in TransactionDT order, with missing keys, equal timestamps and NaT rows mixed in."""
+    rng = np.random.default_rng(seed)
+    df = make_transactions(n_rows, n_users=max(1, n_rows // 40), seed=seed)
+    for column, fraction in (("DeviceType", 0.15), ("CardNumber", 0.05), ("User_Region", 0.05),
+                             ("Order_Region", 0.05), ("Merchant", 0.05), ("Merchant_email", 0.05)):
+        df.loc[rng.random(n_rows) < fraction, column] = None
+    # Coarse timestamps make many rows of a user share one
+    df["TransactionDT"] = df["TransactionDT"].dt.floor("h")
+    df = df.sort_values("TransactionDT", kind="stable").reset_index(drop=True)
+    # Rows without a timestamp can arrive at any point
+    df.loc[rng.random(n_rows) < 0.02, "TransactionDT"] = pd.NaT
+    return df
+
+
+def csv_frame(path):
+    df = pd.concat(read_chunks(path, chunksize=50_000), ignore_index=True)
+    return df.sort_values("TransactionDT", kind="stable").reset_index(drop=True)
+
+
+def mismatches(df):
+    """Feature columns where the batch and incremental modes disagree, with a sample row."""
+    batch = compute_features(df)
+    incremental = IncrementalFeatures().observe_frame(df)
+    different = []
+    for column in FEATURE_COLUMNS:
+        expected, got = incremental[column].to_numpy(np.float64), batch[column].to_numpy(np.float64)
+        if batch[column].dtype.kind in "iu":
+            same = expected == got
+        else:
+            same = np.isclose(got, expected, rtol=1e-9, atol=1e-9) | (np.isnan(got) & np.isnan(expected))
+        if not same.all():
+            row = np.flatnonzero(~same)[0]
+            different.append(f"{column}: {(~same).sum()} rows, e.g. row {row}: {got[row]} vs {expected[row]}")
+    return different
+
+
+def check_parity(frames):
+    for name, df in frames:
+        if df.groupby("User_ID").size().max() > MEDIAN_EXACT_LIMIT:
+            raise SystemExit(f"❌ {name}: a user has more than {MEDIAN_EXACT_LIMIT} rows, E8 would be approximate")
+        different = mismatches(df)
+        if different:
+            raise SystemExit(f"❌ Batch and incremental features differ on {name}:\n" + "\n".join(different))
+        print(f"✅ {name}: batch and incremental modes agree on {len(df)} rows x {len(FEATURE_COLUMNS)} features")
+
+
+def peak_mib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 2_000_000])
+    parser.add_argument("--rows-per-user", type=int, default=50)
+    parser.add_argument("--parity-rows", type=int, default=5000)
+    parser.add_argument("--data", default="data/synthetic_dataset.csv")
+    parser.add_argument("--incremental-rows", type=int, default=100_000, help="rows timed in incremental mode")
+    args = parser.parse_args()
+
+    frames = [(f"synthetic seed {seed}", parity_frame(args.parity_rows, seed)) for seed in range(3)]
+    if os.path.exists(args.data):
+        frames.append((args.data, csv_frame(args.data)))
+    check_parity(frames)
+
+    print(f"{'rows':>10} {'users':>8} {'batch s':>9} {'rows/s':>11} {'peak MiB':>9} {'incremental rows/s':>19}")
+    for n in args.sizes:
+        df = make_transactions(n, n_users=max(1, n // args.rows_per_user), seed=n)
+        start = time.perf_counter()
+        compute_features(df)
+        batch_s = time.perf_counter() - start
+        peak = peak_mib(lambda: compute_features(df))
+        head = df.head(args.incremental_rows)
+        start = time.perf_counter()
+        IncrementalFeatures().observe_frame(head)
+        incremental_rate = len(head) / (time.perf_counter() - start)
+        print(f"{n:>10} {df['User_ID'].nunique():>8} {batch_s:>9.2f} {n / batch_s:>11,.0f} {peak:>9.0f} "
+              f"{incremental_rate:>19,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Cost of the engineered features against the size of a user's history.
+
+For each ``--sizes`` value, an in-memory SQLite database is filled with that
+many transactions of one user plus ``--other-rows`` rows of other users (the
+D features look across the whole table). One new transaction of the user is
+then scored repeatedly. Timed operations:
+
+- batch: ``compute_features`` of src/features/engineered.py over the user's
+  history plus the new transaction, i.e. recomputing every row's features,
+  and the pandas read of that history. Until the shared feature library,
+  ``calculate_engineered_features`` recomputed each family over the history
+  like this on every call; it now replays the history into a fresh state
+  (``single call``), which is ``online cold`` without the cache.
+- online: the ``FeatureStateStore`` path of app.py. ``cold`` is a user's first
+  request (history read, replay, features). ``warm`` is every later request.
+  It is split into ``E/C/M user state`` and ``D entity index``; the E, C and M
+  families share one pass over the user's running aggregates. ``entity
+  index rebuild`` is the startup load of the D index over the whole table.
+
+Time per call is the mean over repeated calls. Allocation is the peak of
+tracemalloc's traced memory during one call, measured in a separate pass so
+tracing does not distort the timings. ``--output`` saves the results as JSON;
+``--baseline`` compares against such a file and exits non-zero if any
+operation got slower by more than ``--tolerance``.
+
+    python -m benchmarks.feature_scaling --sizes 10 100 1000 10000 100000 --output features.json
+
+Batch mode over whole datasets is measured by ``benchmarks.feature_library``.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.synthetic import make_transactions
+from src.data.feature_engineering import calculate_engineered_features
+from src.db.models import Transaction, create_schema
+from src.db.queries import fetch_user_history
+from src.features.distance import distance, distance_matrix
+from src.features.engineered import compute_features
+from src.features.state import FeatureStateStore, parse_timestamp
+
+USER_ID = 0
+# TransactionIDs of the other users' rows start here, clear of the user's own
+OTHER_ID_OFFSET = 10**9
+
+
+def _records(df):
+    df = df.copy()
+    df["TransactionDT"] = df["TransactionDT"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return df.to_dict("records")
+
+
+def build_database(history_size, other_rows, seed=0):
+    """In-memory database with ``history_size`` rows of USER_ID; returns it and the user's next transaction."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    create_schema(engine)
+    user = _records(make_transactions(history_size + 1, n_users=1, seed=seed))
+    history, transaction = user[:-1], user[-1]
+    others = make_transactions(other_rows, seed=seed + 1) if other_rows else None
+    with engine.begin() as conn:
+        if history:
+            conn.execute(insert(Transaction.__table__), history)
+        if others is not None:
+            others["User_ID"] += USER_ID + 1
+            others["TransactionID"] += OTHER_ID_OFFSET
+            conn.execute(insert(Transaction.__table__), _records(others))
+    return engine, transaction
+
+
+def time_per_call(fn, setup=None, min_time=0.2, max_calls=1000):
+    """Mean seconds per ``fn(setup())`` call (setup is not timed), over at least ``min_time`` seconds."""
+    total, calls = 0.0, 0
+    while calls < max_calls and (total < min_time or calls == 0):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(argument)
+        total += time.perf_counter() - start
+        calls += 1
+    return total / calls
+
+
+def peak_allocation(fn, setup=None):
+    """Peak bytes allocated while running ``fn(setup())`` once."""
+    argument = setup() if setup is not None else None
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(argument)
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def batch_operations(engine, transaction):
+    """(name, fn, setup) for the batch feature mode and the single-call helper."""
+    query = f"SELECT * FROM transactions WHERE User_ID = {USER_ID}"
+    history = pd.read_sql(query, engine)
+    history["TransactionDT"] = pd.to_datetime(history["TransactionDT"])
+    current = pd.DataFrame([transaction])
+    current["TransactionDT"] = pd.to_datetime(current["TransactionDT"])
+    frame = pd.concat([history, current]).reset_index(drop=True)
+
+    return [
+        ("single call", lambda _: calculate_engineered_features(transaction, engine), None),
+        ("batch history read", lambda _: pd.read_sql(query, engine), None),
+        ("batch all rows", lambda _: compute_features(frame), None),
+    ]
+
+
+def online_operations(engine, transaction):
+    """(name, fn, setup) for the incremental feature state app.py uses."""
+    store = FeatureStateStore()
+    store.rebuild(engine)
+    # Built on first use; the server builds it on its first request, not on every one
+    distance_matrix()
+    dt = parse_timestamp(transaction["TransactionDT"])
+    now_ns = dt.value
+
+    def features(_):
+        result = {"Distance": distance(transaction["Order_Region"], transaction["Receiver_Region"],
+                                       transaction["TransactionID"])}
+        result.update(store.observe(transaction, engine))
+        return result
+
+    def cold_user(_=None):
+        store.invalidate(USER_ID)
+
+    def warm_state(_=None):
+        return store.get(USER_ID, engine)
+
+    return [
+        ("online cold", features, cold_user),
+        ("online warm", features, warm_state),
+        ("online history read", lambda _: fetch_user_history(engine, USER_ID), None),
+        ("online E/C/M user state", lambda state: state.observe(transaction, dt), warm_state),
+        ("online D entity index", lambda _: store.entities.observe(transaction, now_ns), None),
+        ("online entity index rebuild", lambda _: store.entities.rebuild(engine), None),
+    ]
+
+
+def run(sizes, other_rows, min_time, seed=0):
+    results = []
+    for size in sizes:
+        engine, transaction = build_database(size, other_rows, seed=seed)
+        for name, fn, setup in batch_operations(engine, transaction) + online_operations(engine, transaction):
+            seconds = time_per_call(fn, setup, min_time=min_time)
+            peak = peak_allocation(fn, setup)
+            results.append({"history_rows": size, "operation": name,
+                            "ms_per_call": round(seconds * 1000, 4), "peak_kib": round(peak / 1024, 1)})
+        engine.dispose()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing operations slower than ``baseline`` by more than ``tolerance``."""
+    previous = {(r["history_rows"], r["operation"]): r["ms_per_call"] for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["history_rows"], result["operation"]))
+        if before and result["ms_per_call"] > before * (1 + tolerance):
+            regressions.append(f"{result['operation']} at {result['history_rows']} rows: "
+                               f"{result['ms_per_call']:.3f} ms vs {before:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--other-rows", type=int, default=10000, help="rows of other users in the table")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.other_rows, args.min_time, seed=args.seed)
+    print(f"{'history rows':>12} {'operation':<28} {'ms/call':>10} {'peak KiB':>10}")
+    for result in results:
+        print(f"{result['history_rows']:>12} {result['operation']:<28} "
+              f"{result['ms_per_call']:>10.3f} {result['peak_kib']:>10.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"other_rows": args.other_rows, "results": results}, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        if regressions:
+            raise SystemExit("❌ Slower than the baseline:\n" + "\n".join(regressions))
+        print(f"✅ No operation slower than the baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
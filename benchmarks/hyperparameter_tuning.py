@@ -0,0 +1,117 @@
+"""Wall time and best validation AUC of the Optuna search in model.py: the notebook's vs src/models/tuning.py.
+
+The data is model.py's: the artifact's features and ``isFraud`` from the
+columnar store of ``data/synthetic_dataset.csv`` (or of ``--rows`` generated
+rows), with frauds upsampled to 20% and an 80/20 stratified split. Each
+search runs ``--trials`` trials from the same TPE seed:
+
+1. notebook: one ``XGBClassifier`` per trial, fit from pandas, one at a time,
+   never pruned;
+2. shared matrix: ``tuning.objective`` on one ``QuantileDMatrix``, one at a
+   time, never pruned;
+3. pruned: as 2 with the ``MedianPruner`` fed the validation AUC every 10 rounds
+   from round 50;
+4. parallel: as 3 with ``tuning_workers()`` concurrent trials.
+
+Fails if the best AUC of a search falls more than ``--auc-tolerance`` below
+the notebook's.
+
+    python -m benchmarks.hyperparameter_tuning --trials 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import optuna
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.utils import resample
+from xgboost import XGBClassifier
+
+from src.data.generator import ROWS_PER_USER, generate_frame
+from src.data.store import category_codes, convert_to_store, read_store
+from src.models.encoders import MISSING_TOKEN
+from src.models.tuning import TuningData, create_study, objective, suggest_params, tuning_workers
+
+SAMPLE_CSV = "data/synthetic_dataset.csv"
+MODEL_COLUMNS = ["TransactionAmt", "ProductCD", "CardNetwork", "CardTier", "CardType",
+                 "User_Region", "Order_Region", "Receiver_Region", "DeviceType"]
+
+
+def training_data(rows, months=None):
+    """model.py's training and validation sets from the sample CSV or ``rows`` generated rows (only ``months`` if given)."""
+    if rows:
+        df = generate_frame(max(1, round(rows / ROWS_PER_USER)), seed=rows)
+        if months is not None:
+            df = df[df["TransactionDT"].dt.strftime("%Y-%m").isin(months)]
+        df = df[MODEL_COLUMNS + ["isFraud"]]
+    else:
+        with tempfile.TemporaryDirectory() as root:
+            convert_to_store(SAMPLE_CSV, root)
+            df = read_store(root, columns=MODEL_COLUMNS + ["isFraud"], months=months)
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = category_codes(df[column], MISSING_TOKEN)[0]
+    fraud, non_fraud = df[df["isFraud"] == 1], df[df["isFraud"] == 0]
+    fraud = resample(fraud, replace=True, n_samples=int(len(non_fraud) / 0.8) - len(non_fraud), random_state=53)
+    df = pd.concat([fraud, non_fraud]).sample(frac=1, random_state=53).reset_index(drop=True)
+    x, y = df.drop(columns="isFraud"), df["isFraud"]
+    return train_test_split(x, y, test_size=0.2, random_state=53, stratify=y)
+
+
+def notebook_objective(trial, x_train, x_val, y_train, y_val):
+    params = suggest_params(trial)
+    params.update({"scale_pos_weight": sum(y_train == 0) / sum(y_train == 1), "objective": "binary:logistic",
+                   "eval_metric": "auc", "tree_method": "hist"})
+    model = XGBClassifier(**params)
+    model.fit(x_train, y_train, eval_set=[(x_val, y_val)], verbose=0)
+    return roc_auc_score(y_val, model.predict_proba(x_val)[:, 1])
+
+
+def run(name, split, trials, seed, pruned, workers, threads):
+    start = time.perf_counter()
+    if name == "notebook":
+        study = create_study(seed, pruner=optuna.pruners.NopPruner())
+        study.optimize(lambda trial: notebook_objective(trial, *split), n_trials=trials)
+    else:
+        data = TuningData(*split)
+        study = create_study(seed, pruner=None if pruned else optuna.pruners.NopPruner())
+        study.optimize(lambda trial: objective(trial, data, threads), n_trials=trials, n_jobs=workers)
+    seconds = time.perf_counter() - start
+    n_pruned = sum(trial.state == optuna.trial.TrialState.PRUNED for trial in study.trials)
+    return seconds, study.best_value, n_pruned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=0, help="generated rows instead of the sample CSV")
+    parser.add_argument("--seed", type=int, default=53)
+    parser.add_argument("--auc-tolerance", type=float, default=0.002)
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    split = training_data(args.rows)
+    workers, threads = tuning_workers()
+    print(f"{len(split[0]):,} training rows, {len(split[1]):,} validation rows, {args.trials} trials, "
+          f"{os.cpu_count()} cores: {workers} concurrent trials x {threads} threads")
+
+    searches = (("notebook", False, 1, None), ("shared matrix", False, 1, threads),
+                ("pruned", True, 1, threads), ("parallel", True, workers, threads))
+    print(f"{'search':>14} {'seconds':>8} {'speedup':>8} {'best AUC':>9} {'pruned':>7}")
+    baseline = None
+    for name, pruned, n_workers, n_threads in searches:
+        seconds, best, n_pruned = run(name, split, args.trials, args.seed, pruned, n_workers, n_threads)
+        baseline = baseline or (seconds, best)
+        print(f"{name:>14} {seconds:>8.1f} {baseline[0] / seconds:>7.1f}x {best:>9.5f} {n_pruned:>7}")
+        if best < baseline[1] - args.auc_tolerance:
+            raise SystemExit(f"❌ {name}: best AUC {best:.5f} is more than {args.auc_tolerance} below the "
+                             f"notebook's {baseline[1]:.5f}")
+    print(f"✅ Best AUC of every search within {args.auc_tolerance} of the notebook's")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Cost of the stage instrumentation in src/serving/metrics.py.
+
+Times a bare ``observe_ns``, a ``with histogram.time():`` block around no work
+(what each pipeline stage pays), a labelled counter increment and a full
+render of a registry shaped like the API's. Exits non-zero if an observation
+costs more than ``--observe-budget-ns`` or timing a stage more than
+``--budget-ns``. The defaults are about twice the costs measured on one slow
+core: some 0.5 us per observation, lock-free, and 1-2 us per timed stage,
+most of it the ``with`` block and the two clock reads.
+
+    python -m benchmarks.metrics_overhead --iterations 1000000
+"""
+
+import argparse
+import time
+
+from src.serving.metrics import MetricsRegistry
+
+STAGES = ("request", "batch_request", "features", "history_read", "model_wait", "predict", "explain", "commit")
+
+
+def per_call_ns(fn, iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    parser.add_argument("--budget-ns", type=float, default=2500.0, help="allowed cost of timing one stage")
+    parser.add_argument("--observe-budget-ns", type=float, default=1000.0, help="allowed cost of one observe_ns")
+    args = parser.parse_args()
+
+    metrics = MetricsRegistry()
+    stage_seconds = metrics.histogram("bench_stage_seconds", "Stage latency.", "stage")
+    timers = {stage: stage_seconds.labels(stage) for stage in STAGES}
+    verdicts = metrics.counter("bench_verdicts_total", "Verdicts.", "verdict")
+    histogram = timers["features"]
+
+    def timed_stage():
+        with histogram.time():
+            pass
+
+    empty_ns = per_call_ns(lambda: None, args.iterations)
+    results = {
+        "observe_ns": per_call_ns(lambda: histogram.observe_ns(1_234_567), args.iterations) - empty_ns,
+        "timed stage": per_call_ns(timed_stage, args.iterations) - empty_ns,
+        "counter inc": per_call_ns(lambda: verdicts.inc("fraud"), args.iterations) - empty_ns,
+    }
+    render_us = per_call_ns(metrics.render, 1000) / 1000
+
+    print(f"{'operation':>12} {'ns/call':>9}")
+    for name, ns in results.items():
+        print(f"{name:>12} {ns:>9.0f}")
+    print(f"{'render':>12} {render_us * 1000:>9.0f}  ({len(metrics.render().splitlines())} lines)")
+    if results["observe_ns"] > args.observe_budget_ns:
+        raise SystemExit(f"❌ An observation costs {results['observe_ns']:.0f} ns, over the "
+                         f"{args.observe_budget_ns:.0f} ns budget")
+    if results["timed stage"] > args.budget_ns:
+        raise SystemExit(f"❌ Timing a stage costs {results['timed stage']:.0f} ns, over the {args.budget_ns:.0f} ns budget")
+    print(f"✅ An observation costs under {args.observe_budget_ns:.0f} ns and timing a stage under {args.budget_ns:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
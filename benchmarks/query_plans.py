@@ -0,0 +1,71 @@
+"""EXPLAIN QUERY PLAN check for the history queries in src/db/queries.py.
+
+Builds a populated SQLite database with the schema of the ORM model in
+src/db/models.py, including its history indexes, then asserts every query is
+an index search on the expected index rather than a scan of the table, with
+no temporary B-tree for its ORDER BY or GROUP BY.
+
+    python -m benchmarks.query_plans
+"""
+
+import argparse
+
+from sqlalchemy import create_engine, insert
+
+from benchmarks.synthetic import make_transactions
+from src.db import queries
+from src.db.models import Transaction, create_schema
+
+# Query builder, parameters, index it must use
+CHECKS = [
+    ("user history", queries.user_history_sql(), {"user_id": 1}, "ix_transactions_user_dt"),
+    ("user count besides known IDs", queries.count_other_user_sql(), {"user_id": 1, "known_ids": [1, 2, 3]},
+     "ix_transactions_user_dt"),
+    ("last seen card", queries.last_seen_sql("card"), {"CardNumber": "41113"}, "ix_transactions_card_dt"),
+    ("last seen address", queries.last_seen_sql("address"),
+     {"User_Region": "Hebbal", "Order_Region": "Hebbal"}, "ix_transactions_address_dt"),
+    ("last seen merchant email", queries.last_seen_sql("merchant_email"),
+     {"Merchant_email": "amazon@merchant.com"}, "ix_transactions_merchant_email_dt"),
+    ("last seen device", queries.last_seen_sql("device"), {"DeviceType": "mobile"}, "ix_transactions_device_dt"),
+] + [
+    (f"all last seen {entity}", queries.last_seen_all_sql(entity), {}, index)
+    for entity, index in [("card", "ix_transactions_card_dt"), ("address", "ix_transactions_address_dt"),
+                          ("merchant_email", "ix_transactions_merchant_email_dt"), ("device", "ix_transactions_device_dt")]
+]
+
+
+def build_database(n_rows):
+    engine = create_engine("sqlite://")
+    create_schema(engine)
+    df = make_transactions(n_rows)
+    df["TransactionDT"] = df["TransactionDT"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    rows = df.to_dict(orient="records")
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction.__table__), rows)
+        conn.exec_driver_sql("ANALYZE")
+    return engine
+
+
+def uses_index(plan, index):
+    """Whether an ``EXPLAIN QUERY PLAN`` is a search on ``index`` that returns rows in index order."""
+    return (any(f"INDEX {index}" in detail and detail.startswith("SEARCH") for detail in plan)
+            and not any("TEMP B-TREE" in detail for detail in plan))
+
+
+def run(n_rows):
+    engine = build_database(n_rows)
+    failures = []
+    for name, sql, params, index in CHECKS:
+        plan = queries.explain_query_plan(engine, sql, params)
+        searched = uses_index(plan, index)
+        print(f"{'✅' if searched else '❌'} {name}: {' | '.join(plan)}")
+        if not searched:
+            failures.append(name)
+    if failures:
+        raise SystemExit(f"Queries not using their index: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    run(parser.parse_args().rows)
@@ -0,0 +1,198 @@
+"""End-to-end replay of ``data/synthetic_dataset.csv`` against the fraud check API.
+
+Transactions are sent to ``/transaction_fraud_check`` in TransactionDT order,
+by ``--clients`` concurrent clients. The target is either the app in-process
+(httpx's ASGI transport, on a throwaway SQLite database) or a running server
+given by ``--url``, e.g. one started with ``python -m src.serving.serve``.
+
+With ``--rate`` requests are paced open-loop at that many per second. Latency
+is then measured from each request's scheduled send time, so a server that
+falls behind shows it in the percentiles instead of silently slowing the
+clients down. Without ``--rate`` clients send back to back.
+
+The report gives throughput and p50/p95/p99 latency overall and split into
+fraud and non-fraud responses. The replay is also cut into ``--segments``
+consecutive slices to show how latency changes as the transactions table
+grows; against a fresh database the table holds exactly the rows replayed
+before each slice. ``--output`` writes everything as JSON, with the git
+commit, so runs can be compared across commits.
+
+    python -m benchmarks.replay --limit 3000 --clients 8 --output replay.json
+    python -m benchmarks.replay --url http://127.0.0.1:8000 --rate 200 --clients 32
+
+The CSV's empty e-mail and device fields are sent as empty strings, since the
+API requires every field.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.serving.batch_score import INPUT_COLUMNS, read_chunks
+
+PERCENTILES = (50, 95, 99)
+
+# TransactionIn fields sent as strings even where the CSV holds numbers
+STRING_FIELDS = ("CardNumber", "BINNumber", "PhoneNumbers")
+
+
+def replay_payloads(path, limit=None):
+    """Request bodies for the rows of ``path``, in TransactionDT order."""
+    df = pd.concat(read_chunks(path, chunksize=50_000), ignore_index=True)
+    df = df.sort_values("TransactionDT", kind="stable")
+    if limit:
+        df = df.head(limit)
+    df["TransactionDT"] = df["TransactionDT"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    for column in STRING_FIELDS:
+        df[column] = df[column].astype(str)
+    text_columns = [column for column in INPUT_COLUMNS if df[column].dtype == object]
+    df[text_columns] = df[text_columns].fillna("")
+    return df[list(INPUT_COLUMNS)].to_dict("records")
+
+
+def verdict(body):
+    if body.get("status") != "success":
+        return "error"
+    if "fraud_detection" in body:
+        return "fraud" if body["fraud_detection"]["is_fraud"] else "legit"
+    return "fraud" if body.get("is_fraud") else "legit"
+
+
+async def replay(client, bodies, n_clients, rate=None):
+    """Send ``bodies`` in order; returns wall time and ``(latency seconds, verdict)`` per body."""
+    results = [None] * len(bodies)
+    next_index = 0
+    start = time.perf_counter()
+
+    async def worker():
+        nonlocal next_index
+        while next_index < len(bodies):
+            i = next_index
+            next_index += 1
+            sent = time.perf_counter()
+            if rate:
+                scheduled = start + i / rate
+                if scheduled > sent:
+                    await asyncio.sleep(scheduled - sent)
+                sent = scheduled
+            response = await client.post("/transaction_fraud_check", json=bodies[i])
+            results[i] = (time.perf_counter() - sent, verdict(response.json()))
+
+    await asyncio.gather(*(worker() for _ in range(n_clients)))
+    return time.perf_counter() - start, results
+
+
+def summarize(results, elapsed=None):
+    latencies_ms = np.array([latency for latency, _ in results]) * 1000
+    summary = {"requests": len(results)}
+    if elapsed is not None:
+        summary["requests_per_s"] = round(len(results) / elapsed, 1)
+    if len(results):
+        summary.update({f"p{q}_ms": round(float(np.percentile(latencies_ms, q)), 3) for q in PERCENTILES})
+        summary["mean_ms"] = round(float(latencies_ms.mean()), 3)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(elapsed, results, segments):
+    by_verdict = {
+        name: summarize([r for r in results if r[1] == name])
+        for name in ("fraud", "legit", "error")
+    }
+    bounds = np.linspace(0, len(results), segments + 1).astype(int)
+    growth = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        if high > low:
+            growth.append({"rows_before": int(low), **summarize(results[low:high])})
+    return {"overall": summarize(results, elapsed), "by_verdict": by_verdict, "table_growth": growth}
+
+
+def print_report(result):
+    header = f"{'':>14} {'requests':>9} {'req/s':>8}" + "".join(f" {f'p{q} ms':>9}" for q in PERCENTILES)
+    print(header)
+
+    def line(name, summary):
+        rate = summary.get("requests_per_s")
+        print(f"{name:>14} {summary['requests']:>9} {rate if rate is not None else '':>8}"
+              + "".join(f" {summary.get(f'p{q}_ms', float('nan')):>9.2f}" for q in PERCENTILES))
+
+    line("all", result["overall"])
+    for name, summary in result["by_verdict"].items():
+        if summary["requests"]:
+            line(name, summary)
+    print("latency as the table grows:")
+    for segment in result["table_growth"]:
+        line(f"{segment['rows_before']} rows", segment)
+
+
+async def main_async(args, bodies):
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60,
+                                   limits=httpx.Limits(max_connections=args.clients))
+        app = None
+    else:
+        import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://replay", timeout=60)
+    async with client:
+        elapsed, results = await replay(client, bodies, args.clients, args.rate)
+    if app is not None:
+        app.stage_executor.shutdown()
+        await app.async_engine.dispose()
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/synthetic_dataset.csv")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N transactions")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="target requests/s (open loop); default: unpaced")
+    parser.add_argument("--url", default=None, help="server to replay against; default: the app in-process")
+    parser.add_argument("--segments", type=int, default=10, help="slices for latency vs table size")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    bodies = replay_payloads(args.data, args.limit)
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.url:
+            # Must be set before app.py is imported, which creates the engines
+            os.environ["FRAUD_SHIELD_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'replay.db')}"
+        elapsed, results = asyncio.run(main_async(args, bodies))
+
+    result = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"data": args.data, "limit": args.limit, "clients": args.clients, "rate": args.rate,
+                   "target": args.url or "in-process"},
+        **report(elapsed, results, args.segments),
+    }
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    errors = result["by_verdict"]["error"]["requests"]
+    if errors:
+        raise SystemExit(f"❌ {errors} of {len(results)} requests failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Per-request overhead of model input, prediction and response serialization.
+
+Compares the DataFrame path (one-row frame, rename/encode/reorder/fillna,
+``predict_proba``, recursive ``clean_floats`` and FastAPI's encoder) with the
+compiled ``FeatureLayout`` row, one booster call and direct serialization. It
+also checks that both paths build the same model input and probabilities.
+
+    python -m benchmarks.request_overhead --requests 2000
+"""
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.concurrency import payloads
+from src.models.scoring import column_mapping
+
+
+def model_input(transaction_df, feature_names, vocabularies):
+    """The DataFrame model input the endpoint used to build: rename, encode, reorder, fill."""
+    transaction_df = transaction_df.rename(columns=column_mapping)
+    for col, vocabulary in vocabularies.items():
+        if col in transaction_df.columns:
+            transaction_df[col] = transaction_df[col].map(vocabulary.encode)
+    for col in feature_names:
+        if col not in transaction_df.columns:
+            transaction_df[col] = 0
+    transaction_df = transaction_df[feature_names]
+    return transaction_df.replace([np.inf, -np.inf], np.nan).fillna(0)
+
+
+def predict_fraud_proba(model, X):
+    """Fraud-class column of the classifier's ``predict_proba``, as the endpoint used to call it."""
+    prediction_proba = model.predict_proba(X)
+    return prediction_proba[:, 1] if prediction_proba.ndim > 1 and prediction_proba.shape[1] > 1 else prediction_proba.ravel()
+
+
+def clean_floats(obj):
+    """The recursive response cleanup the endpoint used to run."""
+    if isinstance(obj, dict):
+        return {k: clean_floats(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_floats(item) for item in obj]
+    elif isinstance(obj, float):
+        return 0.0 if pd.isna(obj) or not np.isfinite(obj) else obj
+    return obj
+
+
+def per_call_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default="src/models/xgb_fraud_model.pkl")
+    args = parser.parse_args()
+
+    # The DataFrame path ran on the pickled classifier
+    with open(args.model, "rb") as model_file:
+        model = pickle.load(model_file)
+    feature_names = model.feature_names_in_
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # app.py is imported for the compiled scorer and response builder
+        os.environ["FRAUD_SHIELD_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'app.db')}"
+        import app
+
+        # Both paths encode with the artifact's vocabularies, which come from the same label encoders
+        vocabularies = app.artifact.vocabularies
+        rows = payloads(args.requests, seed=args.seed)
+        for row in rows:
+            row["Distance"] = 1.0
+
+        # Parity: same input matrix and probabilities on both paths
+        legacy_X = model_input(pd.DataFrame(rows), feature_names, vocabularies).to_numpy(np.float32)
+        X, proba, _ = app.scorer.score(rows)
+        assert np.array_equal(legacy_X, X), "model input differs"
+        assert np.allclose(predict_fraud_proba(model, pd.DataFrame(legacy_X, columns=feature_names)), proba)
+
+        top_features = app.explain_predictions(X[:1])[0]
+        transaction = app.TransactionIn(**{k: v for k, v in rows[0].items() if k in app.TransactionIn.model_fields})
+        response = app.build_response(transaction, rows[0], True, proba[0], top_features)
+
+        stages = {
+            "model input": (
+                lambda row: model_input(pd.DataFrame([row]), feature_names, vocabularies),
+                lambda row: app.scorer.layout.rows([row]),
+            ),
+            "input + predict": (
+                lambda row: predict_fraud_proba(model, model_input(pd.DataFrame([row]), feature_names, vocabularies)),
+                lambda row: app.scorer.score([row]),
+            ),
+            "serialize": (
+                lambda row: JSONResponse(jsonable_encoder(clean_floats(response))),
+                lambda row: JSONResponse(response),
+            ),
+        }
+        print(f"{'stage':>16} {'DataFrame us':>14} {'compiled us':>12} {'speedup':>8}")
+        for stage, (legacy, compiled) in stages.items():
+            legacy_us, compiled_us = per_call_us(legacy, rows), per_call_us(compiled, rows)
+            print(f"{stage:>16} {legacy_us:>14.1f} {compiled_us:>12.1f} {legacy_us / compiled_us:>7.1f}x")
+        app.stage_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Trials and wall time of a retrain's Optuna search with stored, warm-started studies (src/models/tuning.py).
+
+On model.py's data from ``--rows`` generated rows (or with 0 the sample CSV),
+in a temporary SQLite storage:
+
+1. initial: a full ``--trials`` sweep on January to November, stored;
+2. cold: a full sweep on January to December, in memory, as every retrain
+   used to run;
+3. warm: the same data in the storage. Its new study is seeded with the best
+   trials of the initial one and stops once ``--patience`` trials went by
+   without improvement;
+4. resumed: the same data again, which resumes the warm study and stops after
+   a trial or so.
+
+Fails if the best AUC of a retrain falls more than ``--auc-tolerance`` below
+the cold sweep's. The sample CSV's 2.7k validation rows are too few for that:
+there, full sweeps from different seeds already differ by about 0.003.
+
+    python -m benchmarks.retrain_tuning --trials 50 --patience 10
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import optuna
+
+from benchmarks.hyperparameter_tuning import training_data
+from src.models.tuning import create_study, open_study, tune
+
+FINISHED = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED, optuna.trial.TrialState.FAIL)
+FIRST_MONTHS = [f"2024-{month:02d}" for month in range(1, 12)]
+ALL_MONTHS = FIRST_MONTHS + ["2024-12"]
+
+
+def run(name, split, trials, seed, storage, patience):
+    start = time.perf_counter()
+    if storage:
+        study, warm_start = open_study(split[0], split[2], storage=storage, seed=seed)
+    else:
+        study, warm_start = create_study(seed), None
+    # Enqueued warm-start trials are in study.trials as WAITING until they run
+    before = len(study.get_trials(deepcopy=False, states=FINISHED))
+    tune(*split, n_trials=trials, workers=1, study=study, patience=patience)
+    seconds = time.perf_counter() - start
+    how = f"from {warm_start}" if warm_start else (f"resumed at {before}" if before else "new")
+    print(f"{name:>8} {study.study_name if storage else 'in memory':>27} {how:>36} "
+          f"{len(study.trials) - before:>7} {seconds:>8.1f} {study.best_value:>9.5f}")
+    return seconds, study.best_value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--patience", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=100_000, help="generated rows; 0 for the sample CSV")
+    parser.add_argument("--seed", type=int, default=53)
+    parser.add_argument("--auc-tolerance", type=float, default=0.002)
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    first, retrain = training_data(args.rows, FIRST_MONTHS), training_data(args.rows, ALL_MONTHS)
+    with tempfile.TemporaryDirectory() as directory:
+        storage = f"sqlite:///{os.path.join(directory, 'studies.db')}"
+        print(f"{'run':>8} {'study':>27} {'start':>36} {'trials':>7} {'seconds':>8} {'best AUC':>9}")
+        run("initial", first, args.trials, args.seed, storage, None)
+        cold_s, cold_auc = run("cold", retrain, args.trials, args.seed, None, None)
+        for name in ("warm", "resumed"):
+            seconds, best = run(name, retrain, args.trials, args.seed, storage, args.patience)
+            if best < cold_auc - args.auc_tolerance:
+                raise SystemExit(f"❌ {name}: best AUC {best:.5f} is more than {args.auc_tolerance} below the "
+                                 f"cold sweep's {cold_auc:.5f}")
+            print(f"   {cold_s / seconds:.1f}x faster than the cold sweep")
+    print(f"✅ Retrains within {args.auc_tolerance} of the cold sweep's best AUC")
+
+
+if __name__ == "__main__":
+    main()
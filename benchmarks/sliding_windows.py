@@ -0,0 +1,163 @@
+"""Parity and cost of the ring-buffer windows in src/features/windows.py.
+
+1. Parity: streams with late arrivals are pushed through a ``RingWindow`` of
+   every length in ``WINDOW_LENGTHS`` (30s, 1h, 24h, 7d). After each push,
+   count and sum are compared with a brute-force filter of all entries.
+2. Per-transaction cost of the 24h E9/E10 window, as the user's history grows:
+   the ring, the sorted list plus ``bisect`` that ``UserFeatureState`` used
+   before, and the legacy pandas ``groupby().apply()`` filter over the whole
+   history. Also the cost of keeping all four windows at once.
+3. The generator notebook's trailing 24h sum per card, nested ``iterrows``
+   against ``KeyedWindows``.
+
+    python -m benchmarks.sliding_windows --sizes 100 1000 10000 100000
+"""
+
+import argparse
+import bisect
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.windows import WINDOW_LENGTHS, KeyedWindows, RingWindow, SlidingWindows
+
+NS_PER_SECOND = 1_000_000_000
+DAY_NS = WINDOW_LENGTHS["24h"]
+
+
+def stream(n, seed=0, late_fraction=0.05):
+    """``n`` (timestamp_ns, amount) pairs about a minute apart, a fraction of them arriving late."""
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.exponential(60, n)) * NS_PER_SECOND
+    late = rng.random(n) < late_fraction
+    times[late] -= rng.exponential(3600, late.sum()) * NS_PER_SECOND
+    amounts = np.round(rng.lognormal(6, 1, n), 2)
+    return [(int(t), float(a)) for t, a in zip(times, amounts)]
+
+
+def check_parity(n, seed):
+    entries = stream(n, seed)
+    for name, length_ns in WINDOW_LENGTHS.items():
+        window = RingWindow(length_ns)
+        newest = None
+        for i, (t, amount) in enumerate(entries):
+            window.push(t, amount)
+            newest = t if newest is None else max(newest, t)
+            # Brute force: entries pushed so far that were within the window when they arrived
+            # and are still within it now
+            kept = [a for j, (tj, a) in enumerate(entries[:i + 1])
+                    if tj >= newest - length_ns and tj >= max(e for e, _ in entries[:j + 1]) - length_ns]
+            if window.count != len(kept) or not math.isclose(window.total, sum(kept), rel_tol=1e-9, abs_tol=1e-6):
+                raise SystemExit(f"❌ {name} window differs after {i + 1} entries: "
+                                 f"{window.count}/{window.total} vs {len(kept)}/{sum(kept)}")
+
+
+class SortedListWindow:
+    """The 24h window UserFeatureState kept before: sorted list, insort and slice deletion."""
+
+    def __init__(self, length_ns):
+        self.length_ns = length_ns
+        self.max_ns = None
+        self.window = []
+        self.window_sum = 0.0
+
+    def push(self, now_ns, amount):
+        if self.max_ns is None or now_ns > self.max_ns:
+            self.max_ns = now_ns
+        threshold = self.max_ns - self.length_ns
+        if now_ns >= threshold:
+            bisect.insort(self.window, (now_ns, amount))
+            self.window_sum += amount
+        expired = bisect.bisect_left(self.window, (threshold, float("-inf")))
+        if expired:
+            self.window_sum -= sum(a for _, a in self.window[:expired])
+            del self.window[:expired]
+
+
+def legacy_window_mean(history):
+    """E9 as the per-request DataFrame code computed it, over the full history."""
+    window_24h = history.groupby("User_ID", group_keys=False).apply(
+        lambda x: x[x["TransactionDT"] >= x["TransactionDT"].max() - pd.Timedelta(hours=24)])
+    return window_24h["TransactionAmt"].mean()
+
+
+def per_push_us(make, entries):
+    window = make()
+    start = time.perf_counter()
+    for t, amount in entries:
+        window.push(t, amount)
+    return (time.perf_counter() - start) / len(entries) * 1e6
+
+
+def notebook_trailing_sums(df):
+    """The generator notebook's E9 input: per card, the sum of amounts in the 24h up to each row."""
+    sums = pd.Series(0.0, index=df.index)
+    for _, group in df.groupby("CardNumber"):
+        values = []
+        for _, row in group.iterrows():
+            threshold = row["TransactionDT"] - pd.Timedelta(hours=24)
+            values.append(group[(group["TransactionDT"] >= threshold)
+                                & (group["TransactionDT"] <= row["TransactionDT"])]["TransactionAmt"].sum())
+        sums[group.index] = values
+    return sums.to_numpy()
+
+
+def keyed_trailing_sums(df):
+    windows = KeyedWindows({"24h": DAY_NS})
+    return np.array([
+        windows.push(card, t, amount)["24h"].total
+        for card, t, amount in zip(df["CardNumber"], df["TransactionDT"].to_numpy().astype(np.int64),
+                                   df["TransactionAmt"])
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--parity-rows", type=int, default=400)
+    parser.add_argument("--notebook-rows", type=int, default=3000)
+    parser.add_argument("--legacy-max", type=int, default=10000, help="largest history for the pandas filter")
+    args = parser.parse_args()
+
+    for seed in range(3):
+        check_parity(args.parity_rows, seed)
+    print(f"✅ Ring windows match a brute-force filter for {', '.join(WINDOW_LENGTHS)}")
+
+    print(f"{'history':>8} {'ring us':>9} {'4 rings us':>11} {'sorted us':>10} {'pandas us':>11}")
+    for n in args.sizes:
+        entries = stream(n, seed=n)
+        ring = per_push_us(lambda: RingWindow(DAY_NS), entries)
+        all_windows = per_push_us(lambda: SlidingWindows(WINDOW_LENGTHS), entries)
+        sorted_list = per_push_us(lambda: SortedListWindow(DAY_NS), entries)
+        pandas_us = float("nan")
+        if n <= args.legacy_max:
+            history = pd.DataFrame({"User_ID": 1, "TransactionDT": pd.to_datetime([t for t, _ in entries]),
+                                    "TransactionAmt": [a for _, a in entries]})
+            start = time.perf_counter()
+            legacy_window_mean(history)
+            pandas_us = (time.perf_counter() - start) * 1e6
+        print(f"{n:>8} {ring:>9.2f} {all_windows:>11.2f} {sorted_list:>10.2f} {pandas_us:>11.0f}")
+
+    rng = np.random.default_rng(0)
+    n = args.notebook_rows
+    # Distinct timestamps, so "up to each row" is the same for both implementations
+    offsets = np.sort(rng.choice(90 * 86400, n, replace=False))
+    df = pd.DataFrame({"CardNumber": rng.integers(0, max(1, n // 100), n),
+                       "TransactionDT": pd.Timestamp("2024-01-01") + pd.to_timedelta(offsets, unit="s"),
+                       "TransactionAmt": np.round(rng.lognormal(6, 1, n), 2)})
+    start = time.perf_counter()
+    expected = notebook_trailing_sums(df)
+    notebook_s = time.perf_counter() - start
+    start = time.perf_counter()
+    got = keyed_trailing_sums(df)
+    keyed_s = time.perf_counter() - start
+    if not np.allclose(expected, got):
+        raise SystemExit("❌ KeyedWindows trailing sums differ from the notebook's")
+    print(f"notebook E9 sums, {n} rows: iterrows {notebook_s * 1e3:.0f} ms, "
+          f"KeyedWindows {keyed_s * 1e3:.1f} ms ({notebook_s / keyed_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cold start of the API against a time budget.
+
+Imports ``app`` in ``--runs`` fresh interpreters (on an empty temporary
+database) and reports the median time of each stage recorded by
+``src/serving/startup.py``, plus the whole process wall time. Exits non-zero
+if the median start-up exceeds ``--budget-ms``, or if a module that serving
+must not load eagerly (sklearn, shap, geopy, ...) was imported.
+
+    python -m benchmarks.startup_time --runs 5 --budget-ms 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Must not be imported by `import app`: training-only dependencies, and geopy,
+# which src/features/distance.py loads on the first lookup
+LAZY_MODULES = ("sklearn", "shap", "scipy.stats", "geopy", "joblib")
+BUDGET_MS = 2000.0
+
+PROBE = """
+import json, sys
+import app
+print(json.dumps({**app.startup.as_dict(), "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def start_once(tmp, run):
+    env = dict(os.environ, FRAUD_SHIELD_DATABASE_URL=f"sqlite:///{os.path.join(tmp, f'startup_{run}.db')}")
+    env.pop("FRAUD_SHIELD_STARTUP_PROFILE", None)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    profile["wall_ms"] = wall * 1000
+    return profile
+
+
+def profile_startup(runs):
+    """Start-up profiles of ``runs`` fresh interpreters importing ``app``."""
+    with tempfile.TemporaryDirectory() as tmp:
+        return [start_once(tmp, run) for run in range(runs)]
+
+
+def failures(profiles, budget_ms=BUDGET_MS):
+    """What is wrong with a start-up: modules loaded eagerly, a median over ``budget_ms``."""
+    problems = []
+    loaded = sorted({module for p in profiles for module in p["loaded"]})
+    if loaded:
+        problems.append(f"Start-up imported modules it should load lazily or never: {', '.join(loaded)}")
+    total = statistics.median(p["total_ms"] for p in profiles)
+    if total > budget_ms:
+        problems.append(f"Start-up took {total:.1f} ms, over the {budget_ms:.0f} ms budget")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="allowed median import + init time")
+    args = parser.parse_args()
+
+    profiles = profile_startup(args.runs)
+
+    print(f"{'stage':<28} {'median ms':>10}")
+    for i, stage in enumerate(profiles[0]["stages"]):
+        print(f"{stage['stage']:<28} {statistics.median(p['stages'][i]['ms'] for p in profiles):>10.1f}")
+    total = statistics.median(p["total_ms"] for p in profiles)
+    print(f"{'import + init':<28} {total:>10.1f}")
+    print(f"{'process wall time':<28} {statistics.median(p['wall_ms'] for p in profiles):>10.1f}")
+
+    problems = failures(profiles, args.budget_ms)
+    if problems:
+        raise SystemExit("❌ " + "\n❌ ".join(problems))
+    print(f"✅ Start-up within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Accuracy and cost of the streaming E6/E8 estimators in src/features/streaming.py.
+
+1. Exactness: ``TwoHeapMedian`` against the sorted list ``UserFeatureState``
+   kept before, and ``RunningMoments`` against ``numpy.std(ddof=1)``, after
+   every value of streams with ties, zeros and negative amounts.
+2. Error bound: after every value past the switch to ``MedianSketch``, the
+   relative error of ``StreamingMedian`` against the exact median, checked
+   against ``--accuracy``, for several amount distributions.
+3. Per-transaction cost (push plus query) as the history grows: the legacy
+   pandas ``std()`` plus ``median()`` over the whole history, the sorted list
+   plus ``bisect.insort``, the two heaps, and the sketch. Also the memory each
+   estimator holds once it has seen the whole stream.
+
+    python -m benchmarks.streaming_stats --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import bisect
+import math
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.features.streaming import MedianSketch, RunningMoments, StreamingMedian, TwoHeapMedian
+
+
+def amounts(n, seed=0, kind="lognormal"):
+    rng = np.random.default_rng(seed)
+    if kind == "lognormal":
+        values = np.round(rng.lognormal(6, 1.5, n), 2)
+    elif kind == "uniform":
+        values = np.round(rng.uniform(0.01, 5000, n), 2)
+    elif kind == "refunds":
+        # Mostly purchases, some refunds (negative) and zero-amount checks
+        values = np.round(rng.lognormal(5, 1, n), 2)
+        values[rng.random(n) < 0.2] *= -1
+        values[rng.random(n) < 0.05] = 0.0
+    elif kind == "ties":
+        values = rng.choice([9.99, 19.99, 49.99, 100.0, 250.0], n)
+    else:
+        raise ValueError(kind)
+    return values.tolist()
+
+
+class SortedListMedian:
+    """The median UserFeatureState kept before: sorted list and ``bisect.insort``."""
+
+    def __init__(self):
+        self.values = []
+
+    def push(self, value):
+        bisect.insort(self.values, value)
+
+    def median(self):
+        n = len(self.values)
+        mid = n // 2
+        return self.values[mid] if n % 2 else (self.values[mid - 1] + self.values[mid]) / 2
+
+
+def check_exact(n):
+    for kind in ("lognormal", "refunds", "ties"):
+        values = amounts(n, seed=n, kind=kind)
+        heaps, sorted_list, moments = TwoHeapMedian(), SortedListMedian(), RunningMoments()
+        for i, value in enumerate(values):
+            heaps.push(value)
+            sorted_list.push(value)
+            moments.push(value)
+            if heaps.median() != sorted_list.median():
+                raise SystemExit(f"❌ Two-heap median differs on {kind} after {i + 1} values")
+            expected = float(np.std(values[:i + 1], ddof=1)) if i else 0.0
+            if not math.isclose(moments.std, expected, rel_tol=1e-9, abs_tol=1e-9):
+                raise SystemExit(f"❌ Welford std differs on {kind} after {i + 1} values: {moments.std} vs {expected}")
+
+
+def sketch_error(n, exact_limit, accuracy, kind):
+    """Largest relative error of the streaming median past ``exact_limit``, and the sketch's bucket count."""
+    values = amounts(n, seed=1, kind=kind)
+    streaming, exact = StreamingMedian(exact_limit, accuracy), TwoHeapMedian()
+    worst = 0.0
+    for value in values:
+        streaming.push(value)
+        exact.push(value)
+        expected, got = exact.median(), streaming.median()
+        if expected:
+            worst = max(worst, abs(got - expected) / abs(expected))
+        elif got:
+            worst = math.inf
+    if streaming.exact:
+        raise SystemExit(f"❌ {kind}: never switched to the sketch")
+    return worst, streaming._estimator.buckets
+
+
+def per_transaction_us(make, values, max_seconds):
+    """Mean microseconds per push plus median query, over at most ``max_seconds``."""
+    estimator = make()
+    start = time.perf_counter()
+    for i, value in enumerate(values):
+        estimator.push(value)
+        estimator.median()
+        if i % 1024 == 0 and time.perf_counter() - start > max_seconds:
+            return (time.perf_counter() - start) / (i + 1) * 1e6
+    return (time.perf_counter() - start) / len(values) * 1e6
+
+
+def pandas_us(values, history):
+    """Legacy cost: ``std()`` and ``median()`` over a ``history``-row Series, for one transaction."""
+    series = pd.Series(values[:history])
+    calls = max(1, min(200, 2_000_000 // history))
+    start = time.perf_counter()
+    for _ in range(calls):
+        series.std()
+        series.median()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def held_kib(make, values):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        estimator = make()
+        for value in values:
+            estimator.push(value)
+        return (tracemalloc.get_traced_memory()[0] - before) / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--exact-rows", type=int, default=2000, help="stream length for the exactness checks")
+    parser.add_argument("--error-rows", type=int, default=50000, help="stream length for the error-bound check")
+    parser.add_argument("--exact-limit", type=int, default=1000, help="switch point for the error-bound check")
+    parser.add_argument("--accuracy", type=float, default=0.005)
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="time limit per estimator and size")
+    args = parser.parse_args()
+
+    check_exact(args.exact_rows)
+    print(f"✅ Two-heap median and Welford std match the sorted list and numpy over {args.exact_rows} values")
+
+    for kind in ("lognormal", "uniform", "refunds", "ties"):
+        worst, buckets = sketch_error(args.error_rows, args.exact_limit, args.accuracy, kind)
+        # A little slack for the rounding of gamma ** i
+        if worst > args.accuracy * (1 + 1e-9):
+            raise SystemExit(f"❌ {kind}: median error {worst:.4%} exceeds {args.accuracy:.2%}")
+        print(f"✅ {kind:<9} sketch median error at most {worst:.4%} (bound {args.accuracy:.2%}), {buckets} buckets")
+
+    print(f"{'history':>9} {'pandas us':>10} {'sorted us':>10} {'heaps us':>9} {'sketch us':>10} "
+          f"{'sorted KiB':>11} {'heaps KiB':>10} {'sketch KiB':>11}")
+    estimators = {
+        "sorted": SortedListMedian,
+        "heaps": TwoHeapMedian,
+        "sketch": lambda: MedianSketch(args.accuracy),
+    }
+    for n in args.sizes:
+        values = amounts(n, seed=n)
+        costs = {name: per_transaction_us(make, values, args.max_seconds) for name, make in estimators.items()}
+        memory = {name: held_kib(make, values) for name, make in estimators.items()}
+        print(f"{n:>9} {pandas_us(values, n):>10.1f} {costs['sorted']:>10.2f} {costs['heaps']:>9.2f} "
+              f"{costs['sketch']:>10.2f} {memory['sorted']:>11.0f} {memory['heaps']:>10.0f} {memory['sketch']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
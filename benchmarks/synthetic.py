@@ -0,0 +1,50 @@
+"""Synthetic transactions shaped like ``TransactionIn`` for benchmarks."""
+
+import numpy as np
+import pandas as pd
+
+from src.features.distance import bengaluru_regions
+
+REGIONS = list(bengaluru_regions)
+PRODUCTS = ['Consumable', 'Household', 'Miscellaneous', 'Retail', 'Services', 'Wallet']
+MERCHANTS = ['Amazon', 'Flipkart', 'Ajio', 'BigBasket', 'Croma', 'DMart', 'IKEA', 'Zepto']
+DEVICES = [('mobile', 'Samsung'), ('mobile', 'iOS Device'), ('desktop', 'Windows'), ('desktop', 'MacOS')]
+
+
+def make_transactions(n_rows, n_users=None, seed=0, start="2024-01-01"):
+    """``n_rows`` transactions for ``n_users`` users (default ``n_rows // 50``), in time order."""
+    rng = np.random.default_rng(seed)
+    n_users = n_users or max(1, n_rows // 50)
+    users = rng.integers(0, n_users, n_rows)
+    # Each user keeps a small set of cards, regions and devices so the grouped features are non-trivial
+    cards = users * 3 + rng.integers(0, 3, n_rows)
+    home = rng.integers(0, len(REGIONS), n_users)
+    user_region = np.where(rng.random(n_rows) < 0.9, home[users], rng.integers(0, len(REGIONS), n_rows))
+    order_region = np.where(rng.random(n_rows) < 0.7, user_region, rng.integers(0, len(REGIONS), n_rows))
+    receiver_region = np.where(rng.random(n_rows) < 0.7, order_region, rng.integers(0, len(REGIONS), n_rows))
+    device = rng.integers(0, len(DEVICES), n_rows)
+    merchant = rng.integers(0, len(MERCHANTS), n_rows)
+    offsets = np.sort(rng.integers(0, 90 * 86400, n_rows))
+    regions = np.array(REGIONS, dtype=object)
+    merchants = np.array(MERCHANTS, dtype=object)
+    return pd.DataFrame({
+        'TransactionID': np.arange(1, n_rows + 1),
+        'TransactionAmt': np.round(rng.lognormal(6, 1, n_rows), 2),
+        'TransactionDT': pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s'),
+        'ProductCD': np.array(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), n_rows)],
+        'User_ID': users,
+        'Merchant': merchants[merchant],
+        'CardNumber': np.char.add('4111', cards.astype(str)).astype(object),
+        'BINNumber': '411111',
+        'CardNetwork': np.array(['Visa', 'Mastercard', 'Rupay'], dtype=object)[cards % 3],
+        'CardTier': np.array(['Silver', 'Gold', 'Platinum', 'Black'], dtype=object)[cards % 4],
+        'CardType': np.array(['Debit', 'Credit'], dtype=object)[cards % 2],
+        'PhoneNumbers': np.char.add('+91 9', users.astype(str)).astype(object),
+        'User_Region': regions[user_region],
+        'Order_Region': regions[order_region],
+        'Receiver_Region': regions[receiver_region],
+        'Sender_email': np.char.add(users.astype(str), '@gmail.com').astype(object),
+        'Merchant_email': np.char.add(np.char.lower(merchants[merchant].astype(str)), '@merchant.com').astype(object),
+        'DeviceType': np.array([d for d, _ in DEVICES], dtype=object)[device],
+        'DeviceInfo': np.array([i for _, i in DEVICES], dtype=object)[device],
+    })
@@ -0,0 +1,150 @@
+"""Load time and peak memory of training data: the CSV export vs the columnar store of src/data/store.py.
+
+For ``data/synthetic_dataset.csv`` and a generated file of each of ``--sizes``
+rows, written out as CSV:
+
+1. Converts the CSV into a store and checks it against the CSV: the model's
+   columns label-encoded from the store's categories (``category_codes``)
+   equal ``LabelEncoder`` over the CSV strings, row by row, with the same
+   classes, and numeric columns are equal.
+2. In a fresh process per path and size, times the load of the model's
+   columns plus ``isFraud`` up to encoded features, and reports peak RSS:
+   ``pd.read_csv`` of the whole file with ``LabelEncoder`` (what model.py
+   did) vs ``read_store`` of just those columns with ``category_codes``.
+
+    python -m benchmarks.training_store --sizes 1000000 5000000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from sklearn.preprocessing import LabelEncoder
+
+from src.data.generator import ROWS_PER_USER, generate
+from src.data.store import category_codes, column_mapping, convert_to_store, read_store
+from src.models.encoders import MISSING_TOKEN
+
+SAMPLE_CSV = "data/synthetic_dataset.csv"
+# The serving artifact's features
+MODEL_COLUMNS = ["TransactionAmt", "ProductCD", "CardNetwork", "CardTier", "CardType",
+                 "User_Region", "Order_Region", "Receiver_Region", "DeviceType"]
+
+
+def peak_rss_mib():
+    # VmHWM rather than ru_maxrss, which a spawned process inherits from its parent across exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_csv(path, columns):
+    """The CSV path: the whole file, then LabelEncoder over the strings of the model's categorical columns."""
+    df = pd.read_csv(path)
+    df.columns = [column_mapping(df.columns)[name] for name in df.columns]
+    encoded = {}
+    classes = {}
+    for column in columns:
+        values = df[column]
+        if values.dtype == object:
+            encoder = LabelEncoder()
+            encoded[column] = encoder.fit_transform(values.fillna(MISSING_TOKEN).astype(str))
+            classes[column] = list(encoder.classes_)
+        else:
+            encoded[column] = values.to_numpy()
+    return pd.DataFrame(encoded), classes
+
+
+def load_store(root, columns):
+    """The store path: only the model's columns, encoded from their categories."""
+    df = read_store(root, columns=columns)
+    encoded = {}
+    classes = {}
+    for column in columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            encoded[column], classes[column] = category_codes(values, MISSING_TOKEN)
+        else:
+            encoded[column] = values.to_numpy()
+    return pd.DataFrame(encoded), classes
+
+
+def timed_load(kind, path):
+    """Run one load in this (fresh) process; seconds, peak RSS before and after, rows."""
+    before = peak_rss_mib()
+    start = time.perf_counter()
+    x, _ = (load_csv if kind == "csv" else load_store)(path, MODEL_COLUMNS + ["isFraud"])
+    return time.perf_counter() - start, before, peak_rss_mib(), len(x)
+
+
+def check_store(csv_path, root):
+    columns = ["TransactionID"] + MODEL_COLUMNS + ["isFraud"]
+    expected, expected_classes = load_csv(csv_path, columns)
+    actual, actual_classes = load_store(root, columns)
+    if expected_classes != actual_classes:
+        different = [c for c in expected_classes if expected_classes[c] != actual_classes.get(c)]
+        raise SystemExit(f"❌ {csv_path}: classes differ from LabelEncoder for {different}")
+    expected = expected.set_index("TransactionID").sort_index()
+    actual = actual.set_index("TransactionID").sort_index()
+    try:
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    except AssertionError as error:
+        raise SystemExit(f"❌ {csv_path}: encoded store columns differ from the CSV: {error}")
+    print(f"✅ {csv_path}: {len(actual):,} rows encoded from the store equal LabelEncoder over the CSV")
+
+
+def write_csv(path, rows, directory):
+    parquet = os.path.join(directory, f"generated-{rows}.parquet")
+    generate(parquet, max(1, round(rows / ROWS_PER_USER)), seed=rows, workers=1)
+    pacsv.write_csv(pq.read_table(parquet), path)
+    os.remove(parquet)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1_000_000], help="rows of generated files")
+    parser.add_argument("--directory", default=None, help="where to write the files (default: a temporary one)")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        sources = [SAMPLE_CSV]
+        for rows in args.sizes:
+            sources.append(os.path.join(directory, f"generated-{rows}.csv"))
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                pool.submit(write_csv, sources[-1], rows, directory).result()
+
+        lines = []
+        for source in sources:
+            root = os.path.join(directory, os.path.basename(source) + ".store")
+            start = time.perf_counter()
+            convert_to_store(source, root)
+            convert_s = time.perf_counter() - start
+            check_store(source, root)
+            store_mib = sum(os.path.getsize(os.path.join(d, name)) for d, _, names in os.walk(root)
+                            for name in names) / 2**20
+            results = {}
+            for kind, path in (("csv", source), ("store", root)):
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    results[kind] = pool.submit(timed_load, kind, path).result()
+            (csv_s, base, csv_peak, rows), (store_s, _, store_peak, _) = results["csv"], results["store"]
+            lines.append(f"{rows:>11,} {os.path.getsize(source) / 2**20:>8.0f} {store_mib:>10.0f} {convert_s:>10.1f} "
+                         f"{csv_s:>7.2f} {store_s:>8.2f} {csv_s / store_s:>7.1f}x {csv_peak:>9.0f} {store_peak:>11.0f} "
+                         f"{base:>6.0f}")
+        print(f"{'rows':>11} {'csv MiB':>8} {'store MiB':>10} {'convert s':>10} {'csv s':>7} {'store s':>8} "
+              f"{'speedup':>8} {'csv peak':>9} {'store peak':>11} {'base':>6}")
+        print("\n".join(lines))
+        print("peak and base: peak RSS in MiB of the loading process, after the load and before it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Wall time and best validation AUC of the pruned, parallel Optuna search for each XGBoost thread count per trial.
+
+``FRAUD_SHIELD_TUNING_THREADS`` splits the cores between concurrent trials
+and XGBoost threads within a trial (``tuning_workers``). For each
+``--threads`` value, the search of src/models/tuning.py runs ``--trials``
+trials from the same TPE seed with ``cores // threads`` concurrent trials of
+``threads`` threads each, on model.py's data (see
+benchmarks/hyperparameter_tuning.py). With 1 thread per trial every core runs
+its own trial; with all cores in one trial the trials run one at a time.
+
+Fails if the best AUC of a split falls more than ``--auc-tolerance`` below
+that of 1 thread per trial; the speedup is against 1 thread per trial too.
+
+    python -m benchmarks.trial_threads --trials 50 --threads 1 2 4
+"""
+
+import argparse
+import os
+
+import optuna
+
+from benchmarks.hyperparameter_tuning import run, training_data
+from src.models.tuning import TRIAL_THREADS, tuning_workers
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, TRIAL_THREADS, cores}),
+                        help="XGBoost threads per trial to compare (default: 1, the default split and all cores)")
+    parser.add_argument("--rows", type=int, default=0, help="generated rows instead of the sample CSV")
+    parser.add_argument("--seed", type=int, default=53)
+    parser.add_argument("--auc-tolerance", type=float, default=0.002)
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    split = training_data(args.rows)
+    print(f"{len(split[0]):,} training rows, {len(split[1]):,} validation rows, {args.trials} trials, {cores} cores")
+    print(f"{'threads':>7} {'trials at a time':>16} {'seconds':>8} {'speedup':>8} {'best AUC':>9} {'pruned':>7}")
+    baseline = None
+    results = {}
+    # Thread counts above the core count end up as the same split
+    splits = sorted({tuning_workers(threads=threads, cores=cores) for threads in [1, *args.threads]},
+                    key=lambda pair: pair[1])
+    for workers, threads in splits:
+        seconds, best, n_pruned = run("parallel", split, args.trials, args.seed, True, workers, threads)
+        baseline = baseline or (seconds, best)
+        results[threads] = seconds
+        default = " (default)" if threads == min(TRIAL_THREADS, cores) else ""
+        print(f"{threads:>7} {workers:>16} {seconds:>8.1f} {baseline[0] / seconds:>7.1f}x {best:>9.5f} "
+              f"{n_pruned:>7}{default}")
+        if best < baseline[1] - args.auc_tolerance:
+            raise SystemExit(f"❌ {threads} threads per trial: best AUC {best:.5f} is more than {args.auc_tolerance} "
+                             f"below 1 thread per trial's {baseline[1]:.5f}")
+    fastest = min(results, key=results.get)
+    print(f"✅ Best AUC of every split within {args.auc_tolerance} of 1 thread per trial; fastest: {fastest} "
+          f"threads per trial")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Parity check and speedup report for the E2/E3/E11/E12/M4/M9 columns of src/features/engineered.py.
+
+Compares the columns ``user_features`` computes against the row-wise
+``apply`` code they replace, on synthetic histories of increasing size. The
+features are as of each row, so:
+
+- E11/E12 look the row up in the user's hour and region tables, which hold
+  the row itself (always 0, as before);
+- M4 compares the row's device with the user's most frequent one so far,
+  counted row by row;
+- M9 sums M4, M6 (device differs from the user's previous row), M8 (order
+  region differs from the user's region) and the amount against 1.5 times
+  the user's median so far (E8), each computed row by row from the raw
+  columns.
+
+Nothing in the reference is taken from ``user_features``.
+
+The vectorized time is the whole of ``user_features``, which computes every
+per-user feature, so the reported speedup is a lower bound.
+
+    python -m benchmarks.vectorized_features --sizes 1000 10000 100000
+"""
+
+import argparse
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_transactions
+from src.features.engineered import user_features
+
+COLUMNS = ("TransactionTimeSlot_E2", "HourWithinSlot_E3", "TimingAnomaly_E11", "RegionAnomaly_E12",
+           "DeviceMatching_M4", "TransactionConsistency_M9")
+
+
+def legacy_features(df):
+    """The row-wise implementations as they were in app.py / feature_engineering.py, as of each row, from the raw
+    columns of ``df`` only."""
+    out = {}
+    out['TransactionTimeSlot_E2'] = df['TransactionDT'].apply(lambda x: (
+        0 if 10 <= x.hour < 14 else
+        1 if 14 <= x.hour < 18 else
+        2 if 18 <= x.hour < 22 else
+        3 if x.hour >= 22 or x.hour < 2 else
+        4 if 2 <= x.hour < 6 else 5
+    ))
+    out['HourWithinSlot_E3'] = df['TransactionDT'].apply(lambda x: (
+        x.hour - 10 if 10 <= x.hour < 14 else
+        x.hour - 14 if 14 <= x.hour < 18 else
+        x.hour - 18 if 18 <= x.hour < 22 else
+        (x.hour - 22) if x.hour >= 22 else (x.hour + 2) if x.hour < 2 else
+        x.hour - 2 if 2 <= x.hour < 6 else
+        x.hour - 6
+    ))
+    df = df.assign(HourWithinSlot_E3=out['HourWithinSlot_E3'])
+    user_hour_freq = df.groupby(['User_ID', 'HourWithinSlot_E3']).size().reset_index(name='count')
+    out['TimingAnomaly_E11'] = df.apply(
+        lambda row: 1 if row['HourWithinSlot_E3'] not in user_hour_freq[user_hour_freq['User_ID'] == row['User_ID']]['HourWithinSlot_E3'].values else 0, axis=1
+    )
+    user_region_freq = df.groupby(['User_ID', 'Order_Region']).size().reset_index(name='count')
+    out['RegionAnomaly_E12'] = df.apply(
+        lambda row: 1 if row['Order_Region'] not in user_region_freq[user_region_freq['User_ID'] == row['User_ID']]['Order_Region'].values else 0, axis=1
+    )
+    # Per user so far: device counts (M4, the mode with ties broken by the smallest value like Series.mode()),
+    # previous device (M6) and amounts (E8)
+    devices_so_far = defaultdict(Counter)
+    previous_device = {}
+    amounts_so_far = defaultdict(list)
+    matching, mismatch, region_mismatch, median = [], [], [], []
+    for user, device, amount, user_region, order_region in zip(
+            df['User_ID'], df['DeviceType'], df['TransactionAmt'], df['User_Region'], df['Order_Region']):
+        counts = devices_so_far[user]
+        counts[device] += 1
+        top = max(counts.values())
+        matching.append(1 if device == min(d for d, c in counts.items() if c == top) else 0)
+        mismatch.append(0 if previous_device.get(user) == device else 1)
+        previous_device[user] = device
+        region_mismatch.append(0 if order_region == user_region else 1)
+        amounts_so_far[user].append(amount)
+        median.append(statistics.median(amounts_so_far[user]))
+    out['DeviceMatching_M4'] = matching
+    df = df.assign(DeviceMatching_M4=matching, DeviceMismatch_M6=mismatch, RegionMismatch_M8=region_mismatch,
+                   MedianTransactionAmount_E8=median)
+    out['TransactionConsistency_M9'] = df.apply(
+        lambda row: sum([
+            row['DeviceMatching_M4'],
+            1 - row['DeviceMismatch_M6'],
+            1 - row['RegionMismatch_M8'],
+            1 if row['TransactionAmt'] <= row['MedianTransactionAmount_E8'] * 1.5 else 0
+        ]), axis=1
+    )
+    return out
+
+
+def prepare(n_rows, seed=0):
+    """Synthetic history in TransactionDT order."""
+    return make_transactions(n_rows, seed=seed).sort_values('TransactionDT', kind='stable').reset_index(drop=True)
+
+
+def run(sizes, repeat=3):
+    rows = []
+    for n_rows in sizes:
+        df = prepare(n_rows)
+        vectorized_s = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            features = user_features(df)
+            vectorized_s = min(vectorized_s, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected = legacy_features(df)
+        legacy_s = time.perf_counter() - start
+
+        for name in COLUMNS:
+            if not np.array_equal(np.asarray(expected[name]), features[name].to_numpy()):
+                raise AssertionError(f"{name} differs from the row-wise implementation at {n_rows} rows")
+        rows.append({'rows': n_rows, 'legacy_s': legacy_s, 'vectorized_s': vectorized_s,
+                     'speedup': legacy_s / vectorized_s})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    report = run(args.sizes, args.repeat)
+    print("✅ Vectorized features match the row-wise implementation")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
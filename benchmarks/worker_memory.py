@@ -0,0 +1,171 @@
+"""Per-worker memory of ``python -m src.serving.serve`` as the worker count grows.
+
+Starts the server with 1, 2, 4, ... workers against a temporary database,
+sends each instance a few fraud checks, then reads every worker's memory from
+``/proc``:
+
+- USS (unique set size): pages only that worker maps, i.e. what removing it
+  would free;
+- PSS (proportional set size): its private pages plus its share of pages it
+  maps with other processes, so the PSS of all workers adds up to the total
+  they use.
+
+RSS counts shared pages once per process and so cannot tell a shared page
+from a duplicated one. The benchmark exits non-zero if, by more than
+``--tolerance``:
+
+- the mean per-worker USS grows with the worker count (per-worker state
+  scales with the number of workers), or
+- each added worker costs more total PSS than one worker's USS (pages that
+  could be shared, such as the libraries' code, are duplicated).
+
+Linux only.
+
+    python -m benchmarks.worker_memory --workers 1 2 4
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.concurrency import payloads
+
+TOLERANCE = 0.10
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; ppid is the 2nd field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _is_worker(pid):
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        cmdline = f.read()
+    return b"multiprocessing" in cmdline and b"resource_tracker" not in cmdline
+
+
+def memory_kb(pid):
+    """``(rss, pss, uss)`` of a process in KiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def wait_ready(url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+
+def free_port():
+    """A TCP port on 127.0.0.1 that nothing listens on right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure(n_workers, port, n_requests, tmp):
+    """``memory_kb`` of each worker of a server with ``n_workers`` workers on ``port`` (0: a free port)."""
+    port = port or free_port()
+    env = dict(os.environ, FRAUD_SHIELD_DATABASE_URL=f"sqlite:///{os.path.join(tmp, f'workers_{n_workers}.db')}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.serving.serve", "--workers", str(n_workers), "--port", str(port),
+         "--host", "127.0.0.1", "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(f"{base_url}/docs")
+        # Connections are spread over the workers by the kernel; new clients help reach all of them
+        for body in payloads(n_requests, seed=n_workers):
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                client.post("/transaction_fraud_check", json=body)
+        # uvicorn serves a single worker in the launcher process itself
+        workers = [pid for pid in _children(server.pid) if _is_worker(pid)] if n_workers > 1 else [server.pid]
+        return [memory_kb(pid) for pid in workers]
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=60)
+
+
+def scaling(workers, n_requests=50, port=0, tolerance=TOLERANCE):
+    """``(rows, failures)``: per worker count its RSS and USS per worker, total PSS and PSS per added worker
+    (MiB), and what breaks the ``tolerance``."""
+    rows = []
+    baseline = None
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_workers in workers:
+            usage = measure(n_workers, port, n_requests, tmp)
+            if len(usage) != n_workers:
+                raise RuntimeError(f"Expected {n_workers} worker processes, found {len(usage)}")
+            rss = sum(r for r, _, _ in usage) / n_workers / 1024
+            uss = sum(u for _, _, u in usage) / n_workers / 1024
+            total_pss = sum(p for _, p, _ in usage) / 1024
+            if baseline is None:
+                baseline = (n_workers, uss, total_pss)
+                rows.append((n_workers, rss, uss, total_pss, None))
+                continue
+            base_workers, base_uss, base_pss = baseline
+            added = (total_pss - base_pss) / (n_workers - base_workers)
+            rows.append((n_workers, rss, uss, total_pss, added))
+            if uss > base_uss * (1 + tolerance):
+                failures.append(f"{n_workers} workers: {uss:.1f} MiB private per worker vs {base_uss:.1f} MiB "
+                                f"with {base_workers}")
+            if added > base_uss * (1 + tolerance):
+                failures.append(f"{n_workers} workers: {added:.1f} MiB total per added worker vs "
+                                f"{base_uss:.1f} MiB private to one worker")
+    return rows, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--port", type=int, default=0, help="server port; 0 picks a free one per run")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed growth of per-worker USS and PSS")
+    args = parser.parse_args()
+
+    try:
+        rows, failures = scaling(args.workers, args.requests, args.port, args.tolerance)
+    except RuntimeError as error:
+        raise SystemExit(str(error))
+    print(f"{'workers':>8} {'RSS MiB/worker':>15} {'USS MiB/worker':>15} {'PSS MiB total':>14} "
+          f"{'MiB/added worker':>17}")
+    for n_workers, rss, uss, total_pss, added in rows:
+        added = "" if added is None else f"{added:.1f}"
+        print(f"{n_workers:>8} {rss:>15.1f} {uss:>15.1f} {total_pss:>14.1f} {added:>17}")
+    if failures:
+        raise SystemExit("❌ Worker memory does not scale with private memory alone:\n" + "\n".join(failures))
+    print("✅ Per-worker private memory stays flat, and each added worker costs no more than its private memory")
+
+
+if __name__ == "__main__":
+    main()
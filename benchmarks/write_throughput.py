@@ -0,0 +1,103 @@
+"""Write throughput of the transactions table: legacy commits vs WAL vs group commit.
+
+Each mode stores the same scored rows from ``--clients`` concurrent writers
+into a fresh SQLite file:
+
+- ``legacy``: default rollback journal; per request add, commit, refresh and
+  a second commit for ``isFraud``, as the endpoint used to do.
+- ``wal``: the pragmas of src/db/persistence.py, one insert and commit per request.
+- ``group``: the same pragmas, with requests coalesced by ``GroupCommitWriter``.
+
+    python -m benchmarks.write_throughput --rows 2000 --clients 1 8 32
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from benchmarks.concurrency import payloads
+from src.db.models import Transaction
+from src.db.persistence import GroupCommitWriter, apply_sqlite_pragmas
+
+
+def scored_rows(n_rows, columns, seed=0):
+    """Request payloads padded with every stored column, engineered ones set to 0."""
+    rows = payloads(n_rows, seed=seed)
+    for row in rows:
+        for column in columns:
+            row.setdefault(column, 0)
+    return rows
+
+
+async def drive(rows, n_clients, write_one):
+    queue = list(reversed(rows))
+
+    async def client():
+        while queue:
+            await write_one(queue.pop())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(n_clients)))
+    return time.perf_counter() - start
+
+
+async def run_mode(mode, url, model, rows, n_clients, max_delay):
+    engine = create_async_engine(url)
+    if mode != "legacy":
+        apply_sqlite_pragmas(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(model.metadata.create_all)
+    writer = GroupCommitWriter(engine, model.__table__, max_delay=max_delay)
+
+    async def legacy(row):
+        async with AsyncSession(engine, expire_on_commit=True) as session:
+            db_row = model(**{**row, "isFraud": None})
+            session.add(db_row)
+            await session.commit()
+            await session.refresh(db_row)
+            db_row.isFraud = row["isFraud"]
+            await session.commit()
+
+    async def single(row):
+        async with engine.begin() as conn:
+            await conn.execute(insert(model.__table__), [row])
+
+    async def group(row):
+        await writer.write([row])
+
+    elapsed = await drive(rows, n_clients, {"legacy": legacy, "wal": single, "group": group}[mode])
+    commits = writer.commits if mode == "group" else len(rows) * (2 if mode == "legacy" else 1)
+    await engine.dispose()
+    return elapsed, commits
+
+
+async def main_async(args, tmp):
+    columns = [column.name for column in Transaction.__table__.columns]
+    print(f"{'mode':>8} {'clients':>8} {'rows/s':>10} {'commits':>8}")
+    for n_clients in args.clients:
+        for mode in ("legacy", "wal", "group"):
+            url = f"sqlite+aiosqlite:///{os.path.join(tmp, f'{mode}_{n_clients}.db')}"
+            rows = scored_rows(args.rows, columns, seed=args.seed)
+            elapsed, commits = await run_mode(mode, url, Transaction, rows, n_clients, args.max_delay_ms / 1000)
+            print(f"{mode:>8} {n_clients:>8} {len(rows) / elapsed:>10.1f} {commits:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main_async(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
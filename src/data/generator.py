@@ -0,0 +1,475 @@
+"""Seeded, vectorized synthetic transaction generator, written in chunks to Parquet.
+
+    python -m src.data.generator data/synthetic_10m.parquet --rows 10000000 --workers 4
+
+A port of notebooks/synthetic_dataset_generation.ipynb, which builds about
+12k rows with per-row ``apply``, ``geodesic`` calls and ``iterrows`` loops.
+The distributions are the notebook's: users with 1-3 Visa cards and phone
+numbers, region scenarios, log-normal amounts, products, merchants, devices
+and missing values, then the rule-based fraud labels and the repeated
+transactions. The differences:
+
+- Everything is drawn with NumPy over whole columns; the features are the
+  point-in-time features of src/features/engineered.py (what the API serves)
+  and the fraud rules read those, not a recompute over each user's history.
+- The card rules compared ``"Americanexpress"``/``"credit"``/``"debit"``,
+  which never match the generated values, so only the amount rule fired. They
+  use the generated spellings here. The "probabilistic adjustments" read
+  fraud rates of a column that was still all zero and are left out.
+- Distance comes from src/features/distance.py and TransactionIDs follow the
+  final time order, like transactions arriving at the API.
+
+Users are split into shards of ``shard_users``. Each shard has its own seed
+(``SeedSequence(seed).spawn``), so the output depends on ``seed`` and
+``shard_users`` only, not on the number of workers. Phase 1 generates shards
+in worker processes; a shard holds all of its users' transactions, so their
+per-user features and labels are computed there, and written time-sorted to
+a temporary Parquet file. Phase 2 reads every shard one time bucket at a
+time, orders the bucket, assigns TransactionIDs and Distance, carries the
+cross-user D features over buckets in an ``EntityLastSeenIndex``, and
+appends it to the output as row groups. At most one bucket of
+``chunk_rows`` rows and one shard are in memory at a time.
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import resource
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.db.models import Transaction
+from src.features.distance import bengaluru_regions, distances
+from src.features.engineered import entity_features, trailing_window, user_features
+from src.features.entity_index import ENTITY_FEATURES, EntityLastSeenIndex
+
+# Columns of the output, in the order of the transactions table
+OUTPUT_COLUMNS = tuple(column.name for column in Transaction.__table__.columns)
+# Columns assigned in the merge, once the global time order is known
+MERGE_COLUMNS = ("TransactionID", "Distance") + tuple(ENTITY_FEATURES.values())
+SHARD_COLUMNS = tuple(column for column in OUTPUT_COLUMNS if column not in MERGE_COLUMNS)
+
+FIRST_USER_ID = 1000
+FIRST_TRANSACTION_ID = 10000
+SHARD_USERS = 20_000
+CHUNK_ROWS = 200_000
+ROW_GROUP_ROWS = 65_536
+# Shard files are read one time bucket at a time; small row groups keep each read close to the bucket
+SHARD_ROW_GROUP_ROWS = 4_096
+# Rows per user: Poisson(10) transactions clipped to 1-50, plus about 31% repeats
+ROWS_PER_USER = 13.0
+
+REGION_NAMES = np.array(list(bengaluru_regions), dtype=object)
+REGION_CODES = {name: code for code, name in enumerate(REGION_NAMES)}
+
+USER_REGION_CHOICES = {
+    "Jayanagar": 0.15, "Malleshwaram": 0.15, "Rajajinagar": 0.15,
+    "Whitefield": 0.07, "Marathahalli": 0.07, "Electronic City": 0.07,
+    "Bellandur": 0.06, "HSR Layout": 0.06, "Sarjapur Road": 0.05,
+    "Kengeri": 0.06, "Yelahanka": 0.05, "Hebbal": 0.05, "Hennur": 0.04, "Kalyan Nagar": 0.04,
+    "Devanahalli": 0.03, "Attibele": 0.03, "Nelamangala": 0.02, "Hoskote": 0.02, "Anekal": 0.02,
+}
+ORDER_REGION_CHOICES = {
+    "Whitefield": 0.15, "Marathahalli": 0.15, "Bellandur": 0.15, "Electronic City": 0.14, "Indiranagar": 0.13,
+    "HSR Layout": 0.10, "Koramangala": 0.10, "Sarjapur Road": 0.10, "BTM Layout": 0.10, "Kalyan Nagar": 0.08,
+    "Jayanagar": 0.07, "Malleshwaram": 0.07, "Rajajinagar": 0.07, "Hebbal": 0.06, "Yelahanka": 0.05,
+    "Devanahalli": 0.02, "Anekal": 0.02, "Attibele": 0.02, "Nelamangala": 0.01,
+}
+RECEIVER_REGION_CHOICES = {
+    "Whitefield": 0.18, "Marathahalli": 0.18, "Electronic City": 0.18, "Bellandur": 0.17, "HSR Layout": 0.16,
+    "Koramangala": 0.12, "Indiranagar": 0.12, "BTM Layout": 0.12, "Sarjapur Road": 0.12,
+    "Jayanagar": 0.08, "Malleshwaram": 0.08, "Rajajinagar": 0.08, "Yelahanka": 0.07, "Hebbal": 0.07,
+    "Devanahalli": 0.04, "Anekal": 0.03, "Attibele": 0.03, "Nelamangala": 0.02, "Hoskote": 0.02,
+}
+# all_same, user_order_same, order_receiver_same, user_receiver_same, all_different
+SCENARIO_WEIGHTS = (0.35, 0.20, 0.15, 0.15, 0.15)
+
+FIRST_NAMES = ['Amit', 'Ramesh', 'Suresh', 'Rajesh', 'Priya', 'Kiran', 'Sunil', 'Anjali', 'Neha', 'Manish',
+               'Meena', 'Pooja', 'Vikas', 'Ravi', 'Rahul', 'Sonia', 'Deepak', 'Shreya', 'Kavita']
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.co.in', 'rediffmail.com', 'outlook.co.in', 'indiatimes.com',
+                 'aol.in', 'airtelmail.com', 'bsnl.in', 'zoho.com']
+
+CARD_NETWORKS = ["Visa", "Mastercard", "American Express", "Rupay"]
+CARD_TIERS = ['Silver', 'Gold', 'Platinum', 'Black']
+CARD_TYPES = ['Debit', 'Credit', 'Prepaid']
+PRODUCT_CATEGORIES = ['Wallet', 'Consumable', 'Retail', 'Household', 'Services', 'Miscellaneous']
+MERCHANT_MAPPING = {
+    "Wallet": ["Flipkart", "Amazon", "Google Play", "BigBasket", "Uber", "Zomato", "Swiggy Instamart"],
+    "Consumable": ["BigBasket", "Blinkit", "DMart", "JioMart", "Swiggy Instamart", "Zepto", "Nature’s Basket",
+                   "MilkBasket"],
+    "Retail": ["Flipkart", "Amazon", "Reliance Digital", "Croma", "Tata Cliq", "Myntra", "Nykaa", "Ajio", "Meesho",
+               "Snapdeal"],
+    "Household": ["Pepperfry", "Urban Ladder", "IKEA", "Wakefit", "Home Centre", "Nilkamal", "Durian",
+                  "Godrej Interio", "Hometown"],
+    "Services": ["Netflix", "Amazon Prime", "Hotstar", "Spotify", "Zee5", "JioSaavn", "Unacademy", "Byju's",
+                 "ALT Balaji", "Sony LIV", "Audible", "Coursera", "Udemy", "Skillshare"],
+    "Miscellaneous": ["Dream11", "RummyCircle", "PokerBaazi", "MPL", "Decathlon", "FirstCry", "Tata 1mg", "1x BET",
+                      "Betway", "Lottoland", "WinZO", "Nazara Games", "Netmeds", "Practo", "PharmEasy"],
+}
+# Share of transactions with a merchant outside the list ("{product}_Merchant01")
+NEW_MERCHANT_PROBABILITY = 0.05
+DEVICE_INFOS = [
+    "Windows", "iOS Device", "MacOS", "Trident/7.0", "rv:11.0", "rv:57.0",
+    "SM-J700M Build/MMB29K", "SM-G610M Build/MMB29K", "SM-G531H Build/LMY48B",
+    "rv:59.0", "SM-G935F Build/NRD90M", "SM-G955U Build/NRD90M", "SM-G532M Build/MMB29T",
+    "ALE-L23 Build/HuaweiALE-L23", "SM-G950U Build/NRD90M", "SM-G930V Build/NRD90M",
+    "rv:58.0", "rv:52.0", "SAMSUNG", "SM-G950F Build/NRD90M",
+]
+# The notebook adds 10 transactions to every device's count; fixed at its ~10k rows so the mix does not drift with size
+DEVICE_INFO_DAMPING_ROWS = 10_000
+
+# Amounts: log-normal around the original dataset's mean, clipped to its range
+AMOUNT_MU = np.log(135.03)
+AMOUNT_SIGMA = np.log(1 + 239.16 / 135.03)
+AMOUNT_RANGE = (0.251, 31937.391)
+YEAR_START = pd.Timestamp("2024-01-01")
+YEAR_END = pd.Timestamp("2024-12-31")
+MISSING_FRACTIONS = {"Sender_email": 0.16, "DeviceType": 0.15, "DeviceInfo": 0.15}
+
+FRAUD_RATIO = 0.04
+RISKY_PRODUCTS = ("Household", "Consumable", "Services")
+# Repeated transactions: share of rows, time shift range (minutes) and amount jitter
+LEGIT_REPEATS = (0.3, (10, 1440), 0.02)
+FRAUD_REPEATS = (0.4, (1, 60), 0.05)
+
+# Phone numbers are a bijection of the user's global slot onto +91 7000000000-9999999999, so they never repeat
+PHONE_FIRST, PHONE_RANGE, PHONE_MULTIPLIER = 7_000_000_000, 3_000_000_000, 1_234_567_891
+
+
+def _decay(n, factor, damping=0.0):
+    """The notebook's exponentially decaying category weights, with smaller ones boosted by ``damping``."""
+    weights = np.exp(-factor * np.arange(n))
+    weights /= weights.sum()
+    weights = weights * (1 + damping * (weights < np.median(weights)))
+    return weights / weights.sum()
+
+
+CARD_NETWORK_P = _decay(len(CARD_NETWORKS), 1.0)
+CARD_TYPE_P = _decay(len(CARD_TYPES), 0.8, damping=2.0)
+PRODUCT_P = _decay(len(PRODUCT_CATEGORIES), 0.9, damping=1.5)
+DEVICE_INFO_P = (_decay(len(DEVICE_INFOS), 1.2) * DEVICE_INFO_DAMPING_ROWS).astype(int) + 10.0
+DEVICE_INFO_P /= DEVICE_INFO_P.sum()
+
+
+def _region_choices(choices):
+    weights = np.array(list(choices.values()))
+    return np.array([REGION_CODES[name] for name in choices]), weights / weights.sum()
+
+
+def _draw(rng, choices, size):
+    codes, p = choices
+    return codes[rng.choice(len(codes), size, p=p)]
+
+
+def _strings(values):
+    return np.array(values, dtype=object)
+
+
+def _card_numbers(rng, shape):
+    """Visa-16 numbers: '4', 14 random digits and the Luhn check digit."""
+    digits = np.concatenate([np.full(shape + (1,), 4), rng.integers(0, 10, shape + (14,))], axis=-1)
+    # Luhn doubles every second digit from the right, starting left of the check digit
+    doubled = digits.copy()
+    doubled[..., ::2] *= 2
+    doubled[doubled > 9] -= 9
+    check = (10 - doubled.sum(axis=-1) % 10) % 10
+    payload = digits @ (10 ** np.arange(14, -1, -1, dtype=np.int64))
+    return (payload * 10 + check).astype(str).astype(object)
+
+
+def _users(rng, first_user, n_users):
+    """Per-user columns, region codes, and each user's cards with the phone number of each card."""
+    slots = np.arange(first_user - FIRST_USER_ID, first_user - FIRST_USER_ID + n_users)
+    phones = (slots[:, None] * 3 + np.arange(3)) * PHONE_MULTIPLIER % PHONE_RANGE + PHONE_FIRST
+    phones = np.char.add("+91 ", phones.astype(str)).astype(object)
+    phone_count = rng.integers(1, 4, n_users)
+    cards = _card_numbers(rng, (n_users, 3))
+    card_count = rng.integers(1, 4, n_users)
+    card_phones = np.take_along_axis(phones, (rng.random((n_users, 3)) * phone_count[:, None]).astype(int), axis=1)
+    emails = np.char.add(np.char.add(np.char.lower(_strings(FIRST_NAMES).astype(str))[
+        rng.integers(0, len(FIRST_NAMES), n_users)], "@"), _strings(EMAIL_DOMAINS).astype(str)[
+        rng.integers(0, len(EMAIL_DOMAINS), n_users)]).astype(object)
+    regions = _draw(rng, _region_choices(USER_REGION_CHOICES), n_users)
+    users = pd.DataFrame({
+        "User_ID": np.arange(first_user, first_user + n_users),
+        "Sender_email": emails,
+        "BINNumber": np.array([card[:6] for card in cards[:, 0]], dtype=object),
+        "CardNetwork": _strings(CARD_NETWORKS)[rng.choice(len(CARD_NETWORKS), n_users, p=CARD_NETWORK_P)],
+        "CardTier": _strings(CARD_TIERS)[rng.integers(0, len(CARD_TIERS), n_users)],
+        "CardType": _strings(CARD_TYPES)[rng.choice(len(CARD_TYPES), n_users, p=CARD_TYPE_P)],
+        "User_Region": REGION_NAMES[regions],
+        "transactions": rng.poisson(10, n_users).clip(1, 50),
+    })
+    return users, regions, cards, card_count, card_phones
+
+
+def _regions(rng, user_region):
+    """Order and receiver region codes per transaction, by the notebook's scenarios."""
+    n = len(user_region)
+    orders, receivers = _region_choices(ORDER_REGION_CHOICES), _region_choices(RECEIVER_REGION_CHOICES)
+    scenario = rng.choice(len(SCENARIO_WEIGHTS), n, p=SCENARIO_WEIGHTS)
+    order = np.where(scenario <= 1, user_region, _draw(rng, orders, n))
+    receiver = np.where(scenario == 0, user_region, np.where(scenario == 2, order, _draw(rng, receivers, n)))
+    receiver[scenario == 3] = user_region[scenario == 3]
+    # Redraw until each scenario's constraint holds
+    while (redraw := (scenario == 3) & (order == user_region)).any():
+        order[redraw] = _draw(rng, orders, redraw.sum())
+    while (redraw := np.isin(scenario, (1, 2, 4)) & (receiver == user_region)
+                     | (scenario == 4) & (receiver == order)).any():
+        receiver[redraw] = _draw(rng, receivers, redraw.sum())
+    return order, receiver
+
+
+def _merchants():
+    """Flat merchant and merchant email tables, with each product's offset and list length."""
+    names, emails, offsets, sizes = [], [], [], []
+    for product, merchants in MERCHANT_MAPPING.items():
+        offsets.append(len(names))
+        sizes.append(len(merchants))
+        for merchant in merchants + [f"{product}_Merchant01"]:
+            names.append(merchant)
+            emails.append(f"{product.lower()}@{merchant.lower().replace(' ', '')}.com")
+    return _strings(names), _strings(emails), np.array(offsets), np.array(sizes)
+
+
+def _device_types(rng, infos):
+    desktop = np.array([any(token in info for token in ("Windows", "MacOS", "rv:")) for info in DEVICE_INFOS])
+    mobile = np.array([any(token in info for token in ("SM-", "SAMSUNG", "Build/", "iOS")) for info in DEVICE_INFOS])
+    # Anything else (Trident/7.0) is a desktop 70% of the time
+    is_desktop = np.where(desktop[infos], True, np.where(mobile[infos], False, rng.random(len(infos)) < 0.7))
+    return np.where(is_desktop, "desktop", "mobile").astype(object)
+
+
+def _transactions(rng, first_user, n_users):
+    """Raw transactions of ``n_users`` users, in TransactionDT order, without labels."""
+    users, regions, cards, card_count, card_phones = _users(rng, first_user, n_users)
+    owner = np.repeat(np.arange(n_users), users["transactions"].to_numpy())
+    n = len(owner)
+    df = users.drop(columns="transactions").iloc[owner].reset_index(drop=True)
+    card = (rng.random(n) * card_count[owner]).astype(int)
+    df["CardNumber"] = cards[owner, card]
+    df["PhoneNumbers"] = card_phones[owner, card]
+    order, receiver = _regions(rng, regions[owner])
+    df["Order_Region"] = REGION_NAMES[order]
+    df["Receiver_Region"] = REGION_NAMES[receiver]
+    df["TransactionAmt"] = np.round(np.clip(rng.lognormal(AMOUNT_MU, AMOUNT_SIGMA, n), *AMOUNT_RANGE), 2)
+    product = rng.choice(len(PRODUCT_CATEGORIES), n, p=PRODUCT_P)
+    df["ProductCD"] = _strings(PRODUCT_CATEGORIES)[product]
+    names, emails, offsets, sizes = _merchants()
+    pick = np.where(rng.random(n) < NEW_MERCHANT_PROBABILITY, sizes[product],
+                    (rng.random(n) * sizes[product]).astype(int))
+    df["Merchant"] = names[offsets[product] + pick]
+    df["Merchant_email"] = emails[offsets[product] + pick]
+    span = (YEAR_END - YEAR_START).value
+    seconds = (YEAR_START.value + (rng.random(n) * span).astype(np.int64)) // 1_000_000_000
+    df["TransactionDT"] = pd.to_datetime(seconds, unit="s")
+    infos = rng.choice(len(DEVICE_INFOS), n, p=DEVICE_INFO_P)
+    df["DeviceInfo"] = _strings(DEVICE_INFOS)[infos]
+    df["DeviceType"] = _device_types(rng, infos)
+    for column, fraction in MISSING_FRACTIONS.items():
+        df.loc[rng.random(n) < fraction, column] = None
+    return df.sort_values("TransactionDT", kind="stable").reset_index(drop=True)
+
+
+def fraud_probability(df, features):
+    """The notebook's rule-based fraud probability of each row, from its point-in-time features.
+
+    ``df`` is in TransactionDT order and holds whole user histories.
+    """
+    users = pd.factorize(df["User_ID"])[0]
+    amounts = df["TransactionAmt"].to_numpy(np.float64)
+    ns = df["TransactionDT"].to_numpy("datetime64[ns]").view(np.int64)
+    days = features["DaysSinceLastTransac_D2"].to_numpy()
+    device_mismatch = features["DeviceMismatch_M6"].to_numpy() == 1
+    region_mismatch = features["RegionMismatch_M8"].to_numpy() == 1
+    # Amount over 3x the user's mean so far (the notebook took the mean of the whole history)
+    spike = features["TransactionRatio_E7"].to_numpy() > 3
+    count = pd.Series(users).groupby(users, sort=False).cumcount().to_numpy() + 1
+    user_mean = pd.Series(amounts).groupby(users, sort=False).cumsum().to_numpy() / count
+    last_30s, _ = trailing_window(users, ns, amounts, 30 * 1_000_000_000)
+
+    probability = np.full(len(df), FRAUD_RATIO)
+    dormant = ((days > 30) & (features["DeviceMatching_M4"].to_numpy() == 0) & spike
+               & ((features["AvgTransactionAmt_24Hrs_E9"].to_numpy() < user_mean) | region_mismatch))
+    burst = (days < 1) & spike & (last_30s > 3) & device_mismatch & region_mismatch
+    risky = df["ProductCD"].isin(RISKY_PRODUCTS).to_numpy() & device_mismatch & region_mismatch & spike
+    network, card_type = df["CardNetwork"].to_numpy(), df["CardType"].to_numpy()
+    card = np.select(
+        [(network == "American Express") & (card_type == "Credit"),
+         (df["ProductCD"].to_numpy() == "Consumable") & (network == "Mastercard") & (card_type == "Debit"),
+         amounts > 10000],
+        [0.09, 0.02, 0.015], 0.0)
+    for rule, value in ((dormant, 0.02), (burst, 0.05), (risky, 0.34)):
+        probability = np.where(rule, np.maximum(probability, value), probability)
+    probability = np.maximum(probability, card)
+    # M features add up; served M9 counts consistent checks, so 0 is the notebook's "inconsistent"
+    probability += (0.02 * device_mismatch + 0.015 * region_mismatch
+                    + 0.01 * (features["TransactionConsistency_M9"].to_numpy() == 0))
+    return np.minimum(probability, 1.0)
+
+
+def _repeats(rng, df, label, share, shift_minutes, jitter):
+    rows = np.flatnonzero(df["isFraud"].to_numpy() == label)
+    picked = df.iloc[rng.choice(rows, int(share * len(rows)), replace=True)].reset_index(drop=True)
+    n = len(picked)
+    picked["TransactionDT"] += pd.to_timedelta(rng.integers(*shift_minutes, n), unit="m")
+    picked["TransactionAmt"] = np.round(picked["TransactionAmt"] * rng.uniform(1 - jitter, 1 + jitter, n), 2)
+    return picked
+
+
+def generate_shard(shard, shard_users, n_users, seed):
+    """Transactions, per-user features and labels of shard ``shard``, in TransactionDT order.
+
+    The shard holds users ``FIRST_USER_ID + shard * shard_users`` onwards,
+    ``n_users`` of them, and draws from child ``shard`` of ``seed``.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+    df = _transactions(rng, FIRST_USER_ID + shard * shard_users, n_users)
+    df["isFraud"] = (rng.random(len(df)) < fraud_probability(df, user_features(df))).astype(np.int64)
+    legit = _repeats(rng, df, 0, *LEGIT_REPEATS)
+    fraud = _repeats(rng, df, 1, *FRAUD_REPEATS)
+    fraud["DeviceInfo"] = rng.permutation(fraud["DeviceInfo"].to_numpy())
+    df = pd.concat([df, legit, fraud], ignore_index=True).sort_values("TransactionDT", kind="stable")
+    df = df.reset_index(drop=True)
+    return pd.concat([df, user_features(df)], axis=1)[list(SHARD_COLUMNS)]
+
+
+def _shards(n_users, shard_users):
+    return [(shard, shard_users, min(shard_users, n_users - first))
+            for shard, first in enumerate(range(0, n_users, shard_users))]
+
+
+def finish_chunk(df, first_id, entities):
+    """Output rows of a time-ordered chunk: TransactionIDs, Distance and the cross-user D features."""
+    df = df.reset_index(drop=True)
+    df["TransactionID"] = np.arange(first_id, first_id + len(df))
+    df["Distance"] = distances(df["Order_Region"].to_numpy(), df["Receiver_Region"].to_numpy(),
+                               df["TransactionID"].to_numpy())
+    df = pd.concat([df, entity_features(df, entities)], axis=1)
+    return df[list(OUTPUT_COLUMNS)]
+
+
+def generate_frame(n_users, seed=0, shard_users=SHARD_USERS):
+    """The dataset ``generate`` writes, built in memory in one process; for small sizes and checks."""
+    shards = [generate_shard(*shard, seed) for shard in _shards(n_users, shard_users)]
+    df = pd.concat(shards, ignore_index=True).sort_values("TransactionDT", kind="stable")
+    return finish_chunk(df, FIRST_TRANSACTION_ID, EntityLastSeenIndex())
+
+
+def _write_shard(directory, shard, shard_users, n_users, seed):
+    df = generate_shard(shard, shard_users, n_users, seed)
+    path = os.path.join(directory, f"shard-{shard:05d}.parquet")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=SHARD_ROW_GROUP_ROWS)
+    ns = df["TransactionDT"].to_numpy("datetime64[ns]").view(np.int64)
+    return path, len(df), int(df["isFraud"].sum()), ns[::SHARD_ROW_GROUP_ROWS], int(ns[-1])
+
+
+class _ShardReader:
+    """Rows of a time-sorted shard file within a time range, read from the row groups that hold them."""
+
+    def __init__(self, path, group_first_ns):
+        self.file = pq.ParquetFile(path)
+        self.group_first_ns = group_first_ns
+
+    def read(self, low_ns, high_ns):
+        # The group before the first one starting at low_ns can end with rows at low_ns
+        first = max(np.searchsorted(self.group_first_ns, low_ns, "left") - 1, 0)
+        last = np.searchsorted(self.group_first_ns, high_ns, "left")
+        table = self.file.read_row_groups(range(first, max(first, last)))
+        ns = table.column("TransactionDT").cast(pa.int64()).to_numpy()
+        start, stop = np.searchsorted(ns, [low_ns, high_ns], "left")
+        return table.slice(start, stop - start)
+
+
+def _schema(df):
+    # A column can be all missing in a chunk; every column that is not numeric or a timestamp is a string
+    fields = [field if not pa.types.is_null(field.type) else pa.field(field.name, pa.string())
+              for field in pa.Schema.from_pandas(df, preserve_index=False)]
+    return pa.schema(fields)
+
+
+def peak_rss_mib():
+    """Peak resident memory of this process and of its largest finished child process, in MiB."""
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024)
+
+
+def generate(output, n_users, seed=0, shard_users=SHARD_USERS, workers=None, chunk_rows=CHUNK_ROWS):
+    """Write the dataset for ``n_users`` users to the Parquet file ``output``; returns run statistics."""
+    workers = workers or os.cpu_count() or 1
+    shard_directory = output + ".shards"
+    os.makedirs(shard_directory, exist_ok=True)
+    stats = {"users": n_users, "workers": workers}
+    try:
+        start = time.perf_counter()
+        jobs = [(shard_directory, *shard, seed) for shard in _shards(n_users, shard_users)]
+        if workers > 1:
+            # spawn, not fork: the parent may already hold OpenMP threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                written = list(pool.map(_write_shard, *zip(*jobs)))
+        else:
+            written = [_write_shard(*job) for job in jobs]
+        stats["generate_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = sum(shard[1] for shard in written)
+        first_ns = min(int(shard[3][0]) for shard in written)
+        span = max(shard[4] for shard in written) + 1 - first_ns
+        buckets = max(1, math.ceil(rows / chunk_rows))
+        edges = [first_ns + span * i // buckets for i in range(buckets + 1)]
+        readers = [_ShardReader(path, group_first_ns) for path, _, _, group_first_ns, _ in written]
+        entities = EntityLastSeenIndex()
+        writer = None
+        next_id = FIRST_TRANSACTION_ID
+        try:
+            for low, high in zip(edges, edges[1:]):
+                parts = [reader.read(low, high) for reader in readers]
+                chunk = pa.concat_tables(parts).to_pandas().sort_values("TransactionDT", kind="stable")
+                chunk = finish_chunk(chunk, next_id, entities)
+                next_id += len(chunk)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, _schema(chunk))
+                writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False),
+                                   row_group_size=ROW_GROUP_ROWS)
+        finally:
+            if writer is not None:
+                writer.close()
+        stats["merge_s"] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(shard_directory, ignore_errors=True)
+    stats["rows"] = next_id - FIRST_TRANSACTION_ID
+    stats["frauds"] = sum(shard[2] for shard in written)
+    stats["peak_rss_mib"], stats["worker_peak_rss_mib"] = peak_rss_mib()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic transactions dataset as Parquet.")
+    parser.add_argument("output", help="Parquet file to write")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--rows", type=int, help=f"approximate number of rows (about {ROWS_PER_USER} per user)")
+    size.add_argument("--users", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="shard processes (default: all cores)")
+    parser.add_argument("--shard-users", type=int, default=SHARD_USERS, help="users per shard; changes the output")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per merge bucket")
+    args = parser.parse_args()
+
+    n_users = args.users or max(1, round(args.rows / ROWS_PER_USER))
+    stats = generate(args.output, n_users, args.seed, args.shard_users, args.workers, args.chunk_rows)
+    print(f"✅ Wrote {stats['rows']:,} transactions of {n_users:,} users ({stats['frauds'] / stats['rows']:.2%} fraud) "
+          f"to {args.output}")
+    print(f"   shards {stats['generate_s']:.1f}s, merge {stats['merge_s']:.1f}s, peak RSS "
+          f"{stats['peak_rss_mib']:.0f} MiB (largest worker {stats['worker_peak_rss_mib']:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
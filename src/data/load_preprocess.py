@@ -16,6 +16,8 @@ import numpy as np
 from sklearn.preprocessing import LabelEncoder
 from sklearn.utils import resample
 from sklearn.impute import SimpleImputer
+from src.data.store import STORE_ROOT, category_codes, read_store, store_columns
+from src.models.encoders import MISSING_TOKEN
 
 def preprocess_and_transform_balanced(X):
     columns_to_drop = ['TransactionID']
@@ -27,31 +29,35 @@ def preprocess_and_transform_balanced(X):
     legit = resample(legit, replace=True, n_samples=int(2.33*len(fraud)))
     data = pd.concat([legit, fraud])
 
+    # TransactionDT as int64 nanoseconds; NaT (missing or unparsable in the export) becomes NaN, which the
+    # imputer below fills with the mean like any other missing number
+    transaction_dt = data['TransactionDT'].to_numpy('datetime64[ns]')
+    data['TransactionDT'] = np.where(np.isnat(transaction_dt), np.nan, transaction_dt.view('int64'))
+
     numerical_columns = data.select_dtypes(include=['int64', 'float64']).columns
-    categorical_columns = [
-                'ProductCD', 'DeviceType', 'Merchant', 'DeviceInfo', 'Card_Network', 'Card_Tier',
-                'Card_Type', 'Sender_email', 'Merchant_email', 'User_Region', 'Order_Region',
-                'Receiver_Region', 'Device_Matching_M4', 'Phone_Numbers','Device_Mismatch_M6',
-                'RegionMismatch_M8','TransactionConsistency_M9', 'TransactionVelocity_E10',
-                'TimingAnomaly_E11','RegionAnomaly_E12']
+    # The store's string columns, which read_store returns as categoricals (CardNetwork, DeviceType, ...)
+    categorical_columns = [c for c in data.columns if isinstance(data[c].dtype, pd.CategoricalDtype)]
 
     label_encoders = {}
     for column in categorical_columns:
-        if column in data.columns:
-            label_encoder = LabelEncoder()
-            data[column] = label_encoder.fit_transform(data[column].astype(str))
-            label_encoders[column] = label_encoder  # Save encoders if needed later
+        codes, classes = category_codes(data[column], MISSING_TOKEN)
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = np.array(classes, dtype=object)
+        data[column] = codes
+        label_encoders[column] = label_encoder  # Save encoders if needed later
 
     imputer = SimpleImputer(strategy='mean')
     data[numerical_columns] = imputer.fit_transform(data[numerical_columns])
 
     return data,label_encoders
 
-# Load dataset
-transaction_data = pd.read_csv("/content/synthetic_dataset.csv")
+# Load dataset from the columnar store (FRAUD_SHIELD_TRAINING_STORE), built once with
+#   python -m src.data.store data/synthetic_dataset.csv data/transactions_store
+# TransactionID is dropped anyway, so it is not read
+transaction_data = read_store(STORE_ROOT, columns=[c for c in store_columns(STORE_ROOT) if c != 'TransactionID'])
 print("Dataset Loaded:", transaction_data.shape)
 
 transaction_data ,label_encoders= preprocess_and_transform_balanced(transaction_data)
-transaction_data['TransactionDT'] = pd.to_numeric(transaction_data['TransactionDT'], errors='coerce')
+transaction_data['TransactionDT'] = transaction_data['TransactionDT'].astype('int64')
 print("Preprocessing Completed:", transaction_data.shape)
 
@@ -0,0 +1,194 @@
+"""Columnar training data store: a month-partitioned Parquet dataset built once from a CSV export.
+
+    python -m src.data.store data/synthetic_dataset.csv data/transactions_store
+
+Training used to ``pd.read_csv`` the whole export, every column as text or
+float64, then label-encode the object columns in Python. The conversion here
+streams the CSV (or a Parquet file from src/data/generator.py) through
+pyarrow's multithreaded reader in blocks of ``--block-mib``. It writes:
+
+- headers mapped to the transactions table's names (``UserRegion`` ->
+  ``User_Region``), with that table's types where a column matches one;
+- string columns dictionary-encoded, read back as pandas ``category``;
+- ``TransactionDT`` as a timestamp;
+- one hive partition per month of ``TransactionDT`` (``month=2024-01``).
+
+``read_store`` memory-maps the files and reads only the columns asked for,
+optionally only some months, so loading a few model columns of a large
+dataset costs a fraction of parsing the CSV. ``category_codes`` turns a
+categorical column into the codes and sorted classes a ``LabelEncoder``
+would give its string values, from the categories instead of every row.
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import Float, Integer
+
+from src.db.models import Transaction
+from src.models.encoders import normalize_column_name
+
+PARTITION_COLUMN = "month"
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+BLOCK_MIB = 64
+ROW_GROUP_ROWS = 1_000_000
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+# Store that model.py and load_preprocess.py train from
+STORE_ROOT = os.environ.get("FRAUD_SHIELD_TRAINING_STORE", "data/transactions_store")
+
+
+def _arrow_type(column):
+    if column.name == "TransactionDT":
+        return pa.timestamp("ns")
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    return pa.string()
+
+
+# Types of the transactions table's columns
+TABLE_TYPES = {column.name: _arrow_type(column) for column in Transaction.__table__.columns}
+
+
+def column_mapping(columns):
+    """Source header -> store column: the table's name where one matches case- and underscore-insensitively."""
+    by_key = {normalize_column_name(name): name for name in TABLE_TYPES}
+    return {column: by_key.get(normalize_column_name(column), column) for column in columns}
+
+
+def _csv_batches(path, block_mib):
+    with open(path, newline="") as f:
+        header = next(csv.reader(f))
+    mapping = column_mapping(header)
+    types = {column: TABLE_TYPES[name] for column, name in mapping.items() if name in TABLE_TYPES}
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=block_mib * 2**20),
+        convert_options=pacsv.ConvertOptions(column_types=types, strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch.rename_columns([mapping[name] for name in batch.schema.names])
+
+
+def _parquet_batches(path, block_mib):
+    source = pq.ParquetFile(path)
+    mapping = column_mapping(source.schema_arrow.names)
+    # About block_mib of uncompressed data per batch
+    metadata = source.metadata
+    row_bytes = max(1, sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+                    // max(1, metadata.num_rows))
+    for batch in source.iter_batches(batch_size=max(1, block_mib * 2**20 // row_bytes)):
+        yield batch.rename_columns([mapping[name] for name in batch.schema.names])
+
+
+def _typed(batch):
+    """``batch`` with dictionary-encoded strings, a timestamp TransactionDT and the month partition column."""
+    columns = {}
+    for name, column in zip(batch.schema.names, batch.columns):
+        if name == "TransactionDT" and not pa.types.is_timestamp(column.type):
+            column = column.cast(pa.timestamp("ns"))
+        elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            column = pc.dictionary_encode(column.cast(pa.string()))
+        elif pa.types.is_null(column.type):
+            column = column.cast(CATEGORY_TYPE)
+        columns[name] = column
+    if "TransactionDT" in columns:
+        columns[PARTITION_COLUMN] = pc.strftime(columns["TransactionDT"], format="%Y-%m")
+    else:
+        columns[PARTITION_COLUMN] = pa.nulls(batch.num_rows, pa.string())
+    return pa.record_batch(columns)
+
+
+def convert_to_store(source, root, block_mib=BLOCK_MIB):
+    """Write ``source`` (CSV or Parquet) as a store at ``root``, replacing its partitions; returns the row count."""
+    batches = (_parquet_batches if source.endswith(".parquet") else _csv_batches)(source, block_mib)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError(f"{source} has no rows")
+    first = _typed(first)
+    schema = first.schema
+    rows = 0
+
+    def typed():
+        nonlocal rows
+        for batch in [first]:
+            rows += batch.num_rows
+            yield batch
+        for batch in batches:
+            # Later blocks can infer differently (a column all missing); the first block's types win
+            batch = _typed(batch).cast(schema)
+            rows += batch.num_rows
+            yield batch
+
+    ds.write_dataset(
+        typed(), root, schema=schema, format="parquet", partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching", max_rows_per_group=ROW_GROUP_ROWS,
+        basename_template="part-{i}.parquet",
+    )
+    return rows
+
+
+def store_columns(root):
+    """Column names of the store at ``root``, without the partition column."""
+    schema = ds.dataset(root, format="parquet", partitioning=PARTITIONING).schema
+    return [name for name in schema.names if name != PARTITION_COLUMN]
+
+
+def read_store(root, columns=None, months=None):
+    """The store at ``root`` as a DataFrame: only ``columns`` (default: all) and, if given, only ``months`` ("2024-01").
+
+    Strings come back as ``category`` and TransactionDT as ``datetime64``.
+    """
+    columns = store_columns(root) if columns is None else list(columns)
+    filters = [(PARTITION_COLUMN, "in", list(months))] if months is not None else None
+    table = pq.read_table(root, columns=columns, filters=filters, memory_map=True, partitioning=PARTITIONING)
+    return table.to_pandas()
+
+
+def category_codes(series, missing_token):
+    """``LabelEncoder().fit_transform`` of ``series`` as strings, with missing values as ``missing_token``.
+
+    Returns the codes and the sorted classes, computed from the categories of
+    a ``category`` series rather than from every row.
+    """
+    categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+    # A store's dictionaries can hold values no selected row has (other months, rows resampled away)
+    categorical = categorical.cat.remove_unused_categories()
+    names = [str(value) for value in categorical.cat.categories]
+    codes = categorical.cat.codes.to_numpy()
+    if (codes < 0).any():
+        names.append(missing_token)
+        codes = np.where(codes < 0, len(names) - 1, codes)
+    # One vectorized sort of the category strings; categories whose strings coincide ("1" and 1) share a
+    # class, as they would in a LabelEncoder
+    classes, remap = np.unique(np.array(names, dtype=str), return_inverse=True)
+    return remap.astype(np.int64)[codes] if len(codes) else codes.astype(np.int64), classes.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a CSV or Parquet export into the columnar training store.")
+    parser.add_argument("source", help="CSV shaped like data/synthetic_dataset.csv, or a generator .parquet file")
+    parser.add_argument("root", help="store directory; partitions present in the source are replaced")
+    parser.add_argument("--block-mib", type=int, default=BLOCK_MIB, help="size of the blocks streamed from the source")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = convert_to_store(args.source, args.root, args.block_mib)
+    size = sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(args.root) for name in names)
+    print(f"✅ Stored {rows:,} rows of {args.source} in {args.root} ({size / 2**20:.1f} MiB) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
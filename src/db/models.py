@@ -0,0 +1,73 @@
+"""ORM model of the transactions table and its schema setup."""
+
+from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy.orm import declarative_base
+
+from src.db.queries import ensure_indexes, history_indexes
+
+Base = declarative_base()
+
+
+# Define Transaction Model with updated data types
+class Transaction(Base):
+    __tablename__ = "transactions"
+    # Composite indexes for the history lookups in src/db/queries.py
+    __table_args__ = history_indexes()
+    TransactionID = Column(Integer, primary_key=True, index=True, unique=True)
+    TransactionAmt = Column(Float)
+    TransactionDT = Column(String)
+    ProductCD = Column(String)
+    User_ID = Column(Integer)
+    Merchant = Column(String)
+    CardNumber = Column(String)
+    BINNumber = Column(String)
+    CardNetwork = Column(String)
+    CardTier = Column(String)
+    CardType = Column(String)
+    PhoneNumbers = Column(String)
+    User_Region = Column(String)
+    Order_Region = Column(String)
+    Receiver_Region = Column(String)
+    Distance = Column(Float)
+    Sender_email = Column(String)
+    Merchant_email = Column(String)
+    DeviceType = Column(String)
+    DeviceInfo = Column(String)
+    # E Series Features
+    TransactionTimeSlot_E2 = Column(Integer)
+    HourWithinSlot_E3 = Column(Integer)
+    TransactionWeekday_E4 = Column(Integer)
+    AvgTransactionInterval_E5 = Column(Float)
+    TransactionAmountVariance_E6 = Column(Float)
+    TransactionRatio_E7 = Column(Float)
+    MedianTransactionAmount_E8 = Column(Float)
+    AvgTransactionAmt_24Hrs_E9 = Column(Float)
+    TransactionVelocity_E10 = Column(Integer)
+    TimingAnomaly_E11 = Column(Integer)
+    RegionAnomaly_E12 = Column(Integer)
+    HourlyTransactionCount_E13 = Column(Integer)
+    # D Series Features
+    DaysSinceLastTransac_D2 = Column(Float)
+    SameCardDaysDiff_D3 = Column(Float)
+    SameAddressDaysDiff_D4 = Column(Float)
+    SameReceiverEmailDaysDiff_D10 = Column(Float)
+    SameDeviceTypeDaysDiff_D11 = Column(Float)
+    # C Series Features
+    TransactionCount_C1 = Column(Integer)
+    UniqueMerchants_C4 = Column(Integer)
+    SameBRegionCount_C5 = Column(Integer)
+    SameDeviceCount_C6 = Column(Integer)
+    UniqueBRegion_C11 = Column(Integer)
+    # M Series Features
+    DeviceMatching_M4 = Column(Integer)
+    DeviceMismatch_M6 = Column(Integer)
+    RegionMismatch_M8 = Column(Integer)
+    TransactionConsistency_M9 = Column(Integer)
+    # isFraud
+    isFraud = Column(Integer)
+
+
+def create_schema(engine):
+    """Create the tables, and the history indexes on databases created before them."""
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(Transaction.__table__, engine)
@@ -0,0 +1,129 @@
+"""History queries against the transactions table.
+
+Every read uses bound parameters, selects only the columns its caller needs
+and is served by one of the composite indexes in ``HISTORY_INDEXES``, so a
+lookup by user, card, address, merchant email or device type is an index
+range scan instead of a full scan of the table.
+
+Latest timestamps compare ``TransactionDT`` as text, which orders correctly
+for the ISO-8601 timestamps the API stores (``YYYY-MM-DD HH:MM:SS``).
+"""
+
+from sqlalchemy import Index, bindparam, text
+
+TABLE = "transactions"
+
+# Index name -> columns. Each one serves equality on its leading key(s) plus a
+# range or ORDER BY on TransactionDT.
+HISTORY_INDEXES = {
+    "ix_transactions_user_dt": ("User_ID", "TransactionDT"),
+    "ix_transactions_card_dt": ("CardNumber", "TransactionDT"),
+    "ix_transactions_address_dt": ("User_Region", "Order_Region", "TransactionDT"),
+    "ix_transactions_merchant_email_dt": ("Merchant_email", "TransactionDT"),
+    "ix_transactions_device_dt": ("DeviceType", "TransactionDT"),
+}
+
+# Columns the per-user feature state is rebuilt from
+HISTORY_COLUMNS = (
+    "TransactionAmt", "TransactionDT", "Merchant", "CardNumber",
+    "User_Region", "Order_Region", "Merchant_email", "DeviceType",
+)
+
+# Entity keys that have a last-seen index, by the feature that uses them
+ENTITY_KEYS = {
+    "card": ("CardNumber",),
+    "address": ("User_Region", "Order_Region"),
+    "merchant_email": ("Merchant_email",),
+    "device": ("DeviceType",),
+}
+
+
+def history_indexes():
+    """``Index`` objects for ``HISTORY_INDEXES``, for use in a model's ``__table_args__``."""
+    return tuple(Index(name, *columns) for name, columns in HISTORY_INDEXES.items())
+
+
+def ensure_indexes(table, bind):
+    """Create any index of ``table`` missing from the database.
+
+    ``create_all`` only creates indexes together with a new table, so databases
+    created before the indexes were declared need this.
+    """
+    for index in table.indexes:
+        index.create(bind=bind, checkfirst=True)
+
+
+def _column_list(columns, allowed):
+    # Column names cannot be bound parameters, so only known names are interpolated
+    unknown = set(columns) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown history columns: {sorted(unknown)}")
+    return ", ".join(columns)
+
+
+def user_history_sql(columns=HISTORY_COLUMNS):
+    return text(
+        f"SELECT {_column_list(columns, HISTORY_COLUMNS + ('TransactionID',))} FROM {TABLE} "
+        f"WHERE User_ID = :user_id ORDER BY TransactionDT, TransactionID"
+    )
+
+
+def fetch_user_history(bind, user_id, columns=HISTORY_COLUMNS):
+    """The user's transactions in TransactionDT order, as dicts of ``columns``.
+
+    Equal timestamps are ordered by TransactionID. TransactionID is the
+    rowid, so ``ix_transactions_user_dt`` already holds this order and no
+    sort is needed.
+    """
+    with bind.connect() as conn:
+        return [dict(row) for row in conn.execute(user_history_sql(columns), {"user_id": user_id}).mappings()]
+
+
+def count_other_user_sql():
+    return text(
+        f"SELECT COUNT(*) FROM {TABLE} WHERE User_ID = :user_id AND TransactionID NOT IN :known_ids"
+    ).bindparams(bindparam("known_ids", expanding=True))
+
+
+def count_other_user_transactions(bind, user_id, known_ids):
+    """Number of stored transactions for the user besides ``known_ids`` (index-only).
+
+    Rows are never deleted, so this only grows as other processes commit rows
+    for the user, whatever their TransactionIDs.
+    """
+    with bind.connect() as conn:
+        return conn.execute(count_other_user_sql(), {"user_id": user_id, "known_ids": list(known_ids)}).scalar()
+
+
+def last_seen_sql(entity):
+    keys = ENTITY_KEYS[entity]
+    where = " AND ".join(f"{column} = :{column}" for column in keys)
+    return text(f"SELECT MAX(TransactionDT) FROM {TABLE} WHERE {where}")
+
+
+def fetch_last_seen(bind, entity, values):
+    """Latest stored TransactionDT for an entity key (``values`` in ``ENTITY_KEYS[entity]`` order)."""
+    params = dict(zip(ENTITY_KEYS[entity], values))
+    with bind.connect() as conn:
+        return conn.execute(last_seen_sql(entity), params).scalar()
+
+
+def last_seen_all_sql(entity):
+    keys = ", ".join(ENTITY_KEYS[entity])
+    not_null = " AND ".join(f"{column} IS NOT NULL" for column in ENTITY_KEYS[entity])
+    return text(f"SELECT {keys}, MAX(TransactionDT) FROM {TABLE} WHERE {not_null} GROUP BY {keys}")
+
+
+def fetch_all_last_seen(bind, entity):
+    """``(key values..., latest TransactionDT)`` rows for every stored key of ``entity``."""
+    with bind.connect() as conn:
+        return conn.execute(last_seen_all_sql(entity)).all()
+
+
+def explain_query_plan(bind, sql, params):
+    """SQLite's ``EXPLAIN QUERY PLAN`` detail lines for ``sql``."""
+    # Compiled first, so expanding parameters (IN lists) become one placeholder per value
+    compiled = sql.bindparams(**params).compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    with bind.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled.string}", tuple(compiled.params[name] for name in compiled.positiontup))]
@@ -0,0 +1,103 @@
+"""Precomputed order -> receiver region distances.
+
+``Distance`` used to be recomputed with ``geodesic`` for every row of the
+user's history on every request. There are only 25 regions, so every pairwise
+distance is computed once into a matrix indexed by integer region codes;
+lookups are then a single array index, also for whole columns. The matrix (and
+geopy) is only built on the first lookup, which keeps it out of the server's
+start-up.
+
+Orders delivered within the same region get a small distance in
+[0.1, 2) km. It used to come from ``np.random.uniform``; it is now derived
+from the TransactionID, so the same transaction always gets the same distance.
+"""
+
+from functools import cache
+
+import numpy as np
+import pandas as pd
+
+bengaluru_regions = {
+    'Koramangala': (12.9288, 77.6228), 'Jayanagar': (12.9333, 77.5833), 'Whitefield': (12.9764, 77.7513),
+    'Indiranagar': (12.9701, 77.6402), 'Malleshwaram': (13.0034, 77.5723), 'Hebbal': (13.0312, 77.5924),
+    'Hennur': (13.0245, 77.6247), 'Sarjapur Road': (12.9121, 77.6774), 'Bannerghatta Road': (12.8786, 77.5900),
+    'Electronic City': (12.8543, 77.6780), 'Kalyan Nagar': (13.0272, 77.6463), 'BTM Layout': (12.9341, 77.5910),
+    'Vijayanagar': (12.9557, 77.5500), 'Bellandur': (12.9336, 77.6543), 'Kengeri': (12.9202, 77.4856),
+    'Yelahanka': (13.1008, 77.5963), 'Rajajinagar': (12.9917, 77.5568), 'Marathahalli': (12.9561, 77.7017),
+    'HSR Layout': (12.9121, 77.6446), 'Nagawara': (13.0452, 77.6226), 'Devanahalli': (13.2485, 77.7132),
+    'Attibele': (12.7762, 77.7672), 'Nelamangala': (13.0982, 77.3935), 'Hoskote': (13.0707, 77.7850),
+    'Anekal': (12.7110, 77.6956)
+}
+
+REGION_CODES = {name: code for code, name in enumerate(bengaluru_regions)}
+REGION_INDEX = pd.Index(list(bengaluru_regions))
+# Code for regions without coordinates; their distance to anything else is 0
+UNKNOWN_REGION = -1
+
+# Same-region deliveries are placed uniformly in this range (km)
+SAME_REGION_RANGE = (0.1, 2.0)
+
+
+@cache
+def distance_matrix():
+    """Pairwise region distances (km, 2 decimals), indexed by region code."""
+    from geopy.distance import geodesic
+
+    coordinates = list(bengaluru_regions.values())
+    n = len(coordinates)
+    matrix = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            matrix[i, j] = matrix[j, i] = np.round(geodesic(coordinates[i], coordinates[j]).km, 2)
+    return matrix
+
+
+def region_code(name):
+    return REGION_CODES.get(name, UNKNOWN_REGION)
+
+
+def region_codes(names):
+    """Vectorized ``region_code`` for a column of region names."""
+    # get_indexer returns -1, i.e. UNKNOWN_REGION, for names that are not regions
+    return REGION_INDEX.get_indexer(np.asarray(names, dtype=object)).astype(np.int64)
+
+
+def _seeded_uniform(seeds):
+    # splitmix64 finalizer: a well-mixed 64-bit hash of each seed, mapped to [0, 1)
+    z = np.atleast_1d(seeds).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def same_region_distances(seeds):
+    low, high = SAME_REGION_RANGE
+    return np.round(low + (high - low) * _seeded_uniform(seeds), 2)
+
+
+def distances(order_regions, receiver_regions, seeds):
+    """Distance for whole columns of order regions, receiver regions and per-row seeds (TransactionIDs)."""
+    order_regions = np.asarray(order_regions, dtype=object)
+    receiver_regions = np.asarray(receiver_regions, dtype=object)
+    order_codes = region_codes(order_regions)
+    receiver_codes = region_codes(receiver_regions)
+
+    known = (order_codes != UNKNOWN_REGION) & (receiver_codes != UNKNOWN_REGION)
+    result = np.where(known, distance_matrix()[order_codes, receiver_codes], 0.0)
+    # Same-region is decided on the names, so it also applies to regions without coordinates
+    same = order_regions == receiver_regions
+    if same.any():
+        result[same] = same_region_distances(np.asarray(seeds)[same])
+    return result
+
+
+def distance(order_region, receiver_region, seed):
+    """Distance for a single transaction; ``seed`` is its TransactionID."""
+    if order_region == receiver_region:
+        return float(same_region_distances(seed)[0])
+    order_code = REGION_CODES.get(order_region, UNKNOWN_REGION)
+    receiver_code = REGION_CODES.get(receiver_region, UNKNOWN_REGION)
+    if order_code == UNKNOWN_REGION or receiver_code == UNKNOWN_REGION:
+        return 0.0
+    return float(distance_matrix()[order_code, receiver_code])
@@ -0,0 +1,292 @@
+"""The engineered E/D/C/M features, shared by training, data generation and serving.
+
+Every feature of a transaction is computed as of that transaction, from it and
+the transactions that came before it, never from later ones. That is what the
+API sees when it scores a transaction, so features built for training match
+the ones served. Per-user features (E, D2, C, M) look at the user's own
+transactions. The cross-entity D features look at every transaction with the
+same card, address, merchant email or device type (see
+src/features/entity_index.py).
+
+Two modes compute the same values:
+
+- ``compute_features(df)``: batch mode, vectorized over a whole DataFrame of
+  raw ``TransactionIn`` fields with NumPy/pandas, O(n log n) in the number of
+  rows. Rows are taken in arrival order and must be in TransactionDT order
+  (NaT allowed anywhere). Sort with ``sort_values("TransactionDT", kind="stable")``
+  to keep the arrival order of equal timestamps. Its two halves are
+  ``user_features``, which only needs each user's own rows, and
+  ``entity_features``, which can carry the cross-entity D features over a
+  stream of chunks in an ``EntityLastSeenIndex``.
+- ``IncrementalFeatures``: single-transaction mode. ``observe`` folds one
+  transaction into per-user ``UserFeatureState``s and an
+  ``EntityLastSeenIndex`` in O(1). ``FeatureStateStore`` in
+  src/features/state.py is the same mode, hydrated from the database.
+
+The modes agree up to floating-point rounding, with one exception. For users
+with more than ``MEDIAN_EXACT_LIMIT`` transactions, the incremental E8 comes
+from a sketch and is within ``MEDIAN_ACCURACY`` of the exact batch median.
+``python -m benchmarks.feature_library`` checks the parity.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.db.queries import ENTITY_KEYS
+from src.features.entity_index import ENTITY_FEATURES, EntityLastSeenIndex
+from src.features.state import NS_PER_DAY, NS_PER_HOUR, WINDOW_24H_NS, UserFeatureState, parse_timestamp
+from src.features.vectorized import HOUR_TO_SLOT, HOUR_TO_SLOT_HOUR
+
+# Engineered feature columns, in the order of the transactions table
+FEATURE_COLUMNS = (
+    "TransactionTimeSlot_E2", "HourWithinSlot_E3", "TransactionWeekday_E4", "AvgTransactionInterval_E5",
+    "TransactionAmountVariance_E6", "TransactionRatio_E7", "MedianTransactionAmount_E8",
+    "AvgTransactionAmt_24Hrs_E9", "TransactionVelocity_E10", "TimingAnomaly_E11", "RegionAnomaly_E12",
+    "HourlyTransactionCount_E13",
+    "DaysSinceLastTransac_D2", "SameCardDaysDiff_D3", "SameAddressDaysDiff_D4",
+    "SameReceiverEmailDaysDiff_D10", "SameDeviceTypeDaysDiff_D11",
+    "TransactionCount_C1", "UniqueMerchants_C4", "SameBRegionCount_C5", "SameDeviceCount_C6",
+    "UniqueBRegion_C11",
+    "DeviceMatching_M4", "DeviceMismatch_M6", "RegionMismatch_M8", "TransactionConsistency_M9",
+)
+
+# Raw fields the features are computed from
+FEATURE_INPUT_COLUMNS = (
+    "TransactionAmt", "TransactionDT", "User_ID", "Merchant", "CardNumber",
+    "User_Region", "Order_Region", "Merchant_email", "DeviceType",
+)
+
+
+def _codes(values, sort=False):
+    """Integer code per value, -1 where missing; with ``sort`` codes follow value order."""
+    return pd.factorize(values, sort=sort)[0]
+
+
+def _running_count(keys, mask):
+    """1-based running count of each row's combination of ``keys``, 0 where ``mask`` is False."""
+    counts = pd.Series(np.zeros(len(mask))).groupby(keys, sort=False).cumcount().to_numpy() + 1
+    return np.where(mask, counts, 0)
+
+
+def _running_sum(values, keys):
+    return pd.Series(values).groupby(keys, sort=False).cumsum().to_numpy()
+
+
+def _running_distinct(keys, value, mask):
+    """Running number of distinct ``value`` per combination of ``keys``, over the rows where ``mask`` holds."""
+    columns = {i: key for i, key in enumerate(keys)}
+    columns["value"] = value
+    first = mask & ~pd.DataFrame(columns).duplicated().to_numpy()
+    return _running_sum(first.astype(np.int64), keys)
+
+
+def _previous(keys, positions):
+    """Position of the previous row with the same ``keys`` among ``positions``, -1 for the first."""
+    previous = pd.Series(positions).groupby(keys, sort=False).shift(1)
+    return previous.fillna(-1).to_numpy(np.int64)
+
+
+def trailing_window(users, ns, values, length_ns):
+    """Count and mean of the values of each row's user within ``length_ns`` before it, inclusive.
+
+    ``users`` are non-negative integer codes and ``ns`` timestamps in
+    nanoseconds, in non-decreasing order.
+    """
+    n = len(users)
+    rank = pd.Series(users).groupby(users, sort=False).cumcount().to_numpy()
+    # Rows of the same user older than the window: sort rows and window starts together
+    # (user, time, window start before a row at the same time) and count the rows before each start
+    starts = ns - length_ns
+    groups = np.concatenate([users, users])
+    times = np.concatenate([ns, starts])
+    is_row = np.concatenate([np.ones(n, np.int64), np.zeros(n, np.int64)])
+    order = np.lexsort((is_row, times, groups))
+    rows_before = np.empty(2 * n, np.int64)
+    rows_before[order] = np.cumsum(is_row[order]) - is_row[order]
+    user_rows = np.bincount(users, minlength=users.max() + 1 if n else 0)
+    user_start = np.cumsum(user_rows) - user_rows
+    expired = rows_before[n:] - user_start[users]
+    count = rank + 1 - expired
+    # Window sums from prefix sums over the rows grouped by user
+    by_user = np.argsort(users, kind="stable")
+    prefix = np.concatenate([[0.0], np.cumsum(values[by_user])])
+    total = prefix[user_start[users] + rank + 1] - prefix[user_start[users] + expired]
+    return count, total / count
+
+
+def _device_mode(users, devices, mask):
+    """Code of the user's most frequent device so far (ties: smallest value), -1 before any device."""
+    n = len(users)
+    level = _running_count([users, devices], mask)
+    top = pd.Series(np.where(mask, level, 0)).groupby(users, sort=False).cummax().to_numpy()
+    # A device reaching the user's top count is the mode if it is the smallest at that count;
+    # until the next device reaches the top, the mode stays the same
+    reaching = mask & (level == top)
+    smallest = pd.Series(np.where(reaching, devices, n)).groupby([users, level], sort=False).cummin().to_numpy()
+    mode = pd.Series(np.where(reaching, smallest, np.nan)).groupby(users, sort=False).ffill()
+    return mode.fillna(-1).to_numpy(np.int64)
+
+
+def _timestamps(df):
+    dt = pd.to_datetime(df["TransactionDT"])
+    timed = dt.notna().to_numpy()
+    ns = dt.to_numpy("datetime64[ns]").view(np.int64)
+    if np.any(np.diff(ns[timed]) < 0):
+        raise ValueError("features need rows in TransactionDT order; sort them first")
+    return dt, timed, ns
+
+
+def entity_features(df, entities=None):
+    """Cross-entity D features (D3, D4, D10, D11) of ``df``, aligned with its index.
+
+    With ``entities``, an ``EntityLastSeenIndex``, the first row of each key
+    in ``df`` is compared with the key's timestamp in the index, and the index
+    is then updated with the rows of ``df``. That carries the features over a
+    stream of chunks in TransactionDT order.
+    """
+    n = len(df)
+    _, timed, ns = _timestamps(df)
+    positions = np.arange(n)
+    features = {}
+    for entity, feature in ENTITY_FEATURES.items():
+        columns = ENTITY_KEYS[entity]
+        codes = [_codes(df[column]) for column in columns]
+        keyed = timed & np.all([code >= 0 for code in codes], axis=0)
+        rows = positions[keyed]
+        previous = _previous([code[keyed] for code in codes], rows)
+        found = previous >= 0
+        last_ns = np.where(found, ns[np.maximum(previous, 0)], 0)
+        if entities is not None:
+            last_seen = entities.last_seen(entity)
+            values = [df[column].to_numpy()[keyed] for column in columns]
+            keys = values[0].tolist() if len(values) == 1 else list(zip(*values))
+            unseen = np.flatnonzero(~found)
+            seen = [last_seen.get(keys[i]) for i in unseen]
+            hits = np.array([value is not None for value in seen], dtype=bool)
+            found[unseen[hits]] = True
+            last_ns[unseen[hits]] = [value for value in seen if value is not None]
+            latest = ~pd.DataFrame({i: code[keyed] for i, code in enumerate(codes)}).duplicated(keep="last").to_numpy()
+            latest = np.flatnonzero(latest)
+            last_seen.update(zip([keys[i] for i in latest], ns[rows[latest]].tolist()))
+        days = np.zeros(n)
+        days[rows] = np.where(found, ns[rows] - last_ns, 0) / NS_PER_DAY
+        features[feature] = days
+    return pd.DataFrame(features, index=df.index)
+
+
+def compute_features(df, entities=None):
+    """Engineered features of every row of ``df`` as of that row, aligned with its index.
+
+    ``df`` holds at least ``FEATURE_INPUT_COLUMNS``, with missing values as
+    None or NaN, in arrival order and in TransactionDT order. Returns a
+    DataFrame with ``FEATURE_COLUMNS``. ``entities`` is passed on to
+    ``entity_features``.
+    """
+    features = pd.concat([user_features(df), entity_features(df, entities)], axis=1)
+    return features[list(FEATURE_COLUMNS)]
+
+
+def user_features(df):
+    """The per-user features of ``compute_features`` (all but D3, D4, D10, D11), which only need each user's rows."""
+    n = len(df)
+    dt, timed, ns = _timestamps(df)
+    positions = np.arange(n)
+    users = _codes(df["User_ID"])
+    amounts = df["TransactionAmt"].to_numpy(np.float64)
+    hours = np.where(timed, dt.dt.hour.fillna(0).to_numpy(np.int64), 0)
+    slot_hours = HOUR_TO_SLOT_HOUR[hours]
+    features = {
+        "TransactionTimeSlot_E2": HOUR_TO_SLOT[hours],
+        "HourWithinSlot_E3": slot_hours,
+        "TransactionWeekday_E4": np.where(timed, dt.dt.weekday.fillna(0).to_numpy(np.int64), 0),
+    }
+
+    # Previous row of the user (E5, D2, M6)
+    previous = _previous(users, positions)
+    has_previous = previous >= 0
+    elapsed_ns = np.where(has_previous & timed & timed[previous], ns - ns[previous], 0)
+    features["AvgTransactionInterval_E5"] = elapsed_ns / NS_PER_HOUR
+
+    # Amount statistics over the user's rows so far, shifted by the user's first amount for precision
+    count = pd.Series(users).groupby(users, sort=False).cumcount().to_numpy() + 1
+    first = amounts[pd.Series(positions).groupby(users, sort=False).transform("first").to_numpy()]
+    shifted = amounts - first
+    sum_shifted = _running_sum(shifted, users)
+    sum_squares = _running_sum(shifted * shifted, users)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(count > 1, (sum_squares - sum_shifted * sum_shifted / count) / (count - 1), 0.0)
+        mean = first + sum_shifted / count
+        features["TransactionAmountVariance_E6"] = np.sqrt(np.maximum(variance, 0.0))
+        features["TransactionRatio_E7"] = np.where(mean != 0, amounts / mean, 0.0)
+    median = pd.Series(amounts).groupby(users, sort=False).expanding().median()
+    median = median.reset_index(level=0, drop=True).sort_index().to_numpy()
+    features["MedianTransactionAmount_E8"] = median
+
+    # 24h window over the timed rows; rows without a timestamp see the window as the user's last timed row left it
+    window_count = np.full(n, np.nan)
+    window_mean = np.full(n, np.nan)
+    if timed.any():
+        window_count[timed], window_mean[timed] = trailing_window(users[timed], ns[timed], amounts[timed],
+                                                                  WINDOW_24H_NS)
+    window_count = pd.Series(window_count).groupby(users, sort=False).ffill().fillna(0).to_numpy()
+    window_mean = pd.Series(window_mean).groupby(users, sort=False).ffill().fillna(0).to_numpy()
+    features["AvgTransactionAmt_24Hrs_E9"] = window_mean
+    # Only non-zero while the user's whole history is within the window, like the original groupby result
+    features["TransactionVelocity_E10"] = np.where(window_count == count, count, 0)
+    # The user's hour/region frequency tables include the current row, so it is never anomalous against them
+    features["TimingAnomaly_E11"] = np.zeros(n, np.int64)
+    features["RegionAnomaly_E12"] = np.zeros(n, np.int64)
+    features["HourlyTransactionCount_E13"] = _running_sum(timed.astype(np.int64), [users, slot_hours])
+
+    features["DaysSinceLastTransac_D2"] = elapsed_ns / NS_PER_DAY
+
+    cards = _codes(df["CardNumber"])
+    user_regions = _codes(df["User_Region"])
+    order_regions = _codes(df["Order_Region"])
+    merchants = _codes(df["Merchant"])
+    devices = _codes(df["DeviceType"], sort=True)
+    features["TransactionCount_C1"] = _running_count([users, cards, order_regions], (cards >= 0) & (order_regions >= 0))
+    features["UniqueMerchants_C4"] = _running_distinct([users, cards], merchants, (cards >= 0) & (merchants >= 0))
+    features["SameBRegionCount_C5"] = _running_count([users, user_regions], user_regions >= 0)
+    features["SameDeviceCount_C6"] = _running_count([users, devices], devices >= 0)
+    features["UniqueBRegion_C11"] = _running_distinct([users], user_regions, user_regions >= 0)
+
+    mode = _device_mode(users, devices, devices >= 0)
+    device_matching = ((devices >= 0) & (devices == mode)).astype(np.int64)
+    previous_device = np.where(has_previous, devices[np.maximum(previous, 0)], -1)
+    device_mismatch = np.where((previous_device >= 0) & (devices == previous_device), 0, 1)
+    # Two missing regions count as a match, like None == None in the API
+    region_mismatch = np.where(user_regions >= 0, df["Order_Region"].to_numpy() != df["User_Region"].to_numpy(),
+                               order_regions >= 0).astype(np.int64)
+    features["DeviceMatching_M4"] = device_matching
+    features["DeviceMismatch_M6"] = device_mismatch
+    features["RegionMismatch_M8"] = region_mismatch
+    features["TransactionConsistency_M9"] = (
+        device_matching + (1 - device_mismatch) + (1 - region_mismatch) + (amounts <= median * 1.5)
+    )
+    return pd.DataFrame({name: features[name] for name in FEATURE_COLUMNS if name in features}, index=df.index)
+
+
+class IncrementalFeatures:
+    """Single-transaction mode: per-user state and entity index, in memory."""
+
+    def __init__(self):
+        self.users = {}
+        self.entities = EntityLastSeenIndex()
+
+    def observe(self, transaction):
+        """Features of ``transaction`` (a mapping of ``FEATURE_INPUT_COLUMNS``), then fold it into the state."""
+        dt = parse_timestamp(transaction["TransactionDT"])
+        state = self.users.get(transaction["User_ID"])
+        if state is None:
+            state = self.users[transaction["User_ID"]] = UserFeatureState()
+        features = state.observe(transaction, dt)
+        features.update(self.entities.observe(transaction, None if pd.isna(dt) else dt.value))
+        return {name: features[name] for name in FEATURE_COLUMNS}
+
+    def observe_frame(self, df):
+        """``observe`` every row of ``df`` in order; returns a DataFrame like ``compute_features``."""
+        inputs = df[list(FEATURE_INPUT_COLUMNS)]
+        records = inputs.astype(object).where(inputs.notna(), None)
+        rows = [self.observe(record) for record in records.to_dict("records")]
+        return pd.DataFrame(rows, columns=list(FEATURE_COLUMNS), index=df.index)
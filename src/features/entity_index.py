@@ -0,0 +1,125 @@
+"""Global last-seen timestamps for the cross-entity D features.
+
+``SameCardDaysDiff_D3``, ``SameAddressDaysDiff_D4``,
+``SameReceiverEmailDaysDiff_D10`` and ``SameDeviceTypeDaysDiff_D11`` are
+grouped by card, (User_Region, Order_Region), merchant email and device type
+across all users in training. The online path only looked at the current
+user's rows, so they never matched. ``EntityLastSeenIndex`` keeps the latest
+timestamp per key in memory: it is rebuilt from the database at startup,
+updated on every scored transaction, and each D feature is one dict lookup.
+"""
+
+import pandas as pd
+
+from src.db.queries import ENTITY_KEYS, fetch_all_last_seen, fetch_last_seen
+
+NS_PER_DAY = 86400 * 1_000_000_000
+
+# D feature computed from each entity's last-seen timestamp
+ENTITY_FEATURES = {
+    "card": "SameCardDaysDiff_D3",
+    "address": "SameAddressDaysDiff_D4",
+    "merchant_email": "SameReceiverEmailDaysDiff_D10",
+    "device": "SameDeviceTypeDaysDiff_D11",
+}
+
+
+def entity_key(entity, transaction):
+    """Hashable key of ``transaction`` for ``entity``, or None when any of its columns is missing."""
+    values = tuple(transaction[column] for column in ENTITY_KEYS[entity])
+    if any(value is None for value in values):
+        return None
+    return values if len(values) > 1 else values[0]
+
+
+def _to_ns(value):
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    return None if pd.isna(timestamp) else timestamp.value
+
+
+def read_last_seen(bind, transaction):
+    """``(entity, key, latest stored timestamp ns or None)`` for each key of ``transaction``."""
+    stored = []
+    for entity in ENTITY_FEATURES:
+        key = entity_key(entity, transaction)
+        if key is not None:
+            stored.append((entity, key, _to_ns(fetch_last_seen(bind, entity, key if isinstance(key, tuple) else (key,)))))
+    return stored
+
+
+class EntityLastSeenIndex:
+    """Latest transaction timestamp (ns) per card, address, merchant email and device type."""
+
+    def __init__(self):
+        self._last_ns = {entity: {} for entity in ENTITY_FEATURES}
+
+    def observe(self, transaction, now_ns):
+        """D features for ``transaction`` at ``now_ns``, then record it as the latest for its keys."""
+        features = {}
+        for entity, feature in ENTITY_FEATURES.items():
+            last_seen = self._last_ns[entity]
+            key = entity_key(entity, transaction)
+            last_ns = last_seen.get(key) if key is not None else None
+            features[feature] = (now_ns - last_ns) / NS_PER_DAY if now_ns is not None and last_ns is not None else 0.0
+            if key is not None and now_ns is not None and (last_ns is None or now_ns > last_ns):
+                last_seen[key] = now_ns
+        return features
+
+    def last_seen(self, entity):
+        """The ``{key: timestamp_ns}`` table of ``entity``, for bulk lookups and updates."""
+        return self._last_ns[entity]
+
+    def rebuild(self, bind):
+        """Reload every key's latest timestamp from the transactions table."""
+        for entity in ENTITY_FEATURES:
+            last_seen = {}
+            for row in fetch_all_last_seen(bind, entity):
+                last_ns = _to_ns(row[-1])
+                if last_ns is not None:
+                    last_seen[tuple(row[:-1]) if len(row) > 2 else row[0]] = last_ns
+            self._last_ns[entity] = last_seen
+
+    def refresh(self, bind, transaction, keep_newer=False):
+        """Reload the keys of ``transaction`` from the database, e.g. after its write was rolled back.
+
+        With ``keep_newer`` a key only moves forward: the database value wins
+        when it is later than the one in memory. That picks up rows written by
+        other processes without losing this one's not yet committed rows.
+        """
+        self.apply(read_last_seen(bind, transaction), keep_newer)
+
+    def apply(self, stored, keep_newer=False):
+        """Update keys from ``read_last_seen`` rows; like ``refresh`` without its database reads."""
+        for entity, key, last_ns in stored:
+            current = self._last_ns[entity].get(key)
+            if keep_newer and current is not None and (last_ns is None or current >= last_ns):
+                continue
+            if last_ns is None:
+                self._last_ns[entity].pop(key, None)
+            else:
+                self._last_ns[entity][key] = last_ns
+
+    def retract(self, transaction, now_ns, pending=()):
+        """Undo ``observe(transaction, now_ns)`` on the keys it is still the latest for.
+
+        Such a key goes back to the latest ``(transaction, timestamp_ns)`` of
+        ``pending`` with the same key, or is dropped; ``apply`` then restores
+        the stored value. Keys a later transaction has moved on are kept.
+        """
+        if now_ns is None:
+            return
+        for entity in ENTITY_FEATURES:
+            key = entity_key(entity, transaction)
+            if key is None or self._last_ns[entity].get(key) != now_ns:
+                continue
+            latest = max((ns for other, ns in pending if ns is not None and entity_key(entity, other) == key),
+                         default=None)
+            if latest is None:
+                self._last_ns[entity].pop(key, None)
+            else:
+                self._last_ns[entity][key] = latest
+
+    def __len__(self):
+        return sum(len(last_seen) for last_seen in self._last_ns.values())
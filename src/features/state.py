@@ -0,0 +1,407 @@
+"""Incremental per-user feature state for the online scoring path.
+
+The original ``calculate_engineered_features`` re-read a user's full history on
+every request and recomputed every E/D/C/M feature over it just to keep the
+last row. ``UserFeatureState`` keeps the running aggregates those features
+need, so folding in a new transaction costs O(1) (O(log n) for the exact
+median) no matter how long the history is. The amount statistics come from
+src/features/streaming.py. The median is exact up to ``MEDIAN_EXACT_LIMIT``
+transactions per user and within ``MEDIAN_ACCURACY`` of it beyond.
+
+A state is rebuilt from the user's rows in TransactionDT order (then
+TransactionID), and new transactions are folded in as they arrive, so the
+two agree as long as transactions arrive in time order.
+
+The cross-entity D features (card, address, merchant email, device) are not
+per user; ``FeatureStateStore`` serves them from an ``EntityLastSeenIndex``.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import pandas as pd
+
+from src.db.queries import HISTORY_COLUMNS, count_other_user_transactions, fetch_user_history
+from src.features.entity_index import EntityLastSeenIndex, read_last_seen
+from src.features.streaming import RunningMoments, StreamingMedian
+from src.features.vectorized import HOUR_TO_SLOT, HOUR_TO_SLOT_HOUR
+from src.features.windows import SlidingWindows
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+NS_PER_DAY = 86400 * NS_PER_SECOND
+WINDOW_24H_NS = 24 * NS_PER_HOUR
+
+# Time windows kept per user, relative to their latest TransactionDT. E9/E10 use "24h";
+# a shorter velocity feature only needs its length added here (see src/features/windows.py)
+USER_WINDOWS = {"24h": WINDOW_24H_NS}
+
+# E8 is exact for users with up to this many transactions; beyond, it comes from a sketch
+# with a relative error of at most MEDIAN_ACCURACY and bounded memory
+MEDIAN_EXACT_LIMIT = int(os.environ.get("FRAUD_SHIELD_MEDIAN_EXACT_LIMIT", "10000"))
+MEDIAN_ACCURACY = float(os.environ.get("FRAUD_SHIELD_MEDIAN_ACCURACY", "0.005"))
+# Shared mode: re-hydrate a user after this many transactions observed here, to bound the staleness query
+LOCAL_IDS_LIMIT = 256
+# User states kept in memory; the least recently used beyond this are dropped and re-hydrated on next use
+MAX_USER_STATES = int(os.environ.get("FRAUD_SHIELD_MAX_USER_STATES", "100000"))
+
+
+def parse_timestamp(value):
+    return pd.Timestamp(value) if value is not None else pd.NaT
+
+
+def _days_since(now_ns, last_ns):
+    if now_ns is None or last_ns is None:
+        return 0.0
+    return (now_ns - last_ns) / NS_PER_DAY
+
+
+class UserFeatureState:
+    """Running aggregates over one user's transactions."""
+
+    __slots__ = (
+        "count", "amount_moments", "amount_median",
+        "last_ns", "windows",
+        "slot_hour_counts", "user_region_counts", "device_counts",
+        "mode_device", "mode_count", "last_device",
+        "card_region_counts", "merchants_by_card",
+    )
+
+    def __init__(self):
+        self.count = 0
+        # Amount statistics: Welford mean/variance and the streaming median
+        self.amount_moments = RunningMoments()
+        self.amount_median = StreamingMedian(MEDIAN_EXACT_LIMIT, MEDIAN_ACCURACY)
+        # Time state: previous row and the amount windows relative to the latest timestamp
+        self.last_ns = None
+        self.windows = SlidingWindows(USER_WINDOWS)
+        # Frequency tables
+        self.slot_hour_counts = Counter()
+        self.user_region_counts = Counter()
+        self.device_counts = Counter()
+        self.mode_device = None
+        self.mode_count = 0
+        self.last_device = None
+        self.card_region_counts = Counter()
+        self.merchants_by_card = {}
+
+    def observe(self, transaction, dt=None):
+        """Fold ``transaction`` into the state and return its per-user engineered features.
+
+        ``transaction`` needs the raw ``TransactionIn`` fields; ``dt`` is its
+        parsed TransactionDT when the caller already has it. The returned dict
+        holds every feature ``calculate_engineered_features`` produces except
+        ``Distance`` and the cross-entity D features.
+        """
+        amount = float(transaction["TransactionAmt"])
+        if dt is None:
+            dt = parse_timestamp(transaction["TransactionDT"])
+        now_ns = None if pd.isna(dt) else dt.value
+        card = transaction["CardNumber"]
+        user_region = transaction["User_Region"]
+        order_region = transaction["Order_Region"]
+        device = transaction["DeviceType"]
+
+        # D2 looks at the previous row, so read it before updating
+        features = {"DaysSinceLastTransac_D2": _days_since(now_ns, self.last_ns)}
+        interval_hours = 0.0
+        if now_ns is not None and self.last_ns is not None:
+            interval_hours = (now_ns - self.last_ns) / NS_PER_HOUR
+        previous_device = self.last_device
+        had_history = self.count > 0
+        hour = dt.hour if now_ns is not None else 0
+        slot_hour = int(HOUR_TO_SLOT_HOUR[hour])
+
+        self._update(amount, now_ns, slot_hour, card, user_region, order_region, transaction["Merchant"], device)
+
+        median = self.amount_median.median()
+        device_matching = 1 if device is not None and device == self.mode_device else 0
+        device_mismatch = 0 if had_history and previous_device is not None and device == previous_device else 1
+        region_mismatch = 0 if order_region == user_region else 1
+        window = self.windows["24h"]
+
+        features.update({
+            "TransactionTimeSlot_E2": int(HOUR_TO_SLOT[hour]),
+            "HourWithinSlot_E3": slot_hour,
+            "TransactionWeekday_E4": dt.weekday() if now_ns is not None else 0,
+            "AvgTransactionInterval_E5": interval_hours,
+            "TransactionAmountVariance_E6": self.amount_moments.std,
+            "TransactionRatio_E7": amount / self.amount_moments.mean if self.amount_moments.mean != 0 else 0.0,
+            "MedianTransactionAmount_E8": median,
+            "AvgTransactionAmt_24Hrs_E9": window.mean,
+            # The original groupby result was aligned on the window's own index, so the
+            # current row only received a count when the whole history fell in the window
+            "TransactionVelocity_E10": self.count if window.count == self.count else 0,
+            # The user's hour/region frequency tables include the current row, so it is
+            # never anomalous against them
+            "TimingAnomaly_E11": 0,
+            "RegionAnomaly_E12": 0,
+            "HourlyTransactionCount_E13": self.slot_hour_counts[slot_hour],
+            "TransactionCount_C1": self.card_region_counts[(card, order_region)] if card is not None and order_region is not None else 0,
+            "UniqueMerchants_C4": len(self.merchants_by_card.get(card, ())),
+            "SameBRegionCount_C5": self.user_region_counts[user_region] if user_region is not None else 0,
+            "SameDeviceCount_C6": self.device_counts[device] if device is not None else 0,
+            "UniqueBRegion_C11": len(self.user_region_counts),
+            "DeviceMatching_M4": device_matching,
+            "DeviceMismatch_M6": device_mismatch,
+            "RegionMismatch_M8": region_mismatch,
+            "TransactionConsistency_M9": (
+                device_matching + (1 - device_mismatch) + (1 - region_mismatch)
+                + (1 if amount <= median * 1.5 else 0)
+            ),
+        })
+        return features
+
+    def _update(self, amount, now_ns, slot_hour, card, user_region, order_region, merchant, device):
+        self.count += 1
+        self.amount_moments.push(amount)
+        self.amount_median.push(amount)
+
+        self.last_ns = now_ns
+        if now_ns is not None:
+            self.windows.push(now_ns, amount)
+            self.slot_hour_counts[slot_hour] += 1
+
+        if user_region is not None:
+            self.user_region_counts[user_region] += 1
+        if device is not None:
+            self.device_counts[device] += 1
+            # Mode of DeviceType, ties broken by the smallest value like Series.mode()
+            seen = self.device_counts[device]
+            if seen > self.mode_count or (seen == self.mode_count and device < self.mode_device):
+                self.mode_device, self.mode_count = device, seen
+        self.last_device = device
+        if card is not None:
+            if order_region is not None:
+                self.card_region_counts[(card, order_region)] += 1
+            merchants = self.merchants_by_card.setdefault(card, set())
+            if merchant is not None:
+                merchants.add(merchant)
+
+
+class FeatureStateStore:
+    """Per-user ``UserFeatureState`` cache plus the global ``EntityLastSeenIndex``.
+
+    User states are hydrated lazily from the transactions table; the entity
+    index is loaded by ``rebuild``. Safe to share between worker threads:
+    updates are serialized by a lock, database reads happen outside it. At
+    most ``max_users`` states are kept, least recently used first out; an
+    evicted user is re-hydrated on next use.
+
+    A transaction is pending from ``observe`` until its write is settled:
+    ``confirm`` once it is stored, ``rollback`` if the write failed. Pending
+    transactions are replayed on top of the stored history whenever a user is
+    hydrated, so rows other requests have not committed yet are never lost.
+    ``rollback`` takes only the failed transaction out: its user's state is
+    rebuilt from the table and the remaining pending transactions, and each of
+    its entity keys goes back to the latest stored or pending timestamp unless
+    a later transaction has moved it on since.
+
+    With ``shared=True`` other processes write to the same table (several
+    server workers). Each state remembers how many stored rows it was
+    hydrated from and the TransactionIDs this process folded into it since.
+    Before each transaction, the user's state is rebuilt if the table holds
+    more rows besides those IDs than it was hydrated from (an index-only
+    COUNT, which only grows as other workers commit; TransactionIDs come from
+    clients, so they are not monotonic themselves). The transaction's entity
+    keys are refreshed from the table too. Rows another worker has not
+    committed yet are picked up on the next call.
+
+    ``on_history_read(nanoseconds, rows)``, if given, is called after every
+    read of a user's history, e.g. to record metrics. ``on_rows_read(query,
+    rows)`` is called after the other reads: ``"user_count"`` for the
+    staleness COUNT and ``"last_seen"`` for the entity keys.
+    """
+
+    def __init__(self, shared=False, on_history_read=None, on_rows_read=None, max_users=MAX_USER_STATES):
+        # user_id -> state, least recently used first
+        self._states = OrderedDict()
+        # user_id -> (rows the state was hydrated from, TransactionIDs observed here since), when shared
+        self._synced = {}
+        # user_id -> {TransactionID: (transaction, parsed TransactionDT)} observed but not settled yet
+        self._pending = {}
+        # user_id -> sequence number of the user's latest observe/confirm/rollback, so a hydration can tell
+        # whether its history read raced with one; evicted users fall back to the latest evicted number
+        self._activity = {}
+        self._evicted_activity = 0
+        self._sequence = itertools.count(1)
+        self.entities = EntityLastSeenIndex()
+        self.shared = shared
+        self.max_users = max_users
+        self.on_history_read = on_history_read
+        self.on_rows_read = on_rows_read
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._states)
+
+    def _stale(self, user_id, bind):
+        with self._lock:
+            synced = self._synced.get(user_id)
+            if synced is None:
+                return True
+            hydrated_rows, local_ids = synced[0], list(synced[1])
+        if len(local_ids) > LOCAL_IDS_LIMIT:
+            # Re-hydrating resets the list, which keeps the COUNT's parameter list short
+            return True
+        stored_rows = count_other_user_transactions(bind, user_id, local_ids)
+        if self.on_rows_read is not None:
+            self.on_rows_read("user_count", 1)
+        return stored_rows > hydrated_rows
+
+    def _read_last_seen(self, bind, transaction):
+        stored = read_last_seen(bind, transaction)
+        if self.on_rows_read is not None:
+            self.on_rows_read("last_seen", len(stored))
+        return stored
+
+    # The helpers below run under self._lock
+
+    def _touch(self, user_id):
+        self._activity[user_id] = next(self._sequence)
+
+    def _active_since(self, user_id, sequence):
+        activity = self._activity.get(user_id)
+        return (self._evicted_activity if activity is None else activity) > sequence
+
+    def _forget_activity(self, user_id):
+        if user_id not in self._states and user_id not in self._pending:
+            self._evicted_activity = max(self._evicted_activity, self._activity.pop(user_id, 0))
+
+    def _keep(self, user_id, state):
+        self._states[user_id] = state
+        self._states.move_to_end(user_id)
+        while len(self._states) > self.max_users:
+            evicted, _ = self._states.popitem(last=False)
+            self._synced.pop(evicted, None)
+            self._forget_activity(evicted)
+
+    def _settle(self, transaction):
+        user_id = transaction["User_ID"]
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            pending.pop(transaction["TransactionID"], None)
+            if not pending:
+                del self._pending[user_id]
+        self._touch(user_id)
+        self._forget_activity(user_id)
+
+    def _hydrate(self, user_id, bind, replace=None):
+        """Build the user's state from the table plus its pending transactions; keeps a state another thread
+        built meanwhile unless it is ``replace``."""
+        while True:
+            sequence = next(self._sequence)
+            start = time.perf_counter_ns()
+            history = fetch_user_history(bind, user_id, HISTORY_COLUMNS + ("TransactionID",))
+            if self.on_history_read is not None:
+                self.on_history_read(time.perf_counter_ns() - start, len(history))
+            with self._lock:
+                if self._active_since(user_id, sequence):
+                    # A transaction of the user was observed or settled during the read: read again
+                    continue
+                state = self._states.get(user_id)
+                if state is not None and state is not replace:
+                    self._keep(user_id, state)
+                    return state
+                state = UserFeatureState()
+                stored_ids = set()
+                for row in history:
+                    state.observe(row)
+                    stored_ids.add(row["TransactionID"])
+                local_ids = set()
+                for transaction_id, (transaction, dt) in self._pending.get(user_id, {}).items():
+                    if transaction_id not in stored_ids:
+                        state.observe(transaction, dt)
+                        local_ids.add(transaction_id)
+                self._keep(user_id, state)
+                if self.shared:
+                    self._synced[user_id] = (len(history), local_ids)
+                return state
+
+    def get(self, user_id, bind):
+        """Return the state for ``user_id``, replaying its stored history on first use."""
+        current = self._states.get(user_id)
+        if current is not None and not (self.shared and self._stale(user_id, bind)):
+            return current
+        return self._hydrate(user_id, bind, replace=current)
+
+    def observe(self, transaction, bind):
+        """Engineered features of ``transaction`` (all but Distance), folding it into the state.
+
+        The transaction stays pending until ``confirm`` or ``rollback``.
+        """
+        return self.observe_batch([transaction], bind)[0]
+
+    def observe_batch(self, transactions, bind):
+        """``observe`` for each of ``transactions`` in order, e.g. a batch request.
+
+        Each user's state is looked up (and hydrated or checked for staleness)
+        once per batch rather than once per transaction, and the lock is taken
+        once for the whole batch.
+        """
+        timestamps = [parse_timestamp(transaction["TransactionDT"]) for transaction in transactions]
+        # Database reads before taking the lock, so scoring threads never wait on another's I/O
+        states = {}
+        for transaction in transactions:
+            user_id = transaction["User_ID"]
+            if user_id not in states:
+                states[user_id] = self.get(user_id, bind)
+        stored = [self._read_last_seen(bind, transaction) if self.shared else None for transaction in transactions]
+        results = []
+        with self._lock:
+            for transaction, dt, rows in zip(transactions, timestamps, stored):
+                user_id = transaction["User_ID"]
+                # A rollback may have rebuilt the state since get(), or it may have been evicted
+                state = states[user_id] = self._states.get(user_id, states[user_id])
+                self._keep(user_id, state)
+                self._pending.setdefault(user_id, {})[transaction["TransactionID"]] = (transaction, dt)
+                self._touch(user_id)
+                if rows is not None:
+                    self.entities.apply(rows, keep_newer=True)
+                    synced = self._synced.get(user_id)
+                    if synced is not None:
+                        synced[1].add(transaction["TransactionID"])
+                features = state.observe(transaction, dt)
+                features.update(self.entities.observe(transaction, None if pd.isna(dt) else dt.value))
+                results.append(features)
+        return results
+
+    def confirm(self, transactions):
+        """Settle ``observe``d transactions whose write succeeded."""
+        with self._lock:
+            for transaction in transactions:
+                self._settle(transaction)
+
+    def rollback(self, transactions, bind):
+        """Undo ``observe`` for transactions whose write failed, leaving every other transaction in place."""
+        stored = [self._read_last_seen(bind, transaction) for transaction in transactions]
+        with self._lock:
+            for transaction in transactions:
+                self._settle(transaction)
+            pending = [(transaction, None if pd.isna(dt) else dt.value)
+                       for user_pending in self._pending.values() for transaction, dt in user_pending.values()]
+            for transaction, rows in zip(transactions, stored):
+                dt = parse_timestamp(transaction["TransactionDT"])
+                self.entities.retract(transaction, None if pd.isna(dt) else dt.value, pending)
+                self.entities.apply(rows, keep_newer=True)
+            current = {transaction["User_ID"]: self._states.get(transaction["User_ID"]) for transaction in transactions}
+        for user_id, state in current.items():
+            if state is not None:
+                self._hydrate(user_id, bind, replace=state)
+
+    def rebuild(self, bind):
+        """Drop all user states and reload the entity index, e.g. at startup."""
+        with self._lock:
+            self._states.clear()
+            self._synced.clear()
+            self.entities.rebuild(bind)
+
+    def invalidate(self, user_id):
+        """Drop the cached state so it is rebuilt from the DB on next use."""
+        with self._lock:
+            self._states.pop(user_id, None)
+            self._synced.pop(user_id, None)
+            self._forget_activity(user_id)
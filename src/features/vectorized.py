@@ -0,0 +1,13 @@
+"""Lookup tables for the hour-slot features, shared by the batch and incremental modes.
+
+Indexing them with an hour or an array of hours replaces the row-wise
+``apply`` chains of comparisons. The features that used such ``apply`` calls
+are computed in src/features/engineered.py.
+"""
+
+import numpy as np
+
+# TransactionTimeSlot_E2 and HourWithinSlot_E3 for each hour of the day.
+# Slots: 0 = 10-14h, 1 = 14-18h, 2 = 18-22h, 3 = 22-2h, 4 = 2-6h, 5 = 6-10h
+HOUR_TO_SLOT = np.array([3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3])
+HOUR_TO_SLOT_HOUR = np.array([2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1, 2, 3, 0, 1])
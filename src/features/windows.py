@@ -0,0 +1,121 @@
+"""Time-windowed running aggregates over ring buffers.
+
+A ``RingWindow`` holds the ``(timestamp, value)`` entries of a stream that are
+no older than its length, measured back from the newest timestamp seen, and
+keeps their count and sum. Entries are kept in time order in a
+``collections.deque``, CPython's ring buffer of fixed-size arrays. New entries
+are appended at the tail and expired ones popped from the head. Each entry is
+appended and popped once, so count, sum and mean cost amortized O(1) per push,
+whatever the window length. A sorted list (``bisect.insort`` plus slice
+deletion) instead moves the whole window in memory on every eviction, which
+grows with the window.
+
+Entries that arrive late (older than the newest one) are inserted in time
+order after a scan back from the tail, which costs as many steps as the number
+of newer entries they arrive after. Entries already older than the window when
+they arrive are not stored. This matches the legacy ``groupby().apply()``
+filter, which kept the rows within 24h of the user's latest TransactionDT.
+
+``SlidingWindows`` keeps one ring per window length over the same stream (say
+30s, 1h, 24h and 7d), and ``KeyedWindows`` one ``SlidingWindows`` per key
+(user, card, ...).
+"""
+
+from collections import deque
+
+NS_PER_SECOND = 1_000_000_000
+
+# Common window lengths in nanoseconds
+WINDOW_LENGTHS = {
+    "30s": 30 * NS_PER_SECOND,
+    "1h": 3600 * NS_PER_SECOND,
+    "24h": 86400 * NS_PER_SECOND,
+    "7d": 7 * 86400 * NS_PER_SECOND,
+}
+
+
+class RingWindow:
+    """Count, sum and mean of the values pushed within ``length_ns`` of the newest timestamp."""
+
+    __slots__ = ("length_ns", "newest_ns", "total", "_entries")
+
+    def __init__(self, length_ns):
+        self.length_ns = length_ns
+        self.newest_ns = None
+        self.total = 0.0
+        self._entries = deque()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def count(self):
+        return len(self._entries)
+
+    @property
+    def mean(self):
+        return self.total / len(self._entries) if self._entries else 0.0
+
+    def push(self, timestamp_ns, value):
+        """Add an entry, then drop every entry older than the window."""
+        entries = self._entries
+        newest = self.newest_ns
+        if newest is None or timestamp_ns >= newest:
+            self.newest_ns = newest = timestamp_ns
+            entries.append((timestamp_ns, value))
+            self.total += value
+        elif timestamp_ns >= newest - self.length_ns:
+            # Late arrival: insert after the last entry that is not newer
+            i = len(entries)
+            while i and entries[i - 1][0] > timestamp_ns:
+                i -= 1
+            entries.insert(i, (timestamp_ns, value))
+            self.total += value
+        threshold = newest - self.length_ns
+        while entries and entries[0][0] < threshold:
+            self.total -= entries.popleft()[1]
+        if len(entries) == 1:
+            # The newest entry always stays: drop any rounding error the subtractions left behind
+            self.total = entries[0][1]
+
+    def entries(self):
+        """``(timestamp_ns, value)`` pairs in the window, oldest first."""
+        return list(self._entries)
+
+
+class SlidingWindows:
+    """One ``RingWindow`` per named length over the same stream of entries."""
+
+    __slots__ = ("windows",)
+
+    def __init__(self, lengths):
+        self.windows = {name: RingWindow(length_ns) for name, length_ns in lengths.items()}
+
+    def push(self, timestamp_ns, value):
+        for window in self.windows.values():
+            window.push(timestamp_ns, value)
+
+    def __getitem__(self, name):
+        return self.windows[name]
+
+
+class KeyedWindows:
+    """``SlidingWindows`` per key, created on a key's first entry."""
+
+    def __init__(self, lengths):
+        self.lengths = dict(lengths)
+        self._by_key = {}
+
+    def push(self, key, timestamp_ns, value):
+        """Add an entry for ``key`` and return that key's ``SlidingWindows``."""
+        windows = self._by_key.get(key)
+        if windows is None:
+            windows = self._by_key[key] = SlidingWindows(self.lengths)
+        windows.push(timestamp_ns, value)
+        return windows
+
+    def get(self, key):
+        return self._by_key.get(key)
+
+    def __len__(self):
+        return len(self._by_key)
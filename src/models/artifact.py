@@ -0,0 +1,130 @@
+"""Versioned model artifact for serving.
+
+One file holds everything the scoring path needs: the booster in XGBoost's
+native UBJSON format, the categorical vocabularies, the feature order, the
+fraud threshold and the iteration range. Layout::
+
+    b"FRAUDART"  | uint64 header length (little endian) | JSON header | booster bytes
+
+Loading ``mmap``s the file read-only and parses the header in place; no
+pickle (or sklearn) is involved. The booster is then deserialized into the
+loading process's own memory, since XGBoost cannot run from an external
+buffer, so every worker holds a private copy of the model (about 0.1 MiB
+today). Only the file's pages in the OS page cache and the shared libraries
+are shared between workers. Build it from the training outputs with::
+
+    python -m src.models.artifact src/models/xgb_fraud_model.pkl src/models/label_encoders.pkl src/models/fraud_model.artifact
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+from datetime import datetime, timezone
+
+from src.models.booster import Booster
+from src.models.encoders import CategoryVocabulary, normalize_column_name
+from src.models.explain import ContributionExplainer
+from src.models.scoring import FRAUD_THRESHOLD, CompiledScorer
+
+MAGIC = b"FRAUDART"
+FORMAT_VERSION = 1
+_LENGTH = struct.Struct("<Q")
+
+
+def write_artifact(path, booster, feature_names, vocabularies, threshold=FRAUD_THRESHOLD, iteration_range=(0, 0)):
+    """Write an artifact; ``vocabularies`` maps feature name -> list of classes. Returns its header."""
+    model_bytes = bytes(booster.save_raw("ubj"))
+    header = {
+        "format_version": FORMAT_VERSION,
+        # Content hash of the booster, so logs and metrics can tell model versions apart
+        "model_version": hashlib.sha256(model_bytes).hexdigest()[:12],
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "feature_names": [str(name) for name in feature_names],
+        "vocabularies": {str(name): [str(value) for value in classes] for name, classes in vocabularies.items()},
+        "threshold": float(threshold),
+        "iteration_range": list(iteration_range),
+        "booster_format": "ubj",
+        "booster_length": len(model_bytes),
+    }
+    header_bytes = json.dumps(header).encode()
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        f.write(model_bytes)
+    return header
+
+
+class ModelArtifact:
+    """A loaded artifact: booster, vocabularies, feature order and threshold."""
+
+    def __init__(self, header, booster):
+        self.header = header
+        self.booster = booster
+        self.version = header["model_version"]
+        self.feature_names = header["feature_names"]
+        self.vocabularies = {name: CategoryVocabulary(classes) for name, classes in header["vocabularies"].items()}
+        self.threshold = header["threshold"]
+        self.iteration_range = tuple(header["iteration_range"])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a model artifact")
+            header_start = len(MAGIC) + _LENGTH.size
+            (header_length,) = _LENGTH.unpack_from(mapped, len(MAGIC))
+            header = json.loads(mapped[header_start:header_start + header_length])
+            if header["format_version"] != FORMAT_VERSION:
+                raise ValueError(f"{path} has artifact format {header['format_version']}, expected {FORMAT_VERSION}")
+            model_start = header_start + header_length
+            booster = Booster()
+            # load_model parses the bytes into a booster in this process's heap; the one copy made here is
+            # freed once it returns. What workers share is the file's page cache, not the booster.
+            with memoryview(mapped) as view:
+                booster.load_model(bytearray(view[model_start:model_start + header["booster_length"]]))
+        return cls(header, booster)
+
+    def scorer(self, threshold=None):
+        """``CompiledScorer`` for this model; ``threshold`` defaults to the artifact's."""
+        threshold = self.threshold if threshold is None else threshold
+        return CompiledScorer(self.booster, self.feature_names, self.vocabularies, threshold, self.iteration_range)
+
+    def explainer(self, approximate=False):
+        return ContributionExplainer(self.booster, self.feature_names, approximate=approximate)
+
+
+def build_from_training_outputs(model_path, encoders_path, path, threshold=FRAUD_THRESHOLD):
+    """Artifact from the pickled ``XGBClassifier`` and ``LabelEncoder`` dict that model.py saves."""
+    import joblib
+
+    model = joblib.load(model_path)
+    encoders = joblib.load(encoders_path)
+    feature_names = [str(name) for name in model.feature_names_in_]
+    # Encoder columns are matched to features case- and underscore-insensitively (Card_Network -> CardNetwork)
+    by_key = {normalize_column_name(name): name for name in feature_names}
+    vocabularies = {
+        by_key[normalize_column_name(column)]: encoder.classes_
+        for column, encoder in encoders.items()
+        if normalize_column_name(column) in by_key
+    }
+    best_iteration = getattr(model, "best_iteration", None)
+    iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+    return write_artifact(path, model.get_booster(), feature_names, vocabularies, threshold, iteration_range)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the serving artifact from model.py's outputs.")
+    parser.add_argument("model", help="pickled XGBClassifier (xgb_fraud_model.pkl)")
+    parser.add_argument("encoders", help="pickled LabelEncoder dict (label_encoders.pkl)")
+    parser.add_argument("output", help="artifact path, e.g. src/models/fraud_model.artifact")
+    parser.add_argument("--threshold", type=float, default=FRAUD_THRESHOLD)
+    args = parser.parse_args()
+    header = build_from_training_outputs(args.model, args.encoders, args.output, args.threshold)
+    print(f"✅ Wrote model {header['model_version']} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""XGBoost's ``Booster`` and ``DMatrix`` for serving, without scikit-learn.
+
+Serving only needs ``xgboost.core.Booster`` and ``xgboost.core.DMatrix``, but
+importing any xgboost module first runs the package ``__init__``, which
+imports scikit-learn (and through it ``scipy.stats``) whenever it is installed,
+only to define ``XGBClassifier`` and friends. That was about 1.4 s of the
+API's start-up.
+
+When nothing in the process has imported sklearn or xgboost yet, the two
+classes are imported with sklearn hidden, so xgboost takes the path it takes
+when sklearn is not installed. That import is then dropped from
+``sys.modules``, so the next ``import xgboost`` anywhere in the process
+(training, unpickling an ``XGBClassifier``) is a normal one, with sklearn.
+The classes imported here keep their own modules alive. They are not the
+classes a normal ``import xgboost`` defines, so pass their boosters only
+their own ``DMatrix``. Libraries that check for ``xgboost.Booster`` (e.g.
+``shap.TreeExplainer``) need a booster loaded from ``save_raw()``. Otherwise
+this is a plain ``from xgboost.core import Booster, DMatrix``.
+"""
+
+import sys
+
+
+def _import_without_sklearn():
+    # A None entry makes `import sklearn` raise ImportError
+    sys.modules["sklearn"] = None
+    try:
+        from xgboost.core import Booster, DMatrix
+    finally:
+        del sys.modules["sklearn"]
+        for name in [module for module in sys.modules if module == "xgboost" or module.startswith("xgboost.")]:
+            del sys.modules[name]
+    return Booster, DMatrix
+
+
+if "xgboost" not in sys.modules and "sklearn" not in sys.modules:
+    Booster, DMatrix = _import_without_sklearn()
+else:
+    from xgboost.core import Booster, DMatrix
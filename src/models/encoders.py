@@ -0,0 +1,49 @@
+"""Categorical vocabularies for online encoding.
+
+``model.py`` saves one fitted ``LabelEncoder`` per categorical column in
+``label_encoders.pkl``. Serving used to refit fresh encoders over the whole
+transactions table on every request, which was O(table size) and produced codes
+the model never saw in training. The saved encoders' classes are stored in the
+model artifact (src/models/artifact.py) and loaded once at startup into plain
+dict lookups instead.
+"""
+
+# Training fills missing categoricals with this token before encoding
+MISSING_TOKEN = "Missing"
+# Code for values outside the training vocabulary when it has no MISSING_TOKEN
+UNKNOWN_CODE = -1
+
+
+def normalize_column_name(name):
+    """Key used to match encoder columns to model features (``Card_Network`` -> ``cardnetwork``)."""
+    return str(name).replace("_", "").lower()
+
+
+class CategoryVocabulary:
+    """Constant-time value -> code lookup built from a fitted ``LabelEncoder``."""
+
+    __slots__ = ("classes", "table", "folded", "unknown_code")
+
+    def __init__(self, classes):
+        self.classes = [str(value) for value in classes]
+        self.table = {value: code for code, value in enumerate(self.classes)}
+        # Case-insensitive fallback (training saw 'mobile', the frontend sends 'Mobile');
+        # ambiguous folds are left out so they resolve to the unknown code
+        folded = {}
+        for value, code in self.table.items():
+            key = value.casefold()
+            folded[key] = None if key in folded else code
+        self.folded = {key: code for key, code in folded.items() if code is not None}
+        self.unknown_code = self.table.get(MISSING_TOKEN, UNKNOWN_CODE)
+
+    def encode(self, value):
+        if value is None or value == "None":
+            return self.unknown_code
+        value = str(value)
+        code = self.table.get(value)
+        if code is None:
+            code = self.folded.get(value.casefold(), self.unknown_code)
+        return code
+
+    def __len__(self):
+        return len(self.classes)
@@ -28,8 +28,20 @@ import warnings
 import logging
 import os
 from xgboost import XGBClassifier
-
-df=pd.read_csv("/content/synthetic_dataset_272.csv")
+from src.data.store import STORE_ROOT, category_codes, read_store, store_columns
+from src.models.artifact import ModelArtifact, build_from_training_outputs
+from src.models.encoders import MISSING_TOKEN
+from src.models.tuning import N_TRIALS, open_study, tune, tuning_workers
+
+# Columnar store (FRAUD_SHIELD_TRAINING_STORE) built once from the CSV export:
+#   python -m src.data.store data/synthetic_dataset.csv data/transactions_store
+# Only the served model's features are read, in its artifact's order; strings arrive as categoricals.
+MODEL_ARTIFACT = os.environ.get("FRAUD_SHIELD_MODEL_ARTIFACT", "src/models/fraud_model.artifact")
+MODEL_COLUMNS = ModelArtifact.load(MODEL_ARTIFACT).feature_names
+missing_columns = sorted(set(MODEL_COLUMNS) - set(store_columns(STORE_ROOT)))
+if missing_columns:
+    raise ValueError(f"{STORE_ROOT} lacks the model's features {missing_columns}")
+df=read_store(STORE_ROOT, columns=MODEL_COLUMNS + ['isFraud'])
 
 def handle_missing_values(df, threshold=0.7):
     # 1. Identify columns with missing values
@@ -44,12 +56,7 @@ def handle_missing_values(df, threshold=0.7):
 
     # 3. Separate numerical and categorical columns
     numerical_cols = df.select_dtypes(include=['float64', 'int64']).columns
-    categorical_columns = [
-                'ProductCD', 'DeviceType', 'Merchant', 'DeviceInfo', 'Card_Network', 'Card_Tier',
-                'Card_Type', 'Sender_email', 'Merchant_email', 'User_Region', 'Order_Region',
-                'Receiver_Region', 'Device_Matching_M4', 'Phone_Numbers','Device_Mismatch_M6',
-                'RegionMismatch_M8','TransactionConsistency_M9', 'TransactionVelocity_E10',
-                'TimingAnomaly_E11','RegionAnomaly_E12']
+    categorical_columns = df.select_dtypes(include='category').columns
 
     # 4. Handle missing values for numerical columns (fill with median)
     for col in numerical_cols:
@@ -59,7 +66,9 @@ def handle_missing_values(df, threshold=0.7):
     # 5. Handle missing values for categorical columns (fill with "Missing")
     for col in categorical_columns:
         if df[col].isnull().sum() > 0:
-            df[col] = df[col].fillna("Missing")
+            if MISSING_TOKEN not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories(MISSING_TOKEN)
+            df[col] = df[col].fillna(MISSING_TOKEN)
 
     print("\nRemaining missing values (should be 0):")
     print(df.isnull().sum())
@@ -123,47 +132,41 @@ def preprocess_data(train):
     train.columns = train.columns.str.replace('-', '_')
 
     # Fill missing values
-    train.fillna(-999, inplace=True)
+    numerical_cols = train.select_dtypes(include='number').columns
+    train[numerical_cols] = train[numerical_cols].fillna(-999)
 
-    # Encode categorical features
+    # Encode categorical features from their categories, as LabelEncoder would
     label_encoders = {}
-    for col in train.select_dtypes(include='object').columns:
+    for col in train.select_dtypes(include=['category', 'object']).columns:
+        codes, classes = category_codes(train[col], MISSING_TOKEN)
         le = LabelEncoder()
-        train[col] = le.fit_transform(train[col].astype(str))
+        le.classes_ = np.array(classes, dtype=object)
+        train[col] = codes
         label_encoders[col] = le
     print("✅ Categorical features encoded successfully.")
 
     # Drop TransactionID
-    x = train.drop(['isFraud','TransactionID'], axis=1)
+    x = train.drop(['isFraud','TransactionID'], axis=1, errors='ignore')
     y = train['isFraud']
     print("✅ Data preprocessing complete.")
     return x,y,label_encoders
 
-def objective(trial, x_train, x_val, y_train, y_val):
-    params = {
-    'n_estimators': trial.suggest_int('n_estimators', 100, 300),  # Avoid overfitting
-    'learning_rate': trial.suggest_float('learning_rate', 0.05, 0.12),
-    'max_depth': trial.suggest_int('max_depth', 3, 8),  # Keep trees manageable
-    'subsample': trial.suggest_float('subsample', 0.7, 1.0),
-    'colsample_bytree': trial.suggest_float('colsample_bytree', 0.7, 1.0),
-    'gamma': trial.suggest_float('gamma', 0, 5),
-    'scale_pos_weight':sum(y_train == 0) / sum(y_train == 1),  # Adjusted to 9 (since 90:10 means 9x more legit cases)
-    'objective': 'binary:logistic',
-    'eval_metric': 'auc',
-    'tree_method': 'hist'
-    # 'device': 'gpu'
-}
-
-    model = XGBClassifier(**params)
-    model.fit(x_train, y_train, eval_set=[(x_val, y_val)], verbose=0)
-
-    val_proba = model.predict_proba(x_val)[:, 1]
-    return roc_auc_score(y_val, val_proba)
-
 def train_xgb(x_train, x_val, y_train, y_val):
-    print("\n🚀 Running Optuna hyperparameter tuning...")
-    study = optuna.create_study(direction='maximize')
-    study.optimize(lambda trial: objective(trial, x_train, x_val, y_train, y_val), n_trials=50)
+    workers, threads = tuning_workers()
+    # Stored study for this data (FRAUD_SHIELD_TUNING_STORAGE): resumed, or seeded with the previous study's best trials
+    study, warm_start = open_study(x_train, y_train)
+    if warm_start:
+        print(f"\n♻️ Warm-starting {study.study_name} from the best trials of {warm_start}")
+    else:
+        completed = len(study.get_trials(states=(optuna.trial.TrialState.COMPLETE,)))
+        if completed:
+            print(f"\n♻️ Resuming {study.study_name}: {completed} of {N_TRIALS} trials completed")
+    print(f"\n🚀 Running Optuna hyperparameter tuning ({workers} trials at a time, {threads} threads each)...")
+    finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED, optuna.trial.TrialState.FAIL)
+    trials_before = len(study.get_trials(states=finished))
+    study = tune(x_train, x_val, y_train, y_val, n_trials=N_TRIALS, workers=workers, threads=threads, study=study)
+    pruned = sum(trial.state == optuna.trial.TrialState.PRUNED for trial in study.trials[trials_before:])
+    print(f"✂️ Ran {len(study.trials) - trials_before} trials, pruned {pruned}")
 
     best_params = study.best_params
     print(f"✅ Best Parameters Found: {best_params}")
@@ -238,6 +241,9 @@ model,label_encoders= main(df)
 joblib.dump(model, 'xgb_fraud_model.pkl')
 joblib.dump(label_encoders, 'label_encoders.pkl')
 
+# Build the serving artifact (native booster, vocabularies, feature order, threshold)
+build_from_training_outputs('xgb_fraud_model.pkl', 'label_encoders.pkl', MODEL_ARTIFACT)
+
 
 
 
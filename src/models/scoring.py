@@ -0,0 +1,94 @@
+"""Model input preparation and fraud probabilities, shared by the API and the batch scorer."""
+
+import math
+
+import numpy as np
+
+# Probability above which a transaction is flagged as fraud
+FRAUD_THRESHOLD = 0.01
+
+# Column names of older dataset exports mapped to the model's feature names
+column_mapping = {
+    "Cardnumber": "CardNumber",
+    "UserID": "User_ID",
+    "BINnumber": "BINNumber",
+    "Cardnetwork": "CardNetwork",
+    "Cardtier": "CardTier",
+    "Cardtype": "CardType",
+    "Phonenumbers": "PhoneNumbers",
+    "Userregion": "User_Region",
+    "Orderregion": "Order_Region",
+    "Receiverregion": "Receiver_Region",
+    "Senderemail": "Sender_email",
+    "Merchantemail": "Merchant_email",
+    "Devicetype": "DeviceType",
+    "Deviceinfo": "DeviceInfo",
+}
+
+
+def _number(value):
+    # Same result as the DataFrame path: missing, NaN and +/-inf become 0
+    if value is None:
+        return 0.0
+    value = float(value)
+    return value if math.isfinite(value) else 0.0
+
+
+class FeatureLayout:
+    """The model's input columns, compiled once at model load.
+
+    Each column knows the transaction field that feeds it (its feature name, or
+    an older export name from ``column_mapping``) and its vocabulary, if it is
+    categorical. Transactions are written straight into rows of a float32
+    block in model column order, with no DataFrame in between.
+    """
+
+    def __init__(self, feature_names, vocabularies):
+        aliases = {}
+        for old, new in column_mapping.items():
+            aliases.setdefault(new, []).append(old)
+        self.feature_names = [str(name) for name in feature_names]
+        self.columns = [
+            ((name, *aliases.get(name, ())), vocabularies.get(name))
+            for name in self.feature_names
+        ]
+
+    def fill(self, row, transaction):
+        """Write ``transaction`` (a dict of API fields) into ``row``; absent features are 0."""
+        for i, (keys, vocabulary) in enumerate(self.columns):
+            for key in keys:
+                if key in transaction:
+                    value = transaction[key]
+                    row[i] = vocabulary.encode(value) if vocabulary is not None else _number(value)
+                    break
+            else:
+                row[i] = 0.0
+        return row
+
+    def rows(self, transactions):
+        """``(n_transactions, n_features)`` float32 block, one row per transaction."""
+        block = np.empty((len(transactions), len(self.columns)), dtype=np.float32)
+        for row, transaction in zip(block, transactions):
+            self.fill(row, transaction)
+        return block
+
+
+class CompiledScorer:
+    """Feature layout plus the raw booster: one probability call gives both score and label."""
+
+    def __init__(self, booster, feature_names, vocabularies, threshold=FRAUD_THRESHOLD, iteration_range=(0, 0)):
+        self.layout = FeatureLayout(feature_names, vocabularies)
+        self.booster = booster
+        self.threshold = threshold
+        self.iteration_range = tuple(iteration_range)
+
+    def probabilities(self, X):
+        """Fraud probability for every row of a block from ``layout.rows``."""
+        proba = self.booster.inplace_predict(X, iteration_range=self.iteration_range, validate_features=False)
+        return proba[:, 1] if proba.ndim > 1 else proba
+
+    def score(self, transactions):
+        """Model input block, fraud probabilities and fraud flags for transaction dicts."""
+        X = self.layout.rows(transactions)
+        proba = self.probabilities(X)
+        return X, proba, proba > self.threshold
@@ -0,0 +1,230 @@
+"""Parallel, pruned Optuna search over XGBoost hyperparameters for model.py.
+
+The notebook's tuning trained 50 ``XGBClassifier`` models one after another,
+each to completion and each rebuilding its training matrices from pandas. Here:
+
+- The training data is quantized once into an ``xgb.QuantileDMatrix``, with a
+  validation matrix sharing its bins, and every trial trains ``xgb.train`` on
+  those two read-only matrices.
+- ``AUCPruning`` reports the validation AUC to the trial every
+  ``REPORT_ROUNDS`` (10) boosting rounds from round ``PRUNER_WARMUP_ROUNDS``
+  (50) on, so Optuna's ``MedianPruner`` stops a trial whose AUC falls below
+  the median of earlier trials at the same round.
+- Trials run ``workers`` at a time in Optuna's thread pool (XGBoost releases
+  the GIL while training), each with ``threads`` XGBoost threads, so that
+  workers x threads does not exceed the cores. Histogram training on data of
+  this size gains little past a couple of threads per model, so by default
+  trials get ``FRAUD_SHIELD_TUNING_THREADS`` (2) threads and the cores are
+  spent on concurrent trials instead (see ``benchmarks/trial_threads.py``).
+
+The search space and the returned score, the ROC AUC of the validation set
+after the trial's last round, are the notebook's.
+
+Studies are kept in SQLite (``FRAUD_SHIELD_TUNING_STORAGE``) under a name
+made of ``SEARCH_SPACE_VERSION`` and a fingerprint of the training data:
+
+- Retraining on the same data resumes its study. ``tune`` only tops it up to
+  ``n_trials`` completed trials, and ``PlateauStop`` ends it as soon as its
+  best value has stood for ``FRAUD_SHIELD_TUNING_PATIENCE`` trials.
+- A new study is warm-started: the ``WARM_START_TRIALS`` best parameter sets
+  of the latest study of the same search space are enqueued as its first
+  trials. TPE then starts near the previous optimum, and the plateau stop
+  usually ends the search after a handful of trials instead of all 50. A
+  study interrupted before any trial completed is warm-started again, and
+  parameter sets already in it are not enqueued twice.
+- Changing ``suggest_params`` must bump ``SEARCH_SPACE_VERSION``, so that
+  parameters from another search space are never enqueued.
+
+The pruner sees the AUC every ``REPORT_ROUNDS`` rounds rather than every
+round, since each report is a write to the database. Rounds before
+``PRUNER_WARMUP_ROUNDS`` are never pruned, so they are not reported either.
+"""
+
+import hashlib
+import os
+
+import optuna
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+
+N_TRIALS = 50
+SEARCH_SPACE_VERSION = 1
+STUDY_PREFIX = f"xgb-fraud-v{SEARCH_SPACE_VERSION}-"
+STUDY_STORAGE = os.environ.get("FRAUD_SHIELD_TUNING_STORAGE", "sqlite:///optuna_studies.db")
+WARM_START_TRIALS = 5
+# Stop once this many trials in a row failed to beat the best value by more than PLATEAU_MIN_DELTA
+PLATEAU_TRIALS = int(os.environ.get("FRAUD_SHIELD_TUNING_PATIENCE", "10"))
+PLATEAU_MIN_DELTA = 1e-3
+TRIAL_THREADS = int(os.environ.get("FRAUD_SHIELD_TUNING_THREADS", "2"))
+# Trials completed before pruning starts, and rounds of every trial that are never pruned: AUC
+# still climbs steeply over the first rounds, and cutting there pruned eventual best trials
+PRUNER_STARTUP_TRIALS = 5
+PRUNER_WARMUP_ROUNDS = 50
+REPORT_ROUNDS = 10
+
+
+def tuning_workers(workers=None, threads=None, cores=None):
+    """(concurrent trials, XGBoost threads per trial) for ``cores`` (default: all), using at most that many threads."""
+    cores = cores or os.cpu_count() or 1
+    threads = max(1, min(threads or TRIAL_THREADS, cores))
+    workers = workers or max(1, cores // threads)
+    return workers, threads
+
+
+def suggest_params(trial):
+    """The notebook's search space, with ``XGBClassifier`` parameter names."""
+    return {
+        "n_estimators": trial.suggest_int("n_estimators", 100, 300),  # Avoid overfitting
+        "learning_rate": trial.suggest_float("learning_rate", 0.05, 0.12),
+        "max_depth": trial.suggest_int("max_depth", 3, 8),  # Keep trees manageable
+        "subsample": trial.suggest_float("subsample", 0.7, 1.0),
+        "colsample_bytree": trial.suggest_float("colsample_bytree", 0.7, 1.0),
+        "gamma": trial.suggest_float("gamma", 0, 5),
+    }
+
+
+class AUCPruning(xgb.callback.TrainingCallback):
+    """Report the validation AUC to ``trial`` at rounds ``start``, ``start + every``, ... and stop if it should be
+    pruned."""
+
+    def __init__(self, trial, data_name="validation", start=PRUNER_WARMUP_ROUNDS, every=REPORT_ROUNDS):
+        super().__init__()
+        self.trial = trial
+        self.data_name = data_name
+        self.start = start
+        self.every = every
+
+    def after_iteration(self, model, epoch, evals_log):
+        if epoch < self.start or epoch % self.every:
+            return False
+        auc = evals_log[self.data_name]["auc"][-1]
+        self.trial.report(auc, epoch)
+        if self.trial.should_prune():
+            raise optuna.TrialPruned(f"validation AUC {auc:.5f} at round {epoch}")
+        return False
+
+
+class TuningData:
+    """Training and validation sets quantized once and shared by every trial."""
+
+    def __init__(self, x_train, x_val, y_train, y_val):
+        self.dtrain = xgb.QuantileDMatrix(x_train, y_train)
+        self.dval = xgb.QuantileDMatrix(x_val, y_val, ref=self.dtrain)
+        self.y_val = y_val
+        # Adjusted to 9 (since 90:10 means 9x more legit cases)
+        self.scale_pos_weight = float((y_train == 0).sum() / (y_train == 1).sum())
+
+
+def objective(trial, data, threads=1):
+    params = suggest_params(trial)
+    rounds = params.pop("n_estimators")
+    params.update({
+        "scale_pos_weight": data.scale_pos_weight,
+        "objective": "binary:logistic",
+        "eval_metric": "auc",
+        "tree_method": "hist",
+        "nthread": threads,
+        # 'device': 'gpu'
+    })
+    booster = xgb.train(params, data.dtrain, num_boost_round=rounds, evals=[(data.dval, "validation")],
+                        verbose_eval=False, callbacks=[AUCPruning(trial)])
+    return roc_auc_score(data.y_val, booster.predict(data.dval))
+
+
+class PlateauStop:
+    """Study callback that stops the study once ``patience`` finished trials followed its best value.
+
+    The best value is the first one within ``min_delta`` of the study's best,
+    so trials improving on it by less than that do not restart the count.
+    Pruned trials count too: they did not improve on it.
+    """
+
+    def __init__(self, patience=PLATEAU_TRIALS, min_delta=PLATEAU_MIN_DELTA):
+        self.patience = patience
+        self.min_delta = min_delta
+
+    def __call__(self, study, trial):
+        finished = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,
+                                                             optuna.trial.TrialState.PRUNED))
+        complete = [t for t in finished if t.state == optuna.trial.TrialState.COMPLETE]
+        if not complete:
+            return
+        best = max(t.value for t in complete)
+        reached = min(t.number for t in complete if t.value >= best - self.min_delta)
+        if sum(t.number > reached for t in finished) >= self.patience:
+            study.stop()
+
+
+def data_fingerprint(x_train, y_train):
+    """Short hash of the training data, so each version of the data gets its own study."""
+    digest = hashlib.sha256()
+    digest.update(",".join(map(str, x_train.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(x_train, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(y_train), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:12]
+
+
+def create_study(seed=None, pruner=None, study_name=None, storage=None):
+    """A study maximizing validation AUC, pruned by ``MedianPruner`` unless ``pruner`` is given.
+
+    In memory by default; with ``storage`` the study ``study_name`` is created
+    there or loaded if it exists.
+    """
+    pruner = pruner or optuna.pruners.MedianPruner(n_startup_trials=PRUNER_STARTUP_TRIALS,
+                                                  n_warmup_steps=PRUNER_WARMUP_ROUNDS)
+    return optuna.create_study(direction="maximize", sampler=optuna.samplers.TPESampler(seed=seed), pruner=pruner,
+                               study_name=study_name, storage=storage, load_if_exists=storage is not None)
+
+
+def best_params(study, n):
+    """Parameters of the ``n`` best completed trials of ``study``."""
+    complete = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+    return [t.params for t in sorted(complete, key=lambda t: t.value, reverse=True)[:n]]
+
+
+def open_study(x_train, y_train, storage=STUDY_STORAGE, warm_start=WARM_START_TRIALS, seed=None):
+    """The stored study for this data and search space; one without completed trials is seeded with the latest
+    study's best trials.
+
+    Returns the study and the name of the study it was warm-started from (None if it was resumed or has no
+    predecessor).
+    """
+    name = STUDY_PREFIX + data_fingerprint(x_train, y_train)
+    study = create_study(seed, study_name=name, storage=storage)
+    if study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,)) or not warm_start:
+        return study, None
+    previous = [summary for summary in optuna.get_all_study_summaries(storage)
+                if summary.study_name.startswith(STUDY_PREFIX) and summary.study_name != name
+                and summary.best_trial is not None]
+    if not previous:
+        return study, None
+    latest = max(previous, key=lambda summary: summary.datetime_start)
+    # Parameters of the trials already in the study, run or still enqueued
+    present = [trial.system_attrs.get("fixed_params", trial.params) for trial in study.get_trials(deepcopy=False)]
+    for params in best_params(optuna.load_study(study_name=latest.study_name, storage=storage), warm_start):
+        if params not in present:
+            study.enqueue_trial(params)
+            present.append(params)
+    return study, latest.study_name
+
+
+def tune(x_train, x_val, y_train, y_val, n_trials=N_TRIALS, workers=None, threads=None, study=None,
+         patience=PLATEAU_TRIALS):
+    """Run the search on ``study`` (default ``create_study()``) until it holds ``n_trials`` completed trials; returns
+    the study.
+
+    A resumed study is only topped up. The search stops early once ``patience`` trials went without improvement;
+    ``patience=None`` runs them all.
+    """
+    workers, threads = tuning_workers(workers, threads)
+    study = study or create_study()
+    completed = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+    remaining = max(0, n_trials - len(completed))
+    if not remaining:
+        return study
+    data = TuningData(x_train, x_val, y_train, y_val)
+    callbacks = [PlateauStop(patience)] if patience else None
+    study.optimize(lambda trial: objective(trial, data, threads), n_trials=remaining, n_jobs=workers,
+                   callbacks=callbacks)
+    return study
@@ -0,0 +1,240 @@
+"""Offline batch scoring of transaction exports such as ``data/synthetic_dataset.csv``.
+
+    python -m src.serving.batch_score data/synthetic_dataset.csv scored.csv --chunksize 50000 --workers 4
+
+The CSV is read ``--chunksize`` rows at a time and its headers are mapped to
+the API's field names (``UserID`` -> ``User_ID``, ``SenderEmail`` ->
+``Sender_email``, ...). Columns the API computes itself (``Distance`` and the
+engineered features) are recomputed, not read. Rows are taken to be in
+arrival order, like requests to the API.
+
+Per-user features come from streaming ``UserFeatureState``s held by
+``--workers`` processes, each owning the users that hash to it. Every user's
+rows reach the same process in file order. The cross-user D features
+(card/address/email/device) and Distance are computed in the main process
+while the workers run. Each chunk is then scored with one model call through
+the artifact's ``CompiledScorer``, the same feature layout and booster call
+as the API, and appended to the output, so at most two chunks are in memory
+at a time.
+"""
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import queue
+import traceback
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.db.queries import HISTORY_COLUMNS
+from src.features.distance import distances
+from src.features.entity_index import ENTITY_FEATURES, EntityLastSeenIndex
+from src.features.state import UserFeatureState
+from src.models.artifact import ModelArtifact
+from src.models.encoders import normalize_column_name
+
+# Fields of the API's TransactionIn, the raw input every feature is computed from
+INPUT_COLUMNS = (
+    "TransactionID", "TransactionAmt", "TransactionDT", "ProductCD", "User_ID", "Merchant",
+    "CardNumber", "BINNumber", "CardNetwork", "CardTier", "CardType", "PhoneNumbers",
+    "User_Region", "Order_Region", "Receiver_Region", "Sender_email", "Merchant_email",
+    "DeviceType", "DeviceInfo",
+)
+REQUIRED_COLUMNS = ("TransactionID", "TransactionAmt", "TransactionDT", "User_ID")
+
+# Columns the user-state workers need
+STATE_COLUMNS = ("User_ID",) + HISTORY_COLUMNS
+# How often collect() checks that the workers are still alive while it waits
+POLL_SECONDS = 1.0
+
+
+def header_mapping(columns):
+    """CSV header -> API field name, matching case- and underscore-insensitively."""
+    by_key = {normalize_column_name(name): name for name in INPUT_COLUMNS}
+    mapping = {}
+    for column in columns:
+        name = by_key.get(normalize_column_name(column))
+        if name is not None:
+            mapping[column] = name
+    return mapping
+
+
+def read_chunks(path, chunksize):
+    """Yield chunks of ``path`` with API field names; absent optional fields are None."""
+    mapping = None
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if mapping is None:
+            mapping = header_mapping(chunk.columns)
+            missing = set(REQUIRED_COLUMNS) - set(mapping.values())
+            if missing:
+                raise ValueError(f"{path} is missing required columns: {sorted(missing)}")
+        chunk = chunk[list(mapping)].rename(columns=mapping)
+        for column in INPUT_COLUMNS:
+            if column not in chunk.columns:
+                chunk[column] = None
+        chunk = chunk[list(INPUT_COLUMNS)].astype(object)
+        # None for missing values, like the API's JSON; numeric columns get their dtype back
+        chunk = chunk.where(chunk.notna(), None).infer_objects()
+        chunk["TransactionDT"] = pd.to_datetime(chunk["TransactionDT"])
+        yield chunk.reset_index(drop=True)
+
+
+def observe_users(states, records):
+    """Per-user features for ``records`` in order, folding each into its user's state."""
+    features = []
+    for record in records:
+        state = states.get(record["User_ID"])
+        if state is None:
+            state = states[record["User_ID"]] = UserFeatureState()
+        features.append(state.observe(record, record["TransactionDT"]))
+    return features
+
+
+def _shard_worker(inbox, outbox):
+    # One process per shard; its users' states live here for the whole run
+    states = {}
+    try:
+        for chunk_id, positions, records in iter(inbox.get, None):
+            outbox.put((chunk_id, positions, observe_users(states, records)))
+    except Exception as error:
+        # Hand the failure to the parent, which would otherwise wait for this shard's results forever
+        error.add_note(f"in batch scoring worker {os.getpid()}:\n{traceback.format_exc()}")
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(f"batch scoring worker {os.getpid()} failed:\n{traceback.format_exc()}")
+        outbox.put((None, None, error))
+
+
+class ShardedUserFeatures:
+    """Streams chunks through ``n_workers`` processes, each owning a fixed subset of users."""
+
+    def __init__(self, n_workers):
+        self.n_workers = n_workers
+        self._states = {}  # used when there is a single worker, in-process
+        self._results = {}  # chunk_id -> list of shard results received so far
+        self._processes = []
+        if n_workers > 1:
+            # spawn, not fork: the parent may already hold OpenMP threads from XGBoost
+            context = multiprocessing.get_context("spawn")
+            self._outbox = context.Queue()
+            self._inboxes = [context.Queue() for _ in range(n_workers)]
+            for inbox in self._inboxes:
+                process = context.Process(target=_shard_worker, args=(inbox, self._outbox), daemon=True)
+                process.start()
+                self._processes.append(process)
+
+    def submit(self, chunk_id, chunk):
+        """Send each user's rows of ``chunk`` to the worker that owns the user."""
+        records = chunk[list(STATE_COLUMNS)].to_dict("records")
+        if self.n_workers == 1:
+            self._results[chunk_id] = [(np.arange(len(records)), observe_users(self._states, records))]
+            return
+        shards = pd.util.hash_array(chunk["User_ID"].to_numpy()) % self.n_workers
+        for shard, inbox in enumerate(self._inboxes):
+            positions = np.flatnonzero(shards == shard)
+            inbox.put((chunk_id, positions, [records[i] for i in positions]))
+
+    def collect(self, chunk_id, n_rows):
+        """Per-user feature frame for a submitted chunk, in its row order."""
+        parts = self._results.pop(chunk_id, [])
+        while len(parts) < (self.n_workers if self.n_workers > 1 else 1):
+            try:
+                received_id, positions, features = self._outbox.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                dead = [process for process in self._processes if not process.is_alive()]
+                if dead:
+                    raise RuntimeError(f"batch scoring worker {dead[0].pid} exited with code {dead[0].exitcode} "
+                                       f"before returning chunk {chunk_id}") from None
+                continue
+            if received_id is None:
+                raise features
+            if received_id == chunk_id:
+                parts.append((positions, features))
+            else:
+                self._results.setdefault(received_id, []).append((positions, features))
+        rows = [None] * n_rows
+        for positions, features in parts:
+            for i, row in zip(positions, features):
+                rows[i] = row
+        return pd.DataFrame(rows)
+
+    def close(self):
+        if self.n_workers > 1:
+            for inbox in self._inboxes:
+                inbox.put(None)
+            for process in self._processes:
+                process.join(POLL_SECONDS)
+                # After a failure, the remaining workers may still be busy with chunks nobody will collect
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+
+def entity_features(index, chunk):
+    """Cross-user D features for ``chunk`` in row order, folding each row into ``index``."""
+    rows = []
+    for record, dt in zip(chunk.to_dict("records"), chunk["TransactionDT"]):
+        rows.append(index.observe(record, None if pd.isna(dt) else dt.value))
+    return pd.DataFrame(rows, columns=list(ENTITY_FEATURES.values()))
+
+
+def score_file(input_path, output_path, artifact, chunksize=50_000, workers=None, threshold=None):
+    """Score every row of ``input_path`` into ``output_path``; returns the number of rows.
+
+    ``threshold`` defaults to the one stored in ``artifact``.
+    """
+    scorer = artifact.scorer(threshold)
+    users = ShardedUserFeatures(workers or os.cpu_count() or 1)
+    entities = EntityLastSeenIndex()
+    in_flight = deque()
+    n_rows = 0
+
+    def finish(chunk_id, chunk, chunk_entities):
+        engineered = users.collect(chunk_id, len(chunk))
+        scored = pd.concat([chunk, engineered, chunk_entities], axis=1)
+        scored.insert(len(INPUT_COLUMNS), "Distance", distances(
+            scored["Order_Region"].to_numpy(), scored["Receiver_Region"].to_numpy(), scored["TransactionID"].to_numpy()))
+        # One model call per chunk, on the rows the API would build for these transactions
+        _, fraud_probabilities, predictions = scorer.score(scored.to_dict("records"))
+        scored["fraud_probability"] = fraud_probabilities
+        scored["isFraud"] = predictions.astype(int)
+        scored["TransactionDT"] = scored["TransactionDT"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        scored.to_csv(output_path, mode="w" if chunk_id == 0 else "a", header=chunk_id == 0, index=False)
+        return len(scored)
+
+    try:
+        for chunk_id, chunk in enumerate(read_chunks(input_path, chunksize)):
+            users.submit(chunk_id, chunk)
+            # The main process's share of the work overlaps with the workers'
+            in_flight.append((chunk_id, chunk, entity_features(entities, chunk)))
+            # Keep one chunk queued behind the one being finished
+            if len(in_flight) > 1:
+                n_rows += finish(*in_flight.popleft())
+        while in_flight:
+            n_rows += finish(*in_flight.popleft())
+    finally:
+        users.close()
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV export of transactions in chunks.")
+    parser.add_argument("input", help="CSV shaped like data/synthetic_dataset.csv")
+    parser.add_argument("output", help="CSV to write: input fields, engineered features, fraud_probability and isFraud")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None, help="user-state processes (default: all cores)")
+    parser.add_argument("--artifact", default="src/models/fraud_model.artifact", help="model artifact (src/models/artifact.py)")
+    parser.add_argument("--threshold", type=float, default=None, help="default: the artifact's threshold")
+    args = parser.parse_args()
+
+    artifact = ModelArtifact.load(args.artifact)
+    n_rows = score_file(args.input, args.output, artifact, args.chunksize, args.workers, args.threshold)
+    print(f"✅ Scored {n_rows} transactions into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Adaptive micro-batching of single-transaction model calls.
+
+Under load, many requests each calling XGBoost on one row pay the per-call
+overhead over and over. ``MicroBatcher`` queues the feature rows of
+concurrent requests and runs one batched call for up to ``max_batch`` of them.
+Each caller then gets its own result back.
+
+The wait adapts to load: rows that arrive while a batch is running join the
+next one, and when the previous batch held more than one row the batcher also
+waits up to ``max_delay`` seconds for the next batch to fill. An idle server
+runs a lone request at once instead of paying the delay.
+
+If a batched call raises, its items are run again one by one, so only the
+request whose item fails gets the error, as with the group commits in
+src/db/persistence.py.
+"""
+
+import asyncio
+
+
+class MicroBatcher:
+    """Collects concurrent ``submit`` calls into batches for a list -> list function.
+
+    ``fn`` takes a list of items and returns one result per item, in order. It
+    runs on ``executor`` (a ``StageExecutor``). If it raises for a batch, each
+    item is retried alone and only the callers whose item fails get an
+    exception.
+    """
+
+    def __init__(self, fn, executor, max_delay=0.002, max_batch=64):
+        self.fn = fn
+        self.executor = executor
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._pending = []  # (item, future)
+        self._wake = None  # set when a full batch is pending, to cut the delay short
+        self._flusher = None
+        self._last_batch_size = 0
+        # Metrics
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    async def submit(self, item):
+        """Result of ``fn`` for ``item``, computed in a batch with other pending items."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        if len(self._pending) >= self.max_batch and self._wake is not None and not self._wake.done():
+            self._wake.set_result(None)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self._pending:
+            if len(self._pending) < self.max_batch and self.max_delay > 0 and self._last_batch_size > 1:
+                self._wake = asyncio.get_running_loop().create_future()
+                await asyncio.wait([self._wake], timeout=self.max_delay)
+                self._wake = None
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._last_batch_size = len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await self.executor.run(self.fn, [item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    _resolve(batch[0][1], error=e)
+                    continue
+                # Isolate the failing item(s) so the rest of the batch still gets results
+                for item, future in batch:
+                    try:
+                        (result,) = await self.executor.run(self.fn, [item])
+                    except Exception as item_error:
+                        _resolve(future, error=item_error)
+                    else:
+                        _resolve(future, result)
+            else:
+                for (_, future), result in zip(batch, results):
+                    _resolve(future, result)
+
+    def stats(self):
+        """Queue-depth and batch-size counters since startup."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+        }
+
+
+def _resolve(future, result=None, error=None):
+    # The awaiting request may have been cancelled (client disconnect) meanwhile
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,34 @@
+"""Bounded worker pool for the CPU-bound scoring stages.
+
+Feature engineering, prediction and explanation are synchronous. Awaiting them
+through ``StageExecutor.run`` keeps the event loop free to accept and await
+other requests while they run. XGBoost releases the GIL while predicting, so
+the model stages also run in parallel across workers.
+
+A thread pool rather than a process pool: the per-user feature state and the
+loaded model live in this process's memory.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def default_workers():
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class StageExecutor:
+    """Runs synchronous stage functions on a bounded ``ThreadPoolExecutor``."""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or default_workers()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fraud-stage")
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
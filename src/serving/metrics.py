@@ -0,0 +1,227 @@
+"""In-process metrics in the Prometheus text format.
+
+Each stage of the scoring pipeline is timed with ``time.perf_counter_ns`` and
+recorded in a fixed-bucket histogram. Histograms and counters keep one set of
+values per thread, which only that thread writes, so recording takes no lock:
+an observation is one bisect over the bucket bounds and two additions (see
+``benchmarks/metrics_overhead.py`` for the cost). The threads' values are
+only added up, and formatted, when ``/metrics`` is scraped. Values that other
+components already count (micro-batcher, group-commit writer) are read by
+collectors at scrape time instead of being recorded twice.
+
+A thread's values outlive the thread: when it exits, they are added to the
+metric's base values and its shard is dropped, so a server that keeps
+replacing worker threads does not accumulate shards.
+
+The metrics are those of one process. With several server workers
+(src/serving/serve.py), each scrape of ``/metrics`` is answered by whichever
+worker accepts the connection and reports that worker's values only; scrape
+each worker separately (e.g. one port per worker) to see them all.
+"""
+
+import threading
+import weakref
+from bisect import bisect_left
+from time import perf_counter_ns
+
+# Upper bounds (seconds) of the latency buckets, 50 us to 2.5 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class _ThreadOwner:
+    # Held only by a thread's threading.local, so it is collected when the thread exits
+    __slots__ = ("__weakref__",)
+
+
+def _register_shard(local, lock, shards, retire, shard):
+    """Record ``shard`` as the calling thread's, and have ``retire(shard)`` run once the thread is gone."""
+    local.owner = owner = _ThreadOwner()
+    with lock:
+        shards.append(shard)
+    weakref.finalize(owner, retire, shard)
+    return shard
+
+
+def _without(shards, shard):
+    # By identity: two threads' shards can hold equal values
+    return [other for other in shards if other is not shard]
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Counts of durations per bucket, plus their sum; thread-safe, recorded per thread without a lock."""
+
+    __slots__ = ("bounds_ns", "_local", "_shards", "_base", "_lock")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds_ns = [round(bound * 1e9) for bound in buckets]
+        self._local = threading.local()
+        # Per thread: one count per bucket, one for durations above every bound (+Inf), then the sum
+        self._shards = []
+        # Values of threads that have exited
+        self._base = [0] * (len(self.bounds_ns) + 2)
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = self._local.shard = [0] * (len(self.bounds_ns) + 2)
+        return _register_shard(self._local, self._lock, self._shards, self._retire, shard)
+
+    def _retire(self, shard):
+        with self._lock:
+            self._base = [base + value for base, value in zip(self._base, shard)]
+            self._shards = _without(self._shards, shard)
+
+    def observe_ns(self, duration_ns):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[bisect_left(self.bounds_ns, duration_ns)] += 1
+        shard[-1] += duration_ns
+
+    def time(self):
+        """Context manager that observes the duration of its block."""
+        return _Timer(self)
+
+    def snapshot(self):
+        """``(counts per bucket, sum in ns)`` over all threads."""
+        with self._lock:
+            shards, base = list(self._shards), self._base
+        # Copying a list is atomic under the GIL, so each thread's counts and sum agree
+        totals = [sum(values) for values in zip(base, *(list(shard) for shard in shards))]
+        return totals[:-1], totals[-1]
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe_ns(perf_counter_ns() - self.start)
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per value of its label."""
+
+    def __init__(self, name, help, label, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self._children = {}
+
+    def labels(self, value):
+        """Histogram for one label value; look it up once and keep it for the hot path."""
+        child = self._children.get(value)
+        if child is None:
+            child = self._children.setdefault(value, Histogram(self.buckets))
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [*self.buckets, float("inf")]
+        for value, child in list(self._children.items()):
+            counts, sum_ns = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({self.label: value, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels({self.label: value})} {_number(sum_ns / 1e9)}")
+            lines.append(f"{self.name}_count{_labels({self.label: value})} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one value per label value (or a single value without a label); per thread, like
+    ``Histogram``."""
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._local = threading.local()
+        self._shards = []
+        # Totals of threads that have exited
+        self._base = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=None, amount=1):
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            _register_shard(self._local, self._lock, self._shards, self._retire, values)
+        values[value] = values.get(value, 0) + amount
+
+    def _retire(self, values):
+        with self._lock:
+            base = dict(self._base)
+            for value, total in values.items():
+                base[value] = base.get(value, 0) + total
+            self._base = base
+            self._shards = _without(self._shards, values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            shards, base = list(self._shards), self._base
+        totals = dict(base)
+        for shard in shards:
+            for value, total in shard.copy().items():
+                totals[value] = totals.get(value, 0) + total
+        for value, total in totals.items():
+            lines.append(f"{self.name}{_labels({self.label: value} if self.label else {})} {_number(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics a process exposes, rendered on demand for ``/metrics``."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name, help, label, buckets=LATENCY_BUCKETS):
+        family = HistogramFamily(name, help, label, buckets)
+        self._metrics.append(family)
+        return family
+
+    def counter(self, name, help, label=None):
+        counter = Counter(name, help, label)
+        self._metrics.append(counter)
+        return counter
+
+    def collect(self, name, kind, help, samples):
+        """Add a metric read at scrape time: ``samples()`` returns ``[(labels dict, value), ...]``."""
+        self._collectors.append((name, kind, help, samples))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, kind, help, samples in self._collectors:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples())
+        return "\n".join(lines) + "\n"
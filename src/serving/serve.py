@@ -0,0 +1,50 @@
+"""Production launch: N uvicorn worker processes serving ``app:app``.
+
+    python -m src.serving.serve --workers 4 --host 0.0.0.0 --port 8000
+
+The schema is created once here, before the workers start, so they do not
+race to create it and skip that step of their start-up. uvicorn spawns the
+workers, so nothing loaded here is inherited: each worker loads the model
+artifact (``FRAUD_SHIELD_MODEL_ARTIFACT``) into its own memory. It is small,
+and the shared libraries' pages are shared through the page cache. Workers
+import ``app`` directly and never apply the ``nest_asyncio`` patch, which
+only ``python app.py`` uses for notebooks.
+
+Each worker keeps its own feature state. With more than one worker,
+``FRAUD_SHIELD_WORKERS`` tells them to re-sync it from the database (see
+``FeatureStateStore``). Metrics are per worker too: ``/metrics`` reports the
+values of the worker that answers it (see src/serving/metrics.py).
+"""
+
+import argparse
+import os
+
+import uvicorn
+from sqlalchemy import create_engine
+
+from src.db.models import create_schema
+from src.db.persistence import DATABASE_URL, apply_sqlite_pragmas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fraud check API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Inherited by the workers, which read it when app.py is imported
+    os.environ["FRAUD_SHIELD_WORKERS"] = str(args.workers)
+
+    engine = create_engine(DATABASE_URL)
+    apply_sqlite_pragmas(engine)
+    create_schema(engine)
+    engine.dispose()
+    os.environ["FRAUD_SHIELD_SCHEMA_READY"] = "1"
+
+    uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Start-up profile of the API: time spent in each import and init stage.
+
+With autoscaling, start-up is how long a new worker takes before it can serve
+traffic. ``app.py`` runs every import group and init step inside
+``startup.stage(...)``. The timings are always recorded. They are printed
+when ``FRAUD_SHIELD_STARTUP_PROFILE=1``, and ``benchmarks/startup_time.py``
+reads them:
+
+    FRAUD_SHIELD_STARTUP_PROFILE=1 python -c "import app"
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Wall time and newly imported modules of each named start-up stage."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        # (stage, seconds, modules imported during it), in order
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        modules = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start, len(sys.modules) - modules))
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "stages": [{"stage": name, "ms": round(seconds * 1000, 1), "modules": modules}
+                       for name, seconds, modules in self.stages],
+        }
+
+    def report(self):
+        if not self.enabled:
+            return
+        print(f"{'stage':<28} {'ms':>8} {'modules':>8}")
+        for name, seconds, modules in self.stages:
+            print(f"{name:<28} {seconds * 1000:>8.1f} {modules:>8}")
+        print(f"✅ Started in {self.total * 1000:.1f} ms")
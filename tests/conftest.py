@@ -0,0 +1,48 @@
+"""The API on a temporary database, shared by the tests that call its endpoints."""
+
+import asyncio
+import os
+
+import httpx
+import pytest
+from sqlalchemy import delete
+
+
+class ApiClient:
+    """Synchronous calls into ``app.app`` on one event loop, so the app's writer and batcher keep theirs."""
+
+    def __init__(self, module):
+        self.module = module
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=module.app), base_url="http://test")
+
+    def post(self, path, body):
+        return self.loop.run_until_complete(self.client.post(path, json=body)).json()
+
+    def reset(self):
+        """Empty the transactions table and the feature state."""
+        with self.module.engine.begin() as conn:
+            conn.execute(delete(self.module.Transaction.__table__))
+        self.module.feature_store.rebuild(self.module.engine)
+
+    def close(self):
+        self.loop.run_until_complete(self.client.aclose())
+        self.loop.run_until_complete(self.module.transaction_writer.close())
+        self.loop.close()
+
+
+@pytest.fixture(scope="session")
+def api_session(tmp_path_factory):
+    os.environ["FRAUD_SHIELD_DATABASE_URL"] = f"sqlite:///{tmp_path_factory.mktemp('api') / 'api.db'}"
+    import app
+
+    client = ApiClient(app)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def api(api_session):
+    """``ApiClient`` on an empty database."""
+    api_session.reset()
+    return api_session
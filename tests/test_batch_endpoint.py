@@ -0,0 +1,27 @@
+"""/transaction_fraud_check/batch answers exactly like one /transaction_fraud_check call per transaction."""
+
+from benchmarks.concurrency import payloads
+
+
+def test_batch_responses_equal_single_responses(api):
+    rows = payloads(60, seed=5)
+    singles = [api.post("/transaction_fraud_check", row) for row in rows]
+    assert all(response["status"] == "success" for response in singles)
+    assert any("fraud_detection" in response for response in singles)
+    assert any(response.get("is_fraud") is False for response in singles)
+
+    api.reset()
+    batch = api.post("/transaction_fraud_check/batch", rows)
+    assert batch == {"status": "success", "count": len(rows), "results": singles}
+
+
+def test_a_failed_batch_leaves_no_state_behind(api):
+    rows = payloads(20, seed=6)
+    # The repeated TransactionID fails the batch's single insert
+    failed = api.post("/transaction_fraud_check/batch", rows + [dict(rows[0])])
+    assert failed["status"] == "error"
+    assert api.module.feature_store.get(rows[0]["User_ID"], api.module.engine).count == 0
+
+    retried = api.post("/transaction_fraud_check/batch", rows)
+    api.reset()
+    assert retried["results"] == [api.post("/transaction_fraud_check", row) for row in rows]
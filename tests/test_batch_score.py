@@ -0,0 +1,43 @@
+"""The offline batch scorer gives the same probabilities and verdicts as the API."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.concurrency import payloads
+from src.serving.batch_score import score_file
+
+
+@pytest.fixture
+def online(api, monkeypatch):
+    """``api``, recording the fraud probability the endpoint computes for each TransactionID."""
+    probabilities = {}
+    score = api.module.score
+
+    def recording_score(rows):
+        X, proba, predictions = score(rows)
+        probabilities.update(zip((row["TransactionID"] for row in rows), proba.tolist()))
+        return X, proba, predictions
+
+    monkeypatch.setattr(api.module, "score", recording_score)
+    return api, probabilities
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_scores_equal_the_endpoints(online, tmp_path, workers):
+    api, probabilities = online
+    rows = payloads(120, seed=3)
+    verdicts = {}
+    for row in rows:
+        response = api.post("/transaction_fraud_check", row)
+        assert response["status"] == "success"
+        verdicts[row["TransactionID"]] = response.get("is_fraud", response.get("fraud_detection", {}).get("is_fraud"))
+
+    source, output = tmp_path / "export.csv", tmp_path / "scored.csv"
+    pd.DataFrame(rows).to_csv(source, index=False)
+    assert score_file(source, output, api.module.artifact, chunksize=50, workers=workers) == len(rows)
+
+    scored = pd.read_csv(output)
+    expected = np.array([probabilities[transaction_id] for transaction_id in scored["TransactionID"]])
+    np.testing.assert_array_equal(scored["fraud_probability"].to_numpy(np.float32), expected.astype(np.float32))
+    assert scored["isFraud"].tolist() == [int(verdicts[transaction_id]) for transaction_id in scored["TransactionID"]]
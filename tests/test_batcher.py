@@ -0,0 +1,89 @@
+"""MicroBatcher at the API's defaults: batches of up to 64 rows, 2 ms wait."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.serving.batcher import MicroBatcher
+from src.serving.executor import StageExecutor
+
+MAX_BATCH = 64
+MAX_DELAY = 0.002
+
+
+class Recorder:
+    """List -> list function that records each batch and fails on the item ``"bad"``."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [f"scored {item}" for item in items]
+
+
+@pytest.fixture
+def executor():
+    executor = StageExecutor(4)
+    yield executor
+    executor.shutdown()
+
+
+def test_a_full_batch_runs_without_waiting(executor):
+    fn = Recorder()
+    # A delay no test would sit through: only full batches can explain a quick finish
+    batcher = MicroBatcher(fn, executor, max_delay=60, max_batch=MAX_BATCH)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(2 * MAX_BATCH)))
+        # The previous batch held 64 rows, so the flusher now waits for the next one to fill
+        late = [asyncio.ensure_future(batcher.submit(i)) for i in range(MAX_BATCH)]
+        return results, await asyncio.gather(*late)
+
+    start = time.perf_counter()
+    results, late = asyncio.run(run())
+    assert time.perf_counter() - start < 10
+    assert [len(batch) for batch in fn.batches] == [MAX_BATCH, MAX_BATCH, MAX_BATCH]
+    assert results == [f"scored {i}" for i in range(2 * MAX_BATCH)]
+    assert late == [f"scored {i}" for i in range(MAX_BATCH)]
+
+
+def test_a_partial_batch_runs_after_the_delay(executor):
+    fn = Recorder()
+    batcher = MicroBatcher(fn, executor, max_delay=MAX_DELAY, max_batch=MAX_BATCH)
+
+    async def run():
+        # A lone request on an idle batcher runs at once
+        await batcher.submit("alone")
+        # Two concurrent ones make a batch of two, after which the batcher waits for more
+        await asyncio.gather(batcher.submit(0), batcher.submit(1))
+        first = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        rest = [asyncio.ensure_future(batcher.submit(i)) for i in (3, 4)]
+        start = time.perf_counter()
+        results = await asyncio.gather(first, *rest)
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert [len(batch) for batch in fn.batches] == [1, 2, 3]
+    assert results == ["scored 2", "scored 3", "scored 4"]
+    assert elapsed >= MAX_DELAY / 2
+    assert batcher.stats()["mean_batch_size"] == 2.0
+
+
+def test_a_failing_item_fails_only_its_own_request(executor):
+    fn = Recorder()
+    batcher = MicroBatcher(fn, executor, max_delay=MAX_DELAY, max_batch=MAX_BATCH)
+    items = [0, 1, "bad", 3, 4]
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[2], ValueError)
+    assert [result for i, result in enumerate(results) if i != 2] == ["scored 0", "scored 1", "scored 3", "scored 4"]
+    # One batched call, then one call per item
+    assert fn.batches == [items] + [[item] for item in items]
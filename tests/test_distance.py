@@ -0,0 +1,54 @@
+"""Region distances: the precomputed matrix, column and single lookups, missing and same regions."""
+
+import numpy as np
+import pytest
+
+from src.features.distance import (
+    SAME_REGION_RANGE, UNKNOWN_REGION, bengaluru_regions, distance, distance_matrix, distances, region_codes,
+)
+
+REGIONS = list(bengaluru_regions)
+
+
+def test_matrix_is_symmetric_with_a_zero_diagonal():
+    matrix = distance_matrix()
+    assert matrix.shape == (len(REGIONS), len(REGIONS))
+    np.testing.assert_array_equal(matrix, matrix.T)
+    assert (np.diag(matrix) == 0).all()
+    assert (matrix[~np.eye(len(REGIONS), dtype=bool)] > 0).all()
+
+
+def test_matrix_matches_geodesic():
+    from geopy.distance import geodesic
+
+    koramangala, hebbal = REGIONS.index("Koramangala"), REGIONS.index("Hebbal")
+    expected = round(geodesic(bengaluru_regions["Koramangala"], bengaluru_regions["Hebbal"]).km, 2)
+    assert distance_matrix()[koramangala, hebbal] == expected
+
+
+def test_missing_and_unknown_regions_get_code_minus_one():
+    assert region_codes(["Hebbal", None, "Atlantis", np.nan]).tolist() == [REGIONS.index("Hebbal")] + [UNKNOWN_REGION] * 3
+
+
+def test_columns_and_single_lookups_agree():
+    rng = np.random.default_rng(0)
+    names = np.array(REGIONS + [None, "Atlantis"], dtype=object)
+    order, receiver = rng.choice(names, 2000), rng.choice(names, 2000)
+    seeds = rng.integers(0, 2**40, 2000)
+    expected = [distance(o, r, s) for o, r, s in zip(order, receiver, seeds)]
+    np.testing.assert_array_equal(distances(order, receiver, seeds), expected)
+
+
+def test_missing_region_has_distance_zero():
+    assert distances(["Hebbal", None, "Atlantis"], [None, "Hebbal", "Hebbal"], [1, 2, 3]).tolist() == [0.0, 0.0, 0.0]
+    assert distance("Hebbal", None, 1) == 0.0
+
+
+@pytest.mark.parametrize("region", ["Hebbal", "Atlantis", None])
+def test_same_region_distance_depends_only_on_the_seed(region):
+    low, high = SAME_REGION_RANGE
+    values = distances([region] * 500, [region] * 500, np.arange(500))
+    assert ((values >= low) & (values <= high)).all()
+    assert len(set(values.tolist())) > 50
+    np.testing.assert_array_equal(values, distances([region] * 500, [region] * 500, np.arange(500)))
+    assert distance(region, region, 7) == values[7]
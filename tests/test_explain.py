@@ -0,0 +1,49 @@
+"""Native contributions are complete attributions of the model's margin, equal to SHAP's."""
+
+import numpy as np
+import pytest
+
+from benchmarks.concurrency import payloads
+from src.models.artifact import ModelArtifact
+from src.models.booster import DMatrix
+
+
+@pytest.fixture(scope="module")
+def model():
+    artifact = ModelArtifact.load("src/models/fraud_model.artifact")
+    X = artifact.scorer().layout.rows(payloads(200, seed=11))
+    margin = artifact.booster.predict(DMatrix(X, feature_names=artifact.feature_names), output_margin=True)
+    bias = artifact.booster.predict(DMatrix(X, feature_names=artifact.feature_names), pred_contribs=True)[:, -1]
+    return artifact, X, margin, bias
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+def test_contributions_sum_to_the_margin(model, approximate):
+    artifact, X, margin, bias = model
+    contributions = artifact.explainer(approximate=approximate).contributions(X)
+    assert contributions.shape == (len(X), len(artifact.feature_names))
+    np.testing.assert_allclose(contributions.sum(axis=1) + bias, margin, atol=1e-4)
+
+
+def test_exact_contributions_equal_shap(model):
+    shap = pytest.importorskip("shap")
+    import xgboost
+
+    artifact, X, _, _ = model
+    # SHAP only knows the Booster class of a normal xgboost import (see src/models/booster.py)
+    booster = xgboost.Booster()
+    booster.load_model(bytearray(artifact.booster.save_raw("ubj")))
+    expected = shap.TreeExplainer(booster).shap_values(X)
+    np.testing.assert_allclose(artifact.explainer().contributions(X), expected, atol=1e-5)
+
+
+def test_top_features_are_percentages_of_the_contributions(model):
+    artifact, X, _, _ = model
+    explainer = artifact.explainer()
+    contributions = np.abs(explainer.contributions(X[:5]))
+    for row, explanation in zip(contributions, explainer.top_features(X[:5])):
+        percentages = [entry["Percentage Contribution"] for entry in explanation]
+        assert percentages == sorted(percentages, reverse=True)
+        assert sum(percentages) == pytest.approx(100, abs=0.1)
+        top = explanation[0]["Feature"]
+        assert row[artifact.feature_names.index(top)] == row.max()
@@ -0,0 +1,84 @@
+"""Batch ``compute_features`` against ``IncrementalFeatures`` on NaT rows, missing keys and equal timestamps."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.feature_library import parity_frame
+from src.features.engineered import FEATURE_COLUMNS, IncrementalFeatures, compute_features
+
+
+def frame(rows):
+    """Transactions in arrival order from ``(user, dt, amount, card, device, order_region)`` tuples."""
+    return pd.DataFrame([{
+        "TransactionAmt": amount, "TransactionDT": pd.Timestamp(dt), "User_ID": user, "Merchant": "Amazon",
+        "CardNumber": card, "User_Region": "Hebbal", "Order_Region": order_region,
+        "Merchant_email": "amazon@merchant.com", "DeviceType": device,
+    } for user, dt, amount, card, device, order_region in rows])
+
+
+def assert_modes_agree(df):
+    batch = compute_features(df)
+    incremental = IncrementalFeatures().observe_frame(df)
+    for column in FEATURE_COLUMNS:
+        got, expected = batch[column].to_numpy(np.float64), incremental[column].to_numpy(np.float64)
+        if batch[column].dtype.kind in "iu":
+            np.testing.assert_array_equal(got, expected, err_msg=column)
+        else:
+            np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9, err_msg=column)
+    return batch
+
+
+EDGE_CASES = {
+    "equal timestamps": [
+        (1, "2024-01-01 09:00", 100.0, "4111", "mobile", "Hebbal"),
+        (1, "2024-01-01 09:00", 300.0, "4111", "mobile", "Hebbal"),
+        (2, "2024-01-01 09:00", 50.0, "4111", "desktop", "Hebbal"),
+        (1, "2024-01-01 09:00", 200.0, "4222", "desktop", "Yelahanka"),
+    ],
+    "NaT rows": [
+        (1, None, 100.0, "4111", "mobile", "Hebbal"),
+        (1, "2024-01-01 09:00", 200.0, "4111", "mobile", "Hebbal"),
+        (1, None, 300.0, "4111", "mobile", "Hebbal"),
+        (1, "2024-01-02 10:00", 400.0, "4111", "mobile", "Hebbal"),
+        (2, None, 50.0, "4111", "desktop", "Hebbal"),
+    ],
+    "missing keys": [
+        (1, "2024-01-01 09:00", 100.0, None, None, None),
+        (1, "2024-01-01 10:00", 200.0, "4111", None, "Hebbal"),
+        (1, "2024-01-01 11:00", 300.0, None, "mobile", None),
+        (2, "2024-01-01 11:00", 50.0, None, None, "Hebbal"),
+    ],
+    "all at once": [
+        (1, "2024-01-01 09:00", 100.0, None, "mobile", "Hebbal"),
+        (1, None, 200.0, "4111", None, None),
+        (2, "2024-01-01 09:00", 300.0, "4111", None, "Hebbal"),
+        (1, "2024-01-01 09:00", 400.0, "4111", "mobile", "Yelahanka"),
+        (2, None, 500.0, None, "desktop", None),
+        (1, "2024-01-02 09:00", 600.0, None, "mobile", "Hebbal"),
+    ],
+}
+
+
+@pytest.mark.parametrize("case", list(EDGE_CASES))
+def test_modes_agree_on_edge_cases(case):
+    assert_modes_agree(frame(EDGE_CASES[case]))
+
+
+def test_nat_rows_have_no_time_features():
+    features = assert_modes_agree(frame(EDGE_CASES["NaT rows"]))
+    assert features["AvgTransactionAmt_24Hrs_E9"].tolist() == [0.0, 200.0, 200.0, 400.0, 0.0]
+    assert features["TransactionVelocity_E10"].tolist() == [0, 0, 0, 0, 0]
+    assert features["TransactionTimeSlot_E2"][[0, 2, 4]].tolist() == [3, 3, 3]
+
+
+def test_equal_timestamps_count_every_row():
+    features = assert_modes_agree(frame(EDGE_CASES["equal timestamps"]))
+    assert features["AvgTransactionAmt_24Hrs_E9"].tolist() == [100.0, 200.0, 50.0, 200.0]
+    assert features["TransactionVelocity_E10"].tolist() == [1, 2, 1, 3]
+    assert features["AvgTransactionInterval_E5"].tolist() == [0.0, 0.0, 0.0, 0.0]
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_modes_agree_on_synthetic_history(seed):
+    assert_modes_agree(parity_frame(2000, seed))
@@ -0,0 +1,112 @@
+"""FeatureStateStore: pending transactions, rollback of one failed write, and the LRU bound."""
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from src.db.models import Transaction, create_schema
+from src.features.engineered import FEATURE_COLUMNS, IncrementalFeatures
+from src.features.state import FeatureStateStore
+
+NS_PER_HOUR = 3600 * 10**9
+
+
+def transaction(transaction_id, hour, user_id=7, card="4111000", device="mobile", amount=100.0):
+    return {
+        "TransactionID": transaction_id, "TransactionAmt": amount, "TransactionDT": f"2024-01-02 {hour:02d}:00:00",
+        "ProductCD": "Retail", "User_ID": user_id, "Merchant": "Amazon", "CardNumber": card, "BINNumber": "411111",
+        "CardNetwork": "Visa", "CardTier": "Gold", "CardType": "Debit", "PhoneNumbers": "+91 9000",
+        "User_Region": "Hebbal", "Order_Region": "Hebbal", "Receiver_Region": "Hebbal",
+        "Sender_email": "a@gmail.com", "Merchant_email": "amazon@merchant.com", "DeviceType": device,
+        "DeviceInfo": "Samsung",
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'state.db'}")
+    create_schema(engine)
+    return engine
+
+
+def store_rows(engine, *rows):
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction.__table__), list(rows))
+
+
+def expected_features(*rows):
+    """Features of the last of ``rows`` when they are folded in order from scratch."""
+    features = IncrementalFeatures()
+    for row in rows:
+        result = features.observe(row)
+    return result
+
+
+def feature_values(features):
+    return {name: features[name] for name in FEATURE_COLUMNS}
+
+
+def test_rollback_keeps_a_pending_transaction_of_the_same_user(engine):
+    base, kept, failed, later = transaction(1, 9), transaction(2, 11, amount=250.0), transaction(3, 12), transaction(4, 13)
+    store_rows(engine, base)
+    store = FeatureStateStore()
+    store.rebuild(engine)
+    store.observe(kept, engine)
+    store.observe(failed, engine)
+
+    # The failed write is undone while the other one is still waiting for its commit
+    store.rollback([failed], engine)
+    assert store.get(7, engine).count == 2
+    assert store.entities.last_seen("card")["4111000"] == store.entities.last_seen("device")["mobile"]
+    assert store.entities.last_seen("card")["4111000"] % (24 * NS_PER_HOUR) == 11 * NS_PER_HOUR
+
+    store_rows(engine, kept)
+    store.confirm([kept])
+    features = store.observe(later, engine)
+    assert feature_values(features) == feature_values(expected_features(base, kept, later))
+    assert features["SameCardDaysDiff_D3"] == pytest.approx(2 / 24)
+
+
+def test_rollback_keeps_a_later_transactions_entity_timestamps(engine):
+    failed, kept = transaction(1, 11), transaction(2, 12, user_id=8)
+    store = FeatureStateStore()
+    store.rebuild(engine)
+    store.observe(failed, engine)
+    store.observe(kept, engine)
+
+    store.rollback([failed], engine)
+    assert store.entities.last_seen("card")["4111000"] % (24 * NS_PER_HOUR) == 12 * NS_PER_HOUR
+    assert store.get(7, engine).count == 0
+    assert store.get(8, engine).count == 1
+
+
+def test_rollback_of_the_only_transaction_restores_the_stored_timestamps(engine):
+    base, failed = transaction(1, 9), transaction(2, 11, card="4111999")
+    store_rows(engine, base)
+    store = FeatureStateStore()
+    store.rebuild(engine)
+    store.observe(failed, engine)
+
+    store.rollback([failed], engine)
+    assert "4111999" not in store.entities.last_seen("card")
+    assert store.entities.last_seen("device")["mobile"] % (24 * NS_PER_HOUR) == 9 * NS_PER_HOUR
+    assert store.get(7, engine).count == 1
+
+
+def test_least_recently_used_states_are_evicted_and_rehydrated_with_pending_rows(engine):
+    first = transaction(1, 9, user_id=1)
+    store_rows(engine, first)
+    store = FeatureStateStore(max_users=2)
+    store.rebuild(engine)
+    store.observe(first, engine)
+    store.confirm([first])
+    # User 2's transaction is still pending when its state is evicted by users 3 and 1
+    pending = transaction(2, 10, user_id=2)
+    store.observe(pending, engine)
+    store.observe(transaction(3, 11, user_id=3), engine)
+    store.observe(transaction(4, 12, user_id=1), engine)
+    assert len(store) == 2
+
+    features = store.observe(transaction(5, 13, user_id=2, amount=300.0), engine)
+    assert len(store) == 2
+    assert feature_values(features)["TransactionCount_C1"] == 2
+    assert features["TransactionRatio_E7"] == pytest.approx(300.0 / 200.0)
@@ -0,0 +1,39 @@
+"""The synthetic data generator: determinism, independence from workers and buckets, and its stored features."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.generator import generate, generate_frame
+from src.features.engineered import FEATURE_COLUMNS, compute_features
+
+N_USERS = 60
+SHARD_USERS = 16
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return generate_frame(N_USERS, seed=3, shard_users=SHARD_USERS)
+
+
+def test_same_seed_same_data(expected):
+    pd.testing.assert_frame_equal(generate_frame(N_USERS, seed=3, shard_users=SHARD_USERS), expected)
+    assert not generate_frame(N_USERS, seed=4, shard_users=SHARD_USERS).equals(expected)
+
+
+@pytest.mark.parametrize("workers, buckets", [(1, 7), (2, 3)])
+def test_file_does_not_depend_on_workers_or_buckets(expected, tmp_path, workers, buckets):
+    path = str(tmp_path / "transactions.parquet")
+    stats = generate(path, N_USERS, seed=3, shard_users=SHARD_USERS, workers=workers,
+                     chunk_rows=len(expected) // buckets)
+    assert stats["rows"] == len(expected)
+    pd.testing.assert_frame_equal(pd.read_parquet(path), expected, check_dtype=False)
+
+
+def test_stored_features_are_the_point_in_time_features(expected):
+    assert expected["TransactionDT"].is_monotonic_increasing
+    assert (np.diff(expected["TransactionID"]) == 1).all()
+    recomputed = compute_features(expected)
+    for column in FEATURE_COLUMNS:
+        np.testing.assert_allclose(expected[column].to_numpy(np.float64), recomputed[column].to_numpy(np.float64),
+                                   rtol=1e-9, atol=1e-9, err_msg=column)
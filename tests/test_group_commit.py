@@ -0,0 +1,63 @@
+"""GroupCommitWriter commits concurrent writes together and isolates a failing one."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.models import Transaction, create_schema
+from src.db.persistence import GroupCommitWriter, apply_sqlite_pragmas
+
+N_WRITES = 8
+
+
+def row(transaction_id):
+    return {"TransactionID": transaction_id, "TransactionAmt": 10.0, "TransactionDT": "2024-01-02 10:00:00",
+            "User_ID": 1, "isFraud": 0}
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'writes.db'}"
+    create_schema(create_engine(url))
+    return url
+
+
+def write_concurrently(database_url, batches):
+    """Write each of ``batches`` with its own ``write`` call; returns the writer, results and stored IDs."""
+    async def run():
+        engine = create_async_engine(database_url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+        apply_sqlite_pragmas(engine)
+        # Long enough for every write to join the first group
+        writer = GroupCommitWriter(engine, Transaction.__table__, max_delay=0.05, max_rows=1000)
+        results = await asyncio.gather(*(writer.write(rows) for rows in batches), return_exceptions=True)
+        await writer.close()
+        async with engine.connect() as conn:
+            stored = (await conn.execute(select(Transaction.TransactionID).order_by(Transaction.TransactionID))).scalars().all()
+            count = (await conn.execute(select(func.count()).select_from(Transaction))).scalar()
+        await engine.dispose()
+        return writer, results, stored, count
+
+    return asyncio.run(run())
+
+
+def test_concurrent_writes_share_one_commit(database_url):
+    writer, results, stored, count = write_concurrently(database_url, [[row(i)] for i in range(1, N_WRITES + 1)])
+    assert results == [None] * N_WRITES
+    assert writer.commits == 1
+    assert stored == list(range(1, N_WRITES + 1))
+
+
+def test_duplicate_transaction_id_fails_only_its_write(database_url):
+    # The last write repeats the TransactionID of the third
+    batches = [[row(i)] for i in range(1, N_WRITES)] + [[row(3)]]
+    writer, results, stored, count = write_concurrently(database_url, batches)
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    assert len(failures) == 1
+    assert isinstance(results[-1], IntegrityError)
+    assert count == N_WRITES - 1
+    assert stored == list(range(1, N_WRITES))
+    assert writer.rows_written == N_WRITES - 1
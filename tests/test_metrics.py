@@ -0,0 +1,63 @@
+"""Histograms and counters: bucket placement, totals across threads, and exited threads' shards."""
+
+import threading
+
+from src.serving.metrics import Counter, Histogram, MetricsRegistry
+
+N_THREADS = 20
+
+
+def run_threads(fn):
+    threads = [threading.Thread(target=fn, args=(i,)) for i in range(N_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_histogram_buckets_and_sum():
+    histogram = Histogram(buckets=(0.001, 0.01))
+    for duration_ns in (500_000, 1_000_000, 5_000_000, 20_000_000):
+        histogram.observe_ns(duration_ns)
+    # A duration equal to a bound falls in that bound's bucket, like Prometheus' le
+    assert histogram.snapshot() == ([2, 1, 1], 26_500_000)
+
+
+def test_exited_threads_keep_their_values_but_not_their_shards():
+    histogram = Histogram(buckets=(0.001,))
+    counter = Counter("requests_total", "Requests.", "verdict")
+    histogram.observe_ns(10)
+    counter.inc("legit")
+
+    def record(i):
+        histogram.observe_ns(2_000_000)
+        counter.inc("fraud" if i % 2 else "legit", 2)
+
+    run_threads(record)
+    run_threads(record)
+    # Only the main thread's shards are left
+    assert len(histogram._shards) == 1
+    assert len(counter._shards) == 1
+    assert histogram.snapshot() == ([1, 2 * N_THREADS], 10 + 2 * N_THREADS * 2_000_000)
+    assert counter.render()[2:] == [f'requests_total{{verdict="legit"}} {1 + 2 * N_THREADS}',
+                                    f'requests_total{{verdict="fraud"}} {2 * N_THREADS}']
+
+
+def test_render_is_cumulative_per_bucket():
+    registry = MetricsRegistry()
+    stages = registry.histogram("stage_seconds", "Stage time.", "stage", buckets=(0.001, 0.01))
+    stages.labels("predict").observe_ns(2_000_000)
+    stages.labels("predict").observe_ns(2_000_000)
+    registry.collect("queue_depth", "gauge", "Queue depth.", lambda: [({}, 3)])
+    assert registry.render().splitlines() == [
+        "# HELP stage_seconds Stage time.",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="predict",le="0.001"} 0',
+        'stage_seconds_bucket{stage="predict",le="0.01"} 2',
+        'stage_seconds_bucket{stage="predict",le="+Inf"} 2',
+        'stage_seconds_sum{stage="predict"} 0.004',
+        'stage_seconds_count{stage="predict"} 2',
+        "# HELP queue_depth Queue depth.",
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+    ]
@@ -0,0 +1,57 @@
+"""History queries return rows in time order and are served by their index."""
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from src.db import queries
+from src.db.models import Transaction, create_schema
+
+
+def row(transaction_id, timestamp, user_id=1, card="4111000"):
+    return {
+        "TransactionID": transaction_id, "TransactionAmt": float(transaction_id), "TransactionDT": timestamp,
+        "User_ID": user_id, "CardNumber": card, "User_Region": "Hebbal", "Order_Region": "Hebbal",
+        "Merchant": "Amazon", "Merchant_email": "amazon@merchant.com", "DeviceType": "mobile",
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    create_schema(engine)
+    with engine.begin() as conn:
+        # Client-supplied TransactionIDs do not follow time
+        conn.execute(insert(Transaction.__table__), [
+            row(30, "2024-01-02 09:00:00"), row(10, "2024-01-02 11:00:00"), row(20, "2024-01-02 11:00:00"),
+            row(5, "2024-01-02 12:00:00", card="4111999"), row(40, "2024-01-02 10:00:00", user_id=2),
+        ])
+    return engine
+
+
+def test_user_history_is_in_time_order_then_transaction_id(engine):
+    history = queries.fetch_user_history(engine, 1, ("TransactionID", "TransactionDT"))
+    assert [entry["TransactionID"] for entry in history] == [30, 10, 20, 5]
+
+
+def test_counts_and_last_seen(engine):
+    assert queries.count_other_user_transactions(engine, 1, [30, 10]) == 2
+    assert queries.fetch_last_seen(engine, "card", ("4111000",)) == "2024-01-02 11:00:00"
+    assert queries.fetch_last_seen(engine, "address", ("Hebbal", "Hebbal")) == "2024-01-02 12:00:00"
+    assert sorted(queries.fetch_all_last_seen(engine, "card")) == [
+        ("4111000", "2024-01-02 11:00:00"), ("4111999", "2024-01-02 12:00:00")]
+
+
+@pytest.mark.parametrize("sql, params, plan", [
+    (queries.user_history_sql(queries.HISTORY_COLUMNS + ("TransactionID",)), {"user_id": 1},
+     ["SEARCH transactions USING INDEX ix_transactions_user_dt (User_ID=?)"]),
+    (queries.count_other_user_sql(), {"user_id": 1, "known_ids": [30, 10]},
+     ["SEARCH transactions USING COVERING INDEX ix_transactions_user_dt (User_ID=?)"]),
+    (queries.last_seen_sql("address"), {"User_Region": "Hebbal", "Order_Region": "Hebbal"},
+     ["SEARCH transactions USING COVERING INDEX ix_transactions_address_dt (User_Region=? AND Order_Region=?)"]),
+    (queries.last_seen_all_sql("device"), {},
+     ["SEARCH transactions USING COVERING INDEX ix_transactions_device_dt (DeviceType>?)"]),
+])
+def test_queries_search_their_index_without_sorting(engine, sql, params, plan):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    assert queries.explain_query_plan(engine, sql, params) == plan
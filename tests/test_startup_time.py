@@ -0,0 +1,35 @@
+"""``import app`` goes through its start-up stages without loading training-only modules."""
+
+import json
+import subprocess
+import sys
+
+from benchmarks.startup_time import LAZY_MODULES
+
+STAGES = [
+    "import web framework", "import database", "import features", "import model runtime", "import serving",
+    "load model artifact", "connect database", "rebuild feature state", "create app",
+]
+
+PROBE = """
+import json, sys
+import app
+lazy = %r
+loaded = sorted(m for m in sys.modules if any(m == name or m.startswith(name + ".") for name in lazy))
+print(json.dumps({**app.startup.as_dict(), "loaded": loaded}))
+""" % (LAZY_MODULES,)
+
+
+def test_startup_stages_and_lazy_modules(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRAUD_SHIELD_DATABASE_URL", f"sqlite:///{tmp_path / 'startup.db'}")
+    monkeypatch.delenv("FRAUD_SHIELD_STARTUP_PROFILE", raising=False)
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert [stage["stage"] for stage in profile["stages"]] == STAGES
+    # Not even a submodule of sklearn, scipy.stats, shap, geopy or joblib
+    assert profile["loaded"] == []
+    # Everything is imported up front; loading the model and building state import nothing
+    by_name = {stage["stage"]: stage for stage in profile["stages"]}
+    assert [by_name[name]["modules"] for name in ("load model artifact", "rebuild feature state", "create app")] == [0, 0, 0]
+    assert sum(stage["ms"] for stage in profile["stages"]) <= profile["total_ms"] + 1
@@ -0,0 +1,73 @@
+"""Welford moments and the streaming median against numpy, and the median sketch's error bound."""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from src.features.streaming import MIN_MAGNITUDE, MedianSketch, RunningMoments, StreamingMedian, TwoHeapMedian
+
+
+def test_running_moments_match_numpy():
+    values = [1e6 + random.Random(0).gauss(0, 1) for _ in range(500)] + [0.0, 3.5, 3.5]
+    moments = RunningMoments()
+    for i, value in enumerate(values, start=1):
+        moments.push(value)
+        assert moments.mean == pytest.approx(np.mean(values[:i]), rel=1e-12)
+        expected_std = np.std(values[:i], ddof=1) if i > 1 else 0.0
+        assert moments.std == pytest.approx(expected_std, rel=1e-9, abs=1e-9)
+
+
+def test_running_moments_of_fewer_than_two_values():
+    moments = RunningMoments()
+    assert (moments.count, moments.mean, moments.std) == (0, 0.0, 0.0)
+    moments.push(42.0)
+    assert (moments.count, moments.mean, moments.std) == (1, 42.0, 0.0)
+
+
+def test_median_is_exact_up_to_the_limit():
+    rng = random.Random(1)
+    # Repeated values and both signs
+    values = [float(rng.randint(-20, 20)) for _ in range(300)]
+    median = StreamingMedian(exact_limit=300)
+    for i, value in enumerate(values, start=1):
+        median.push(value)
+        assert median.median() == np.median(values[:i])
+    assert median.exact
+
+
+def test_median_skips_nan_like_pandas():
+    median = StreamingMedian()
+    assert math.isnan(median.median())
+    for value in (3.0, math.nan, 1.0, math.nan):
+        median.push(value)
+    assert (len(median), median.median()) == (2, 2.0)
+
+
+@pytest.mark.parametrize("sign", [1, -1])
+@pytest.mark.parametrize("accuracy", [0.005, 0.05])
+def test_sketch_median_is_within_the_accuracy(sign, accuracy):
+    rng = np.random.default_rng(2)
+    # Lognormal amounts with a block of equal values, so some buckets hold many
+    values = sign * np.concatenate([rng.lognormal(5, 2, 3000), np.full(500, 150.0)])
+    rng.shuffle(values)
+    median, exact = StreamingMedian(exact_limit=100, accuracy=accuracy), TwoHeapMedian()
+    for i, value in enumerate(values.tolist()):
+        median.push(value)
+        exact.push(value)
+        if i >= 100:
+            assert not median.exact
+            assert abs(median.median() - exact.median()) <= accuracy * abs(exact.median()) * (1 + 1e-9)
+
+
+def test_sketch_counts_tiny_values_as_zero():
+    sketch = MedianSketch(0.01)
+    for value in (MIN_MAGNITUDE / 2, -MIN_MAGNITUDE / 2, 0.0):
+        sketch.push(value)
+    assert (sketch.median(), sketch.buckets) == (0.0, 1)
+
+
+def test_sketch_rejects_an_accuracy_outside_0_1():
+    with pytest.raises(ValueError):
+        MedianSketch(1.0)
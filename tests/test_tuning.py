@@ -0,0 +1,56 @@
+"""Stored Optuna studies: a resumed study is topped up, and warm starts do not enqueue a parameter set twice."""
+
+import numpy as np
+import optuna
+import pandas as pd
+import pytest
+
+from src.models.tuning import STUDY_PREFIX, open_study, tune
+
+COMPLETE = (optuna.trial.TrialState.COMPLETE,)
+
+
+def split(seed):
+    rng = np.random.default_rng(seed)
+    x = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    y = (x["a"] + rng.normal(scale=0.5, size=300) > 1).astype(int)
+    return x[:200], x[200:], y[:200], y[200:]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    return f"sqlite:///{tmp_path / 'studies.db'}"
+
+
+def test_resumed_study_is_topped_up(storage):
+    x_train, x_val, y_train, y_val = split(0)
+    study, _ = open_study(x_train, y_train, storage=storage, seed=0)
+    tune(x_train, x_val, y_train, y_val, n_trials=3, workers=1, threads=1, study=study, patience=None)
+    assert len(study.get_trials(states=COMPLETE)) == 3
+
+    resumed, warm_start = open_study(x_train, y_train, storage=storage, seed=0)
+    assert (resumed.study_name, warm_start) == (study.study_name, None)
+    tune(x_train, x_val, y_train, y_val, n_trials=5, workers=1, threads=1, study=resumed, patience=None)
+    assert len(resumed.get_trials(states=COMPLETE)) == 5
+    # Already at the target: nothing to run
+    tune(x_train, x_val, y_train, y_val, n_trials=4, workers=1, threads=1, study=resumed, patience=None)
+    assert len(resumed.trials) == 5
+
+
+def test_warm_start_skips_parameter_sets_already_present(storage):
+    x_train, x_val, y_train, y_val = split(0)
+    previous, _ = open_study(x_train, y_train, storage=storage, seed=0)
+    tune(x_train, x_val, y_train, y_val, n_trials=4, workers=1, threads=1, study=previous, patience=None)
+
+    retrain = split(1)
+    study, warm_start = open_study(retrain[0], retrain[2], storage=storage, warm_start=3)
+    assert warm_start == previous.study_name and study.study_name.startswith(STUDY_PREFIX)
+    enqueued = [trial.system_attrs["fixed_params"] for trial in study.trials]
+    assert len(enqueued) == 3
+    # Interrupted before any trial completed: opened again, nothing is enqueued twice
+    again, _ = open_study(retrain[0], retrain[2], storage=storage, warm_start=4)
+    assert [trial.system_attrs["fixed_params"] for trial in again.trials][:3] == enqueued
+    assert len(again.trials) == 4
+    tune(*retrain, n_trials=4, workers=1, threads=1, study=again, patience=None)
+    assert [trial.params for trial in again.trials] == [trial.system_attrs["fixed_params"] for trial in again.trials]
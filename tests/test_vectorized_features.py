@@ -0,0 +1,48 @@
+"""The vectorized E2/E3/E11/E12/M4/M9 columns, pinned on hand-computed histories."""
+
+import pandas as pd
+
+from src.features.engineered import user_features
+
+# (slot, hour within slot) of each hour of the day, as the row-wise code assigned them
+HOUR_SLOTS = [
+    (3, 2), (3, 3), (4, 0), (4, 1), (4, 2), (4, 3), (5, 0), (5, 1), (5, 2), (5, 3), (0, 0), (0, 1),
+    (0, 2), (0, 3), (1, 0), (1, 1), (1, 2), (1, 3), (2, 0), (2, 1), (2, 2), (2, 3), (3, 0), (3, 1),
+]
+
+
+def history(rows, user_id=1):
+    """One user's transactions from ``(hour, device, amount, order_region)`` tuples, in time order."""
+    return pd.DataFrame([{
+        "TransactionAmt": amount, "TransactionDT": pd.Timestamp(f"2024-01-02 {hour:02d}:00:00"),
+        "User_ID": user_id, "Merchant": "Amazon", "CardNumber": "4111000", "User_Region": "Hebbal",
+        "Order_Region": order_region, "Merchant_email": "amazon@merchant.com", "DeviceType": device,
+    } for hour, device, amount, order_region in rows])
+
+
+def test_time_slots_of_every_hour():
+    features = user_features(history([(hour, "mobile", 100.0, "Hebbal") for hour in range(24)]))
+    assert list(zip(features["TransactionTimeSlot_E2"], features["HourWithinSlot_E3"])) == HOUR_SLOTS
+
+
+def test_device_matching_and_consistency_as_of_each_row():
+    features = user_features(history([
+        (9, "mobile", 100.0, "Hebbal"),
+        (10, "desktop", 300.0, "Yelahanka"),  # tie with mobile: the smallest device wins
+        (11, "desktop", 50.0, "Hebbal"),
+        (12, "mobile", 1000.0, "Hebbal"),     # tie again, and above 1.5x the median so far (200)
+        (13, "mobile", 200.0, "Hebbal"),
+    ]))
+    assert features["DeviceMatching_M4"].tolist() == [1, 1, 1, 0, 1]
+    assert features["DeviceMismatch_M6"].tolist() == [1, 1, 0, 1, 0]
+    assert features["RegionMismatch_M8"].tolist() == [0, 1, 0, 0, 0]
+    assert features["MedianTransactionAmount_E8"].tolist() == [100.0, 200.0, 100.0, 200.0, 200.0]
+    assert features["TransactionConsistency_M9"].tolist() == [3, 2, 4, 1, 4]
+
+
+def test_anomalies_include_the_row_itself():
+    df = pd.concat([history([(9, "mobile", 100.0, "Hebbal"), (23, "mobile", 100.0, "Yelahanka")]),
+                    history([(23, "desktop", 80.0, "Hebbal")], user_id=2)], ignore_index=True)
+    features = user_features(df)
+    assert features["TimingAnomaly_E11"].tolist() == [0, 0, 0]
+    assert features["RegionAnomaly_E12"].tolist() == [0, 0, 0]
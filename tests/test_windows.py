@@ -0,0 +1,109 @@
+"""RingWindow and the 24h E9/E10 features: equal timestamps, the boundary, late rows and NaT rows."""
+
+import random
+
+import pandas as pd
+import pytest
+
+from src.features.state import UserFeatureState
+from src.features.windows import NS_PER_SECOND, KeyedWindows, RingWindow
+
+LENGTH = 10 * NS_PER_SECOND
+
+
+def window_of(*entries, length_ns=LENGTH):
+    window = RingWindow(length_ns)
+    for timestamp_ns, value in entries:
+        window.push(timestamp_ns, value)
+    return window
+
+
+def test_equal_timestamps_are_all_kept():
+    window = window_of((5, 1.0), (5, 2.0), (5, 3.0))
+    assert window.entries() == [(5, 1.0), (5, 2.0), (5, 3.0)]
+    assert (window.count, window.total, window.mean) == (3, 6.0, 2.0)
+
+
+def test_entry_exactly_one_length_old_is_kept():
+    window = window_of((0, 1.0), (1, 2.0), (LENGTH, 4.0))
+    assert window.entries() == [(0, 1.0), (1, 2.0), (LENGTH, 4.0)]
+    window.push(LENGTH + 1, 8.0)
+    assert window.entries() == [(1, 2.0), (LENGTH, 4.0), (LENGTH + 1, 8.0)]
+    assert window.total == 14.0
+
+
+def test_late_entry_is_inserted_in_time_order():
+    window = window_of((10, 1.0), (30, 2.0), (20, 4.0), (30, 8.0), (10, 16.0))
+    assert window.entries() == [(10, 1.0), (10, 16.0), (20, 4.0), (30, 2.0), (30, 8.0)]
+    assert window.newest_ns == 30
+
+
+def test_entry_older_than_the_window_is_not_stored():
+    window = window_of((2 * LENGTH, 1.0), (LENGTH - 1, 2.0))
+    assert window.entries() == [(2 * LENGTH, 1.0)]
+    assert window.total == 1.0
+    # On the boundary it still counts
+    window.push(LENGTH, 4.0)
+    assert window.entries() == [(LENGTH, 4.0), (2 * LENGTH, 1.0)]
+
+
+def test_window_down_to_one_entry_resets_its_sum():
+    window = window_of((0, 0.1), (0, 0.2))
+    window.push(10 * LENGTH, 0.0)
+    window.push(30 * LENGTH, 0.0)
+    assert window.entries() == [(30 * LENGTH, 0.0)]
+    assert window.total == 0.0
+
+
+def test_matches_a_filter_over_the_whole_stream():
+    rng = random.Random(0)
+    windows = KeyedWindows({"short": LENGTH, "long": 5 * LENGTH})
+    streams = {}
+    for _ in range(2000):
+        key = rng.randrange(3)
+        # Mostly in order, with repeated and late timestamps
+        newest = max((t for t, _ in streams.get(key, [])), default=0)
+        timestamp_ns = max(0, newest + rng.choice([0, 1, LENGTH // 3, -LENGTH // 2, -2 * LENGTH]))
+        value = float(rng.randrange(100))
+        streams.setdefault(key, []).append((timestamp_ns, value))
+        windows.push(key, timestamp_ns, value)
+    for key, stream in streams.items():
+        newest = max(t for t, _ in stream)
+        for name, length_ns in (("short", LENGTH), ("long", 5 * LENGTH)):
+            window = windows.get(key)[name]
+            # An entry is stored only if it was within the window when it arrived, and kept while still within it
+            kept, seen_newest = [], None
+            for timestamp_ns, value in stream:
+                seen_newest = timestamp_ns if seen_newest is None else max(seen_newest, timestamp_ns)
+                if timestamp_ns >= seen_newest - length_ns:
+                    kept.append((timestamp_ns, value))
+            expected = sorted((entry for entry in kept if entry[0] >= newest - length_ns), key=lambda entry: entry[0])
+            assert window.entries() == expected
+            assert window.total == pytest.approx(sum(value for _, value in expected))
+
+
+def observe(state, dt, amount):
+    transaction = {
+        "TransactionAmt": amount, "TransactionDT": dt, "CardNumber": "4111000", "User_Region": "Hebbal",
+        "Order_Region": "Hebbal", "Merchant": "Amazon", "DeviceType": "mobile",
+    }
+    features = state.observe(transaction, pd.Timestamp(dt))
+    return features["AvgTransactionAmt_24Hrs_E9"], features["TransactionVelocity_E10"]
+
+
+def test_user_24h_features_with_equal_timestamps_and_expiry():
+    state = UserFeatureState()
+    assert observe(state, "2024-01-01 09:00:00", 100.0) == (100.0, 1)
+    assert observe(state, "2024-01-01 09:00:00", 300.0) == (200.0, 2)
+    assert observe(state, "2024-01-02 09:00:00", 200.0) == (200.0, 3)
+    # The 09:00 rows of the first day are now more than 24h old
+    assert observe(state, "2024-01-02 09:00:01", 400.0) == (300.0, 0)
+
+
+def test_user_24h_features_skip_nat_rows():
+    state = UserFeatureState()
+    assert observe(state, "2024-01-01 09:00:00", 100.0) == (100.0, 1)
+    # A row without a timestamp is not in any window: E9 keeps the windowed mean, E10 is 0 from then on
+    assert observe(state, None, 500.0) == (100.0, 0)
+    assert observe(state, "2024-01-01 10:00:00", 300.0) == (200.0, 0)
+    assert state.windows["24h"].count == 2
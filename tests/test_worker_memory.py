@@ -0,0 +1,16 @@
+"""Server workers share library and model file pages (USS/PSS from /proc, Linux only)."""
+
+import os
+
+import pytest
+
+from benchmarks.worker_memory import measure
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs /proc/<pid>/smaps_rollup")
+def test_each_worker_shares_part_of_its_resident_memory(tmp_path):
+    usage = measure(2, port=0, n_requests=10, tmp=str(tmp_path))
+    assert len(usage) == 2
+    for rss, pss, uss in usage:
+        # Shared pages count fully in RSS, in part in PSS and not at all in USS
+        assert uss < pss < rss